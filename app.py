@@ -1,99 +1,222 @@
-from flask import Flask, render_template, request, send_file
+from flask import Flask, render_template, request, send_file, make_response
 import os
 import uuid
-import shutil
+import hashlib
+import logging
+import threading
 from datetime import datetime # 导入 datetime 模块
+from urllib.parse import quote
 from src.write.writehdf5 import parse_and_store_hdf5_metadata
-from src.api_service import get_hdf5_files_from_db, get_hdf5_latlon_data, find_and_crop_hdf5, get_hdf5_variables_from_db, get_hdf5_groups_from_db, get_hdf5_internal_paths, perform_hdf5_subset_extraction
+from src.api_service import get_hdf5_files_from_db, get_filename_by_id, get_hdf5_latlon_data, find_and_crop_hdf5, get_hdf5_variables_from_db, get_hdf5_groups_from_db, get_hdf5_internal_paths, perform_hdf5_subset_extraction, perform_interpolation, invalidate_metadata_cache, find_file_by_sha256, find_files_by_bbox
 from flask import jsonify # 导入 jsonify
-from config import JUICEFS_MOUNT_POINT
-from multiprocessing import Process, Manager, Queue # 导入 multiprocessing 模块
-import time
+from src.task_store import TaskStore
+from config import JUICEFS_MOUNT_POINT, APP_PORT, TASK_DB_PATH, TASK_MAX_WORKERS, DOWNLOAD_OFFLOAD, X_ACCEL_REDIRECT_ROOTS
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from cachetools import TTLCache
+
+# 日志：DEBUG 级别默认关闭，logger.debug 在热路径上只是一次级别比较
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# 部署在 Apache (mod_xsendfile) 之后时，send_file 只返回 X-Sendfile 头
+app.use_x_sendfile = DOWNLOAD_OFFLOAD == 'x-sendfile'
+
+# 任务状态存储 (SQLite WAL，跨进程共享，无需 Manager 代理进程)
+task_statuses = TaskStore(TASK_DB_PATH)
 
-# 任务队列和任务状态存储
-manager = Manager()
-task_queue = Queue()
-task_statuses = manager.dict() # 用于存储任务状态和结果
+# 任务状态的进程内读缓存 (见 _get_cached_status)
+_status_cache = TTLCache(maxsize=4096, ttl=0.5)
+_final_status_cache = TTLCache(maxsize=4096, ttl=60)
+_status_cache_lock = threading.Lock()
 
-UPLOAD_FOLDER = 'uploads'
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# 有界任务进程池：裁剪/插值/提取任务彼此独立，可并行执行；
+# max_workers 限制并发度，避免同时打开过多 HDF5 文件压垮 JuiceFS
+MAX_TASK_WORKERS = TASK_MAX_WORKERS or os.cpu_count() or 1
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
 
 
+def _get_executor():
+    """
+    获取当前进程的任务进程池（首次提交任务时创建）。
 
-# 后台工作函数
-def worker(task_queue, task_statuses):
-    while True:
-        if not task_queue.empty():
-            task_id, task_data = task_queue.get()
-            task_statuses[task_id] = {'status': 'RUNNING', 'message': '任务正在执行...'}
-            print(f"[WORKER] 开始执行任务: {task_id}")
+    在 gunicorn 等多进程 WSGI 服务器下，每个 HTTP 工作进程各自持有一个进程池，
+    不会继承父进程 (--preload) 中创建的进程池内部队列。
+    任务进程异常退出 (段错误、被 OOM killer 杀死) 会使整个进程池变为 BrokenProcessPool，
+    之后的提交全部失败，此时关闭旧进程池并重新创建。
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is not None and _executor_pid == os.getpid() and getattr(_executor, '_broken', False):
+            logger.warning("任务进程池已损坏，重新创建进程池")
+            _executor.shutdown(wait=False)
+            _executor = None
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(max_workers=MAX_TASK_WORKERS)
+            _executor_pid = os.getpid()
+        return _executor
+
+# 上传流式写入时使用的块大小 (1 MB)
+PUBLISH_CHUNK_SIZE = 1 << 20
+# 不超过该大小的上传一次性读入预分配缓冲区 (16 MB)
+SMALL_UPLOAD_LIMIT = 16 << 20
+
+
+def _write_upload(src_stream, dst_path, length):
+    """
+    将上传流写入 dst_path，并返回内容的 SHA-256 十六进制摘要。
+
+    先以 O_CREAT|O_EXCL 创建空的占位文件预留目标文件名：同名文件已存在时在读取请求体之前就抛出
+    FileExistsError，检查与创建是同一个原子系统调用，不存在 stat 后再写入的竞争。
+    请求体写入同目录下的 .upload-<uuid> 暂存文件，写完后用 os.replace 原子替换占位文件，
+    读取方和目录列表不会在正式文件名下看到写了一半的 HDF5；写入失败时删除暂存文件与占位文件。
+
+    length 为请求的 Content-Length（multipart 请求体大小，是文件大小的上界）：
+    不超过 SMALL_UPLOAD_LIMIT 时预分配一个足够大的缓冲区，通常一次 readinto + 一次 write 即可完成；
+    否则复用同一个 1 MB 缓冲区循环 readinto/write，避免每个块重新分配内存。
+    摘要在写入的同时对同一块缓冲区计算 (hashlib 使用 OpenSSL 的 SHA 硬件加速实现)，无需再次读取文件。
+    """
+    digest = hashlib.sha256()
+    if length and length <= SMALL_UPLOAD_LIMIT:
+        buf = memoryview(bytearray(length))
+    else:
+        buf = memoryview(bytearray(PUBLISH_CHUNK_SIZE))
+
+    # Werkzeug 把较大的上传放在 SpooledTemporaryFile 中，该类在 Python 3.11 之前没有 readinto，
+    # 此时退回 read + 拷贝到同一块缓冲区
+    readinto = getattr(src_stream, 'readinto', None)
+    if readinto is None:
+        def readinto(b):
+            data = src_stream.read(len(b))
+            b[:len(data)] = data
+            return len(data)
+
+    os.close(os.open(dst_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+    staging_path = os.path.join(os.path.dirname(dst_path), f".upload-{uuid.uuid4().hex}")
+    try:
+        fd = os.open(staging_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            while True:
+                n = readinto(buf)
+                if not n:
+                    break
+                view = buf[:n]
+                digest.update(view)
+                while view:
+                    view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.replace(staging_path, dst_path)
+    except BaseException:
+        for path in (staging_path, dst_path):
             try:
-                task_type = task_data.get('task_type')
-
-                if task_type == 'crop':
-                    file_name = task_data['file_name']
-                    lat_min = task_data['lat_min']
-                    lat_max = task_data['lat_max']
-                    lon_min = task_data['lon_min']
-                    lon_max = task_data['lon_max']
-                    output_path = find_and_crop_hdf5(
-                        file_name=file_name,
-                        lat_min=lat_min,
-                        lat_max=lat_max,
-                        lon_min=lon_min,
-                        lon_max=lon_max
-                    )
-                elif task_type == 'interpolate':
-                    file_id = task_data['file_id']
-                    var_name = task_data['var_name']
-                    resolution = task_data['resolution']
-                    lon_min = task_data.get('lon_min')
-                    lon_max = task_data.get('lon_max')
-                    lat_min = task_data.get('lat_min')
-                    lat_max = task_data.get('lat_max')
-                    layer_min = task_data.get('layer_min')
-                    layer_max = task_data.get('layer_max')
-
-                    from src.api_service import perform_interpolation # 导入插值函数
-                    output_path = perform_interpolation(
-                        file_id=file_id,
-                        var_name=var_name,
-                        resolution=resolution,
-                        lon_min=lon_min,
-                        lon_max=lon_max,
-                        lat_min=lat_min,
-                        lat_max=lat_max,
-                        layer_min=layer_min,
-                        layer_max=layer_max
-                    )
-                elif task_type == 'extract_subset':
-                    file_id = task_data['file_id']
-                    target_path = task_data['target_path']
-                    output_filename = task_data.get('output_filename')
-                    output_path = perform_hdf5_subset_extraction(
-                        file_id=file_id,
-                        target_path=target_path,
-                        output_filename=output_filename
-                    )
-                else:
-                    raise ValueError(f"未知任务类型: {task_type}")
-                task_statuses[task_id] = {'status': 'COMPLETED', 'message': '任务完成', 'result': output_path, 'task_type': task_type}
-                print(f"[WORKER] 任务 {task_id} 完成，结果: {output_path}")
-            except Exception as e:
-                task_statuses[task_id] = {'status': 'FAILED', 'message': f'任务失败: {e}'}
-                print(f"[WORKER] 任务 {task_id} 失败: {e}")
-                import traceback
-                traceback.print_exc()
-        time.sleep(1) # 避免CPU空转
-
-# 启动时确保上传目录存在
-if not os.path.exists(app.config['UPLOAD_FOLDER']):
-    os.makedirs(app.config['UPLOAD_FOLDER'])
-    print(f"[DEBUG] 创建上传目录: {app.config['UPLOAD_FOLDER']}")
-else:
-    print(f"[DEBUG] 上传目录已存在: {app.config['UPLOAD_FOLDER']}")
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        raise
+    return digest.hexdigest()
+
+
+# 后台任务执行函数 (在进程池中运行)
+def _run_task(task_id, task_data, task_statuses):
+    task_statuses.set(task_id, {'status': 'RUNNING', 'message': '任务正在执行...'})
+    logger.info("[WORKER] 开始执行任务: %s", task_id)
+    try:
+        task_type = task_data.get('task_type')
+
+        if task_type == 'crop':
+            file_name = task_data['file_name']
+            lat_min = task_data['lat_min']
+            lat_max = task_data['lat_max']
+            lon_min = task_data['lon_min']
+            lon_max = task_data['lon_max']
+            output_path = find_and_crop_hdf5(
+                file_name=file_name,
+                lat_min=lat_min,
+                lat_max=lat_max,
+                lon_min=lon_min,
+                lon_max=lon_max
+            )
+        elif task_type == 'interpolate':
+            file_id = task_data['file_id']
+            var_name = task_data['var_name']
+            resolution = task_data['resolution']
+            lon_min = task_data.get('lon_min')
+            lon_max = task_data.get('lon_max')
+            lat_min = task_data.get('lat_min')
+            lat_max = task_data.get('lat_max')
+            layer_min = task_data.get('layer_min')
+            layer_max = task_data.get('layer_max')
+
+            output_path = perform_interpolation(
+                file_id=file_id,
+                var_name=var_name,
+                resolution=resolution,
+                lon_min=lon_min,
+                lon_max=lon_max,
+                lat_min=lat_min,
+                lat_max=lat_max,
+                layer_min=layer_min,
+                layer_max=layer_max
+            )
+        elif task_type == 'extract_subset':
+            file_id = task_data['file_id']
+            target_path = task_data['target_path']
+            output_filename = task_data.get('output_filename')
+            output_path = perform_hdf5_subset_extraction(
+                file_id=file_id,
+                target_path=target_path,
+                output_filename=output_filename
+            )
+        else:
+            raise ValueError(f"未知任务类型: {task_type}")
+        task_statuses.set(task_id, {'status': 'COMPLETED', 'message': '任务完成', 'result': output_path, 'task_type': task_type})
+        logger.info("[WORKER] 任务 %s 完成，结果: %s", task_id, output_path)
+    except Exception as e:
+        task_statuses.set(task_id, {'status': 'FAILED', 'message': f'任务失败: {e}'})
+        logger.exception("[WORKER] 任务 %s 失败: %s", task_id, e)
+
+
+def _on_task_done(task_id, future):
+    """进程池任务结束回调：兜底处理进程崩溃等未被 _run_task 捕获的异常。"""
+    e = future.exception()
+    if e is not None:
+        task_statuses.set(task_id, {'status': 'FAILED', 'message': f'任务失败: {e}'})
+        logger.error("[WORKER] 任务 %s 异常终止: %s", task_id, e)
+
+
+def submit_task(task_id, task_data, pending_message):
+    """登记任务为 PENDING 并提交到进程池。"""
+    task_statuses.set(task_id, {'status': 'PENDING', 'message': pending_message})
+    try:
+        future = _get_executor().submit(_run_task, task_id, task_data, task_statuses)
+    except BrokenProcessPool:
+        # 进程池在检查之后、提交之前损坏：_get_executor 会重建进程池，重试一次
+        future = _get_executor().submit(_run_task, task_id, task_data, task_statuses)
+    future.add_done_callback(lambda f: _on_task_done(task_id, f))
+
+def _get_cached_status(task_id):
+    """
+    读取任务状态，使用进程内短 TTL 缓存合并前端的高频轮询。
+
+    进行中的任务缓存 0.5 秒；COMPLETED/FAILED 为终态，缓存 60 秒。
+    """
+    with _status_cache_lock:
+        status = _final_status_cache.get(task_id) or _status_cache.get(task_id)
+    if status is not None:
+        return status
+
+    status = task_statuses.get(task_id)
+    if status:
+        with _status_cache_lock:
+            if status.get('status') in ('COMPLETED', 'FAILED'):
+                _final_status_cache[task_id] = status
+            else:
+                _status_cache[task_id] = status
+    return status
 
 @app.route('/')
 def index():
@@ -112,6 +235,19 @@ def get_file_latlon(file_id):
     else:
         return jsonify({"status": "error", "message": "无法获取文件经纬度数据"}), 404
 
+@app.route('/api/hdf5_files/search')
+def search_hdf5_files_by_bbox():
+    # 按经纬度范围检索文件，例如: /api/hdf5_files/search?lat_min=-58&lat_max=-48&lon_min=102&lon_max=142
+    try:
+        lat_min = float(request.args['lat_min'])
+        lat_max = float(request.args['lat_max'])
+        lon_min = float(request.args['lon_min'])
+        lon_max = float(request.args['lon_max'])
+    except (KeyError, ValueError):
+        return jsonify({"status": "error", "message": "缺少或无效的参数: lat_min, lat_max, lon_min, lon_max"}), 400
+    files = find_files_by_bbox(lat_min, lat_max, lon_min, lon_max)
+    return jsonify({"status": "success", "data": files}), 200
+
 @app.route('/api/hdf5_groups/<int:file_id>')
 def get_file_groups(file_id):
     groups = get_hdf5_groups_from_db(file_id)
@@ -121,10 +257,10 @@ def get_file_groups(file_id):
 def get_file_variables(file_id):
     # 从URL查询参数中获取group_path，例如: /api/hdf5_variables/1?group=/FS/Swath
     group_path = request.args.get('group', None)
-    print(f"[DEBUG] get_file_variables called for file_id: {file_id}, group: {group_path}")
+    logger.debug("get_file_variables called for file_id: %s, group: %s", file_id, group_path)
     variables = get_hdf5_variables_from_db(file_id, group_path)
     # 注意：这里不再对variables是否为空做特殊判断，直接返回数据库查询结果
-    print(f"[DEBUG] get_file_variables returning success for file_id: {file_id}, variables: {variables}")
+    logger.debug("get_file_variables returning success for file_id: %s, variables: %s", file_id, variables)
     return jsonify({"status": "success", "data": variables}), 200
 
 @app.route('/api/hdf5_internal_paths/<int:file_id>')
@@ -136,9 +272,7 @@ def list_hdf5_internal_paths(file_id):
         paths = get_hdf5_internal_paths(file_id)
         return jsonify({"status": "success", "data": paths}), 200
     except Exception as e:
-        print(f"[ERROR] 获取HDF5内部路径失败: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("获取HDF5内部路径失败: %s", e)
         return jsonify({"status": "error", "message": f"获取HDF5内部路径失败: {e}"}), 500
 
 @app.route('/api/extract_hdf5_subset', methods=['POST'])
@@ -162,26 +296,24 @@ def extract_hdf5_subset_api():
             'target_path': target_path,
             'output_filename': output_filename
         }
-        task_queue.put((task_id, task_data))
-        task_statuses[task_id] = {'status': 'PENDING', 'message': '子集提取任务已提交，等待处理'}
+        submit_task(task_id, task_data, '子集提取任务已提交，等待处理')
 
         return jsonify({"status": "success", "message": "子集提取任务已提交", "task_id": task_id}), 202
 
     except Exception as e:
-        print(f"[ERROR] 子集提取请求处理失败: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("子集提取请求处理失败: %s", e)
         return jsonify({"status": "error", "message": f"子集提取请求处理失败: {e}"}), 500
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
+    created = False
     try:
-        if 'file' not in request.files:
-            print("[DEBUG] 请求中无文件部分")
+        file = request.files.get('file')
+        if file is None:
+            logger.debug("请求中无文件部分")
             return "没有文件部分", 400
-        file = request.files['file']
-        if file.filename == '':
-            print("[DEBUG] 未选择文件")
+        if not file.filename:
+            logger.debug("未选择文件")
             return "没有选择文件", 400
 
         # 获取用户提供的重命名，并去除首尾空格
@@ -198,57 +330,54 @@ def upload_file():
             timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
             unique_filename = f"{original_filename_base}_{timestamp}{file_extension}"
 
-        temp_filepath = os.path.join(app.config['UPLOAD_FOLDER'], str(uuid.uuid4()) + file_extension) # 临时文件仍然使用UUID防止冲突
-        print(f"[DEBUG] 准备保存上传文件到临时路径: {temp_filepath}")
-        file.save(temp_filepath)
-        print(f"[DEBUG] 文件已保存到临时路径")
-
         jfs_filepath = os.path.join(JUICEFS_MOUNT_POINT, unique_filename)
-        print(f"[DEBUG] 目标JuiceFS路径: {jfs_filepath}")
+        logger.debug("目标JuiceFS路径: %s", jfs_filepath)
 
-        # 检查目标文件是否已存在，避免覆盖
-        if os.path.exists(jfs_filepath):
-            os.remove(temp_filepath) # 清理临时文件
+        # 以 O_EXCL 在 JuiceFS 上预留目标文件名，请求体流式写入暂存文件后原子替换：
+        # 同名文件已存在时立即返回 409，无需额外的 stat，也不会覆盖已有文件
+        try:
+            sha256 = _write_upload(file.stream, jfs_filepath, request.content_length)
+        except FileExistsError:
             return f"文件上传失败：JuiceFS中已存在同名文件 '{unique_filename}'。请使用不同的名称重命名。", 409 # 409 Conflict
+        created = True
+        logger.debug("文件已写入JuiceFS挂载点，SHA-256: %s", sha256)
 
-        # 移动文件到JuiceFS挂载点 (使用shutil.move更高效)
-        shutil.move(temp_filepath, jfs_filepath)
-        print(f"[DEBUG] 文件已移动到JuiceFS挂载点")
+        # 内容去重：相同内容的文件已入库时删除本次写入的文件，直接返回已有文件ID
+        existing = find_file_by_sha256(sha256)
+        if existing:
+            existing_id, existing_name = existing
+            os.remove(jfs_filepath)
+            logger.debug("文件内容与已入库文件 %s (ID: %s) 相同，跳过存储", existing_name, existing_id)
+            return f"文件内容与已入库文件 {existing_name} 相同，未重复存储，文件ID: {existing_id}"
 
         # 调用元数据入库
-        print(f"[DEBUG] 开始调用元数据入库函数，处理文件: {jfs_filepath}")
-        success, file_id = parse_and_store_hdf5_metadata(jfs_filepath)
+        logger.debug("开始调用元数据入库函数，处理文件: %s", jfs_filepath)
+        success, file_id = parse_and_store_hdf5_metadata(jfs_filepath, sha256=sha256)
         if success:
-            print(f"[DEBUG] 元数据入库成功，文件ID: {file_id}")
+            logger.debug("元数据入库成功，文件ID: %s", file_id)
+            invalidate_metadata_cache(file_id)
             return f"文件 {unique_filename} 上传并入库成功，文件ID: {file_id}"
         else:
-            print(f"[ERROR] 元数据入库失败，准备删除JuiceFS上的文件: {jfs_filepath}")
+            logger.error("元数据入库失败，准备删除JuiceFS上的文件: %s", jfs_filepath)
             if os.path.exists(jfs_filepath):
                 os.remove(jfs_filepath)
-                print(f"[DEBUG] JuiceFS上的文件已删除")
+                logger.debug("JuiceFS上的文件已删除")
             return "文件上传成功，但元数据入库失败", 500
 
     except Exception as e:
-        print(f"[ERROR] 上传或入库过程中发生异常: {e}")
-        import traceback
-        traceback.print_exc()
-        # 异常时清理临时文件和JuiceFS文件
+        logger.exception("上传或入库过程中发生异常: %s", e)
+        # 异常时清理本次创建的JuiceFS文件
         try:
-            if os.path.exists(temp_filepath):
-                os.remove(temp_filepath)
-                print(f"[DEBUG] 异常发生，删除临时文件: {temp_filepath}")
-            if 'jfs_filepath' in locals() and os.path.exists(jfs_filepath):
+            if created and os.path.exists(jfs_filepath):
                 os.remove(jfs_filepath)
-                print(f"[DEBUG] 异常发生，删除JuiceFS文件: {jfs_filepath}")
+                logger.debug("异常发生，删除JuiceFS文件: %s", jfs_filepath)
         except Exception as cleanup_e:
-            print(f"[ERROR] 异常处理中删除文件失败: {cleanup_e}")
+            logger.error("异常处理中删除文件失败: %s", cleanup_e)
         return f"文件上传或处理失败: {e}", 500
 
     return "未知错误", 500
 
 
-from src.api_service import find_and_crop_hdf5 # 导入裁剪函数
-
 @app.route('/api/crop', methods=['POST'])
 def crop_hdf5_file():
     try:
@@ -259,13 +388,8 @@ def crop_hdf5_file():
         lon_min = float(data.get('lon_min'))
         lon_max = float(data.get('lon_max'))
 
-        # 根据 file_id 从数据库获取 file_name
-        files = get_hdf5_files_from_db()
-        file_name = None
-        for f in files:
-            if str(f['id']) == str(file_id):
-                file_name = f['file_name']
-                break
+        # 根据 file_id 从数据库获取 file_name (带TTL缓存的单行查询)
+        file_name = get_filename_by_id(int(file_id))
 
         if not file_name:
             return jsonify({"status": "error", "message": "未找到对应的HDF5文件"}), 404
@@ -279,15 +403,12 @@ def crop_hdf5_file():
             'lon_min': lon_min,
             'lon_max': lon_max
         }
-        task_queue.put((task_id, task_data))
-        task_statuses[task_id] = {'status': 'PENDING', 'message': '任务已提交，等待处理'}
+        submit_task(task_id, task_data, '任务已提交，等待处理')
 
         return jsonify({"status": "success", "message": "裁剪任务已提交", "task_id": task_id}), 202 # 202 Accepted
 
     except Exception as e:
-        print(f"[ERROR] 裁剪请求处理失败: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("裁剪请求处理失败: %s", e)
         return jsonify({"status": "error", "message": f"裁剪请求处理失败: {e}"}), 500
 
 @app.route('/api/interpolate', methods=['POST'])
@@ -338,31 +459,46 @@ def interpolate_hdf5_file():
             'layer_min': layer_min,
             'layer_max': layer_max
         }
-        task_queue.put((task_id, task_data))
-        task_statuses[task_id] = {'status': 'PENDING', 'message': '插值任务已提交，等待处理'}
+        submit_task(task_id, task_data, '插值任务已提交，等待处理')
 
         return jsonify({"status": "success", "message": "插值任务已提交", "task_id": task_id}), 202 # 202 Accepted
 
     except Exception as e:
-        print(f"[ERROR] 插值请求处理失败: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("插值请求处理失败: %s", e)
         return jsonify({"status": "error", "message": f"插值请求处理失败: {e}"}), 500
 
 @app.route('/api/status/<task_id>')
 def get_task_status(task_id):
-    status = task_statuses.get(task_id)
+    status = _get_cached_status(task_id)
     if status:
         return jsonify(status), 200 # 直接返回整个 status 字典
     else:
         return jsonify({"status": "error", "message": "任务ID不存在"}), 404
 
+def _x_accel_uri(file_path):
+    """将本地文件路径映射为 nginx internal location 下的 URI，无匹配的根目录时返回 None。"""
+    file_path = os.path.abspath(file_path)
+    for root, location in X_ACCEL_REDIRECT_ROOTS.items():
+        root = os.path.abspath(root)
+        if file_path.startswith(root + os.sep):
+            return location.rstrip('/') + '/' + quote(os.path.relpath(file_path, root))
+    return None
+
 @app.route('/download/<task_id>')
 def download_file(task_id):
-    status = task_statuses.get(task_id)
+    status = _get_cached_status(task_id)
     if status and status['status'] == 'COMPLETED' and 'result' in status:
         file_path = status['result']
         if os.path.exists(file_path):
+            accel_uri = _x_accel_uri(file_path) if DOWNLOAD_OFFLOAD == 'x-accel-redirect' else None
+            if accel_uri:
+                # 交给 nginx 通过 sendfile(2) 发送文件，Python 进程不再搬运文件内容
+                resp = make_response('')
+                resp.headers['X-Accel-Redirect'] = accel_uri
+                resp.headers['Content-Type'] = 'application/octet-stream'
+                resp.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(os.path.basename(file_path))}"
+                return resp
+            # DOWNLOAD_OFFLOAD == 'x-sendfile' 时 send_file 只返回 X-Sendfile 头，由 Apache 发送文件
             return send_file(file_path, as_attachment=True, download_name=os.path.basename(file_path))
         else:
             return jsonify({"status": "error", "message": "文件未找到"}), 404
@@ -373,14 +509,14 @@ def download_file(task_id):
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser(description='Run the Flask app.')
-    parser.add_argument('--port', type=int, default=5001, help='Port number to run the Flask app on.')
+    parser.add_argument('--port', type=int, default=APP_PORT, help='Port number to run the Flask app on.')
+    parser.add_argument('--debug', action='store_true', help='Enable Flask debug mode (reloader stays disabled).')
     args = parser.parse_args()
-    print(f"[DEBUG] 启动 Flask 服务，端口: {args.port}")
+    logger.info("启动 Flask 服务，端口: %s", args.port)
 
-    # 启动后台工作进程
-    worker_process = Process(target=worker, args=(task_queue, task_statuses))
-    worker_process.daemon = True # 设置为守护进程，主进程退出时子进程也退出
-    worker_process.start()
-    print("[DEBUG] 后台工作进程已启动")
+    # 关闭重载器：reloader 会再 fork 一个子进程重复导入本模块，导致任务进程池/连接池重复创建
+    app.run(host='0.0.0.0', port=args.port, debug=args.debug, use_reloader=False)
 
-    app.run(host='0.0.0.0', port=args.port, debug=True)
+    # 等待已提交的任务结束并关闭进程池
+    if _executor is not None:
+        _executor.shutdown(wait=True)
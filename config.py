@@ -3,12 +3,44 @@
 # JuiceFS 挂载点
 JUICEFS_MOUNT_POINT = '/mnt/jfs'
 
+# Web 服务默认端口
+APP_PORT = 5001
+
 # 数据库连接参数
 DB_HOST = "localhost"
 DB_NAME = "juicefs"
 DB_USER = "juiceuser"
 DB_PASSWORD = "0333"
 
+# 数据库连接池大小 (每个进程)
+DB_POOL_MINCONN = 2
+DB_POOL_MAXCONN = 32
+
+# 任务状态存储 (SQLite) 文件路径
+TASK_DB_PATH = 'out/tasks.db'
+
+# 裁剪结果的压缩方式：'gzip' 兼容所有 HDF5 工具；'blosc2' 压缩更快，但读取端需要安装 hdf5plugin
+CROP_COMPRESSION = 'gzip'
+# 插值结果的压缩方式，可选值同上，另可设为 'none' (不压缩)
+INTERP_COMPRESSION = 'gzip'
+# 插值逐层加权计算使用的设备：'cpu'；'gpu' 需要安装 cupy 和 CUDA
+INTERP_DEVICE = 'cpu'
+# 插值结果的存储类型：'float32'；'float16' 半精度；'int16' 按 CF 约定 scale_factor/add_offset 打包，文件约减半
+INTERP_DTYPE = 'float32'
+
+# 裁剪/插值/提取任务进程池大小 (每个 Web 进程)；None 时使用 CPU 核数
+TASK_MAX_WORKERS = None
+
+# 下载卸载方式：None 由 Flask 直接发送文件；'x-sendfile' 交给 Apache (mod_xsendfile)；
+# 'x-accel-redirect' 交给 nginx，需要为下面每个根目录配置 internal location，例如：
+#     location /protected/out/ { internal; alias /path/to/project/out/; }
+DOWNLOAD_OFFLOAD = None
+# 本地目录 -> nginx internal location 前缀 (仅 'x-accel-redirect' 使用)
+X_ACCEL_REDIRECT_ROOTS = {
+    'out': '/protected/out',
+    JUICEFS_MOUNT_POINT: '/protected/jfs',
+}
+
 # 数据库中存储的生产环境路径前缀
 DB_PATH_PREFIX = '/mnt/jfs/'
 # 部署到服务器时，本地挂载点和数据库路径前缀是相同的
@@ -1,7 +1,13 @@
 
+import os
+import sys
 import psycopg2
 from psycopg2 import sql
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+# local_path 生成列在建列时固化这两个值，修改 config.py 后需删除该列再重新运行本脚本
+from config import DB_PATH_PREFIX, LOCAL_MOUNT_POINT
+
 # PostgreSQL 数据库连接参数
 DB_HOST = "XXXX"
 DB_NAME = "XXXX"
@@ -23,10 +29,58 @@ def create_tables():
                 id SERIAL PRIMARY KEY,
                 file_name VARCHAR(255) NOT NULL,
                 file_path TEXT NOT NULL,
+                sha256 CHAR(64),
+                lat_min REAL,
+                lat_max REAL,
+                lon_min REAL,
+                lon_max REAL,
                 created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
             );
         """)
 
+        # 兼容已存在的 hdf5_files 表：补充内容摘要列，并建立索引用于上传去重
+        cur.execute("ALTER TABLE hdf5_files ADD COLUMN IF NOT EXISTS sha256 CHAR(64);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_hdf5_files_sha256 ON hdf5_files (sha256);")
+        # 数据库路径 → 本地挂载路径的转换由数据库完成 (PostgreSQL 12+ 存储生成列)，应用直接读取 local_path
+        cur.execute("""
+            ALTER TABLE hdf5_files ADD COLUMN IF NOT EXISTS local_path TEXT
+            GENERATED ALWAYS AS (
+                CASE WHEN left(file_path, %(prefix_len)s) = %(prefix)s
+                     THEN %(mount)s || substring(file_path from %(prefix_len)s + 1)
+                     ELSE file_path
+                END
+            ) STORED;
+        """, {'prefix': DB_PATH_PREFIX, 'prefix_len': len(DB_PATH_PREFIX), 'mount': LOCAL_MOUNT_POINT})
+
+        # 裁剪接口按文件名查找文件
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_hdf5_files_name ON hdf5_files (file_name);")
+        # 路径前缀匹配 (file_path LIKE '/mnt/jfs/%') 使用 text_pattern_ops，与数据库排序规则无关
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_hdf5_files_path_prefix ON hdf5_files (file_path text_pattern_ops);")
+
+        # 入库时预先计算的经纬度范围，及用于跨文件空间检索的空间索引
+        cur.execute("""
+            ALTER TABLE hdf5_files
+                ADD COLUMN IF NOT EXISTS lat_min REAL,
+                ADD COLUMN IF NOT EXISTS lat_max REAL,
+                ADD COLUMN IF NOT EXISTS lon_min REAL,
+                ADD COLUMN IF NOT EXISTS lon_max REAL;
+        """)
+        # PostgreSQL 11+ 支持 box 类型的 SP-GiST 索引：空间划分而非 R-tree 重叠，
+        # 重叠/包含查询更快且索引更小；低版本退回 GiST
+        cur.execute("SHOW server_version_num;")
+        use_spgist = int(cur.fetchone()[0]) >= 110000
+        if use_spgist:
+            cur.execute("DROP INDEX IF EXISTS idx_hdf5_files_bbox;")
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_hdf5_files_bbox_spgist ON hdf5_files
+                USING spgist (box(point(lon_min, lat_min), point(lon_max, lat_max)));
+            """)
+        else:
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_hdf5_files_bbox ON hdf5_files
+                USING gist (box(point(lon_min, lat_min), point(lon_max, lat_max)));
+            """)
+
         # 创建 hdf5_groups 表
         cur.execute("""
             CREATE TABLE IF NOT EXISTS hdf5_groups (
@@ -38,6 +92,8 @@ def create_tables():
                 created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
             );
         """)
+        # 组列表按 file_id 查询；外键列上的索引也让删除文件时的级联删除无需全表扫描
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_groups_file ON hdf5_groups (file_id);")
 
         # 创建 hdf5_datasets 表
         cur.execute("""
@@ -47,9 +103,9 @@ def create_tables():
                 name VARCHAR(255) NOT NULL,
                 full_path TEXT NOT NULL,
                 parent_path TEXT,
-                shape TEXT,
+                shape BIGINT[],
                 dtype TEXT,
-                chunks TEXT,
+                chunks BIGINT[],
                 compression TEXT,
                 compression_opts TEXT,
                 fill_value TEXT,
@@ -57,6 +113,32 @@ def create_tables():
             );
         """)
 
+        # 兼容已存在的表：shape/chunks 由 "(1000, 500)" 形式的文本迁移为整数数组，
+        # 可直接用 shape[1]、cardinality(shape) 查询，行也更短。
+        # HDF5 维度是 64 位 (hsize_t)，用 BIGINT[]；早先迁移成 INTEGER[] 的列一并放宽
+        cur.execute("""
+            SELECT column_name, data_type FROM information_schema.columns
+            WHERE table_name = 'hdf5_datasets' AND column_name IN ('shape', 'chunks')
+              AND (data_type = 'text' OR udt_name = '_int4');
+        """)
+        for column, data_type in cur.fetchall():
+            if data_type == 'text':
+                using = sql.SQL("string_to_array(nullif(btrim({col}, '(), '), ''), ',')::BIGINT[]")
+            else:
+                using = sql.SQL("{col}::BIGINT[]")
+            cur.execute(sql.SQL("ALTER TABLE hdf5_datasets ALTER COLUMN {col} TYPE BIGINT[] USING {using};").format(
+                col=sql.Identifier(column), using=using.format(col=sql.Identifier(column))))
+
+        # 经纬度变量推断使用 name ILIKE '%lat%' 子串匹配，普通 btree 无法加速；
+        # pg_trgm 的 GIN 索引直接支持 ILIKE，因此建在 name 本身而非 lower(name) 上
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_ds_name_trgm ON hdf5_datasets USING gin (name gin_trgm_ops);")
+        # 按文件 + 组查找数据集（同组经度推断、变量列表）；前导列 file_id 同时覆盖仅按文件查询的场景
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_ds_file_parent ON hdf5_datasets (file_id, parent_path);")
+        # 没有按 parent_path 前缀查询的语句，早先建立的 SP-GiST 前缀索引只增加写入开销，予以删除
+        cur.execute("DROP INDEX IF EXISTS idx_ds_parent_spgist;")
+        cur.execute("DROP INDEX IF EXISTS idx_groups_parent_spgist;")
+
         # 创建 hdf5_attributes 表
         cur.execute("""
             CREATE TABLE IF NOT EXISTS hdf5_attributes (
@@ -74,7 +156,22 @@ def create_tables():
                 created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
             );
         """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_attrs_file ON hdf5_attributes (file_id);")
+
+        # 预先聚合的变量列表：每个 (文件, 组) 一行排序去重后的变量名数组，
+        # 另有 group_path = '' 的一行汇总文件内全部变量；入库后由 writehdf5 并发刷新
+        cur.execute("""
+            CREATE MATERIALIZED VIEW IF NOT EXISTS hdf5_file_variables AS
+            SELECT file_id,
+                   CASE WHEN GROUPING(parent_path) = 1 THEN '' ELSE parent_path END AS group_path,
+                   array_agg(DISTINCT name ORDER BY name) AS names
+            FROM hdf5_datasets
+            GROUP BY GROUPING SETS ((file_id, parent_path), (file_id));
+        """)
+        # REFRESH ... CONCURRENTLY 需要唯一索引
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_file_variables ON hdf5_file_variables (file_id, group_path);")
 
+        # 以上所有 DDL 在同一个事务中执行，一次提交
         conn.commit()
         print("Tables created successfully.")
 
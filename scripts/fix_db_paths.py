@@ -7,9 +7,13 @@ DB_NAME = "juicefs"
 DB_USER = "juiceuser"
 DB_PASSWORD = "0333"
 
+# 需要修正的路径前缀
+OLD_PREFIX = "/mnt/jfs/"
+NEW_PREFIX = "/mnt/myjfs/"
+
 def fix_paths():
     """
-    连接到数据库，并将 hdf5_files 表中不正确的 /mnt/jfs/ 路径修正为 /mnt/myjfs/。
+    连接到数据库，并将 hdf5_files 表中不正确的 /mnt/jfs/ 路径前缀修正为 /mnt/myjfs/。
     """
     conn = None
     updated_count = 0
@@ -17,16 +21,16 @@ def fix_paths():
         conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
         cur = conn.cursor()
 
-        # 使用 SQL 的 REPLACE 函数直接替换路径前缀
-        # WHERE 子句确保我们只修改那些错误的行
+        # 只截掉开头的前缀再拼接新前缀，不像 REPLACE 那样扫描并替换整个字符串中的所有匹配；
+        # 左锚定的 LIKE 可以走 file_path 上的 text_pattern_ops 索引做范围扫描，只修改那些错误的行
         update_query = """
             UPDATE hdf5_files
-            SET file_path = REPLACE(file_path, '/mnt/jfs/', '/mnt/myjfs/')
-            WHERE file_path LIKE '/mnt/jfs/%%';
+            SET file_path = %(new)s || substring(file_path from char_length(%(old)s) + 1)
+            WHERE file_path LIKE %(pattern)s;
         """
         
         print("准备执行数据库路径修复...")
-        cur.execute(update_query)
+        cur.execute(update_query, {'old': OLD_PREFIX, 'new': NEW_PREFIX, 'pattern': OLD_PREFIX + '%'})
         
         # 获取受影响的行数
         updated_count = cur.rowcount
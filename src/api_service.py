@@ -3,23 +3,28 @@
 import psycopg2
 import os
 from datetime import datetime
-import traceback
-import h5py
-import numpy as np
-from config import DB_HOST, DB_NAME, DB_USER, DB_PASSWORD, DB_PATH_PREFIX, LOCAL_MOUNT_POINT
+import logging
+import threading
+from cachetools import TTLCache, cached
+from config import DB_NAME, CROP_COMPRESSION, INTERP_COMPRESSION, INTERP_DEVICE, INTERP_DTYPE
+from .db_pool import db_cursor, execute_prepared
 
 # 假设 cropper 模块在 src/cropper/ 路径下
 from .cropper.SpaceCropping import HDF5Cropper, HDF5CropperError
 from .interpolation.main_new import run_interpolation
+from .write.writehdf5 import compute_latlon_bbox, update_hdf5_file_bbox
 
 
 
 
 from .read.extract_hdf5 import (
-    list_available_paths as extract_list_available_paths,
-    extract_hdf5_subset as extract_run_extract_hdf5_subset
+    query_available_paths as extract_query_available_paths,
+    extract_hdf5_subset as extract_run_extract_hdf5_subset,
+    open_hdf5
 )
 
+logger = logging.getLogger(__name__)
+
 
 def get_hdf5_files_from_db():
 
@@ -27,28 +32,128 @@ def get_hdf5_files_from_db():
     从数据库中获取所有已入库的HDF5文件信息。
     返回一个列表，每个元素是一个字典，包含 'id' 和 'file_name'。
     """
-    conn = None
     try:
-        conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
-        cur = conn.cursor()
-        cur.execute("SELECT id, file_name FROM hdf5_files ORDER BY file_name;")
-        files = []
-        for row in cur.fetchall():
-            files.append({"id": row[0], "file_name": row[1]})
-        return files
+        # 文件表可能很大，使用服务端游标分批拉取
+        with db_cursor(name="stream_files") as cur:
+            cur.execute("SELECT id, file_name FROM hdf5_files ORDER BY file_name;")
+            return [{"id": file_id, "file_name": file_name} for file_id, file_name in cur]
     except (Exception, psycopg2.Error) as error:
-        print(f"获取HDF5文件列表失败: {error}")
-        traceback.print_exc()
+        logger.exception("获取HDF5文件列表失败: %s", error)
         return []
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+
+
+# 文件ID → 文件名缓存 (5分钟TTL)，只缓存找到的记录
+_filename_cache = TTLCache(maxsize=1024, ttl=300)
+_filename_cache_lock = threading.Lock()
+
+
+def get_filename_by_id(file_id: int):
+    """
+    根据文件ID查询文件名（带5分钟TTL缓存；只缓存找到的记录，尚未入库完成的文件ID每次都会重新查询数据库）。
+
+    Args:
+        file_id (int): HDF5文件的数据库ID。
+
+    Returns:
+        str: 文件名；找不到记录时返回 None。
+    """
+    with _filename_cache_lock:
+        file_name = _filename_cache.get(file_id)
+    if file_name is not None:
+        return file_name
+
+    with db_cursor() as cur:
+        execute_prepared(cur, "filename_by_id", "SELECT file_name FROM hdf5_files WHERE id = $1", (file_id,))
+        row = cur.fetchone()
+    if row is None:
+        return None
+    with _filename_cache_lock:
+        _filename_cache[file_id] = row[0]
+    return row[0]
+
+
+def find_file_by_sha256(sha256: str):
+    """
+    根据内容摘要查找已入库的文件，用于上传去重。
+
+    Args:
+        sha256 (str): 文件内容的 SHA-256 十六进制摘要。
+
+    Returns:
+        tuple: (file_id, file_name)；不存在相同内容的文件时返回 None。
+    """
+    with db_cursor() as cur:
+        cur.execute("SELECT id, file_name FROM hdf5_files WHERE sha256 = %s LIMIT 1;", (sha256,))
+        return cur.fetchone()
+
+
+# 一次查询返回文件记录及推断出的经纬度变量：
+# 纬度取文件内第一个名称含 lat/latitude 的数据集，经度取与纬度同组、名称含 lon/longitude 的数据集。
+# 使用 LEFT JOIN LATERAL，文件存在但推断失败时对应列为 NULL，便于区分错误原因。
+_LATLON_META_SQL = """
+    SELECT f.id, f.local_path, lat.name, lat.parent_path, lon.name
+    FROM hdf5_files f
+    LEFT JOIN LATERAL (
+        SELECT d.name, d.parent_path FROM hdf5_datasets d
+        WHERE d.file_id = f.id AND (d.name ILIKE '%lat%' OR d.name ILIKE '%latitude%')
+        LIMIT 1
+    ) lat ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT d.name FROM hdf5_datasets d
+        WHERE d.file_id = f.id AND d.parent_path = lat.parent_path
+          AND (d.name ILIKE '%lon%' OR d.name ILIKE '%longitude%')
+        LIMIT 1
+    ) lon ON TRUE
+    WHERE {condition}
+    LIMIT 1
+"""
+
+# 按查找方式区分的预备语句: key -> (语句名, SQL)
+_LATLON_META_STATEMENTS = {
+    'id': ("latlon_meta_by_id", _LATLON_META_SQL.format(condition="f.id = $1")),
+    'file_name': ("latlon_meta_by_name", _LATLON_META_SQL.format(condition="f.file_name = $1")),
+}
+
+
+# 文件元数据缓存：目录在两次入库之间基本只读，UI 浏览 (组 → 变量 → 裁剪) 的重复点击直接命中缓存。
+# 缓存值一律为元组，调用方无法就地修改缓存内容。
+_METADATA_CACHE_TTL = 3600
+_metadata_cache_lock = threading.RLock()
+_latlon_meta_cache = TTLCache(maxsize=1024, ttl=_METADATA_CACHE_TTL)
+_groups_cache = TTLCache(maxsize=2048, ttl=_METADATA_CACHE_TTL)
+_variables_cache = TTLCache(maxsize=2048, ttl=_METADATA_CACHE_TTL)
+_paths_cache = TTLCache(maxsize=2048, ttl=_METADATA_CACHE_TTL)
+
+
+def _query_latlon_meta(key: str, value):
+    """
+    按文件ID ('id') 或文件名 ('file_name') 查询文件记录及其经纬度变量。
+    只缓存找到的记录，尚未入库的文件名/ID 每次都会重新查询数据库。
+
+    Returns:
+        tuple: (file_id, local_path, lat_var, latlon_group, lon_var)，推断失败的列为 None；
+               找不到文件时返回 None。
+    """
+    cache_key = (key, value)
+    with _metadata_cache_lock:
+        record = _latlon_meta_cache.get(cache_key)
+    if record is not None:
+        return record
+
+    name, statement = _LATLON_META_STATEMENTS[key]
+    with db_cursor() as cur:
+        execute_prepared(cur, name, statement, (value,))
+        record = cur.fetchone()
+    if record is not None:
+        with _metadata_cache_lock:
+            _latlon_meta_cache[cache_key] = record
+    return record
 
 
 def get_hdf5_latlon_data(file_id: int):
     """
-    根据文件ID从数据库获取HDF5文件路径，并读取其经纬度数据的范围。
+    根据文件ID获取HDF5文件经纬度数据的范围。
+    优先使用入库时写入 hdf5_files 的范围列；旧数据缺失时从文件中计算并回填。
 
     Args:
         file_id (int): HDF5文件的数据库ID。
@@ -57,85 +162,93 @@ def get_hdf5_latlon_data(file_id: int):
         dict: 包含经纬度范围的字典，例如 {'lat_min': -90.0, 'lat_max': 90.0, 'lon_min': -180.0, 'lon_max': 180.0}。
               如果发生错误或找不到数据，返回 None。
     """
-    conn = None
     try:
-        conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
-        cur = conn.cursor()
-
-        # 1. 根据 file_id 查询文件路径
-        cur.execute("SELECT file_path FROM hdf5_files WHERE id = %s;", (file_id,))
-        file_record = cur.fetchone()
-        if not file_record:
-            print(f"[ERROR] 未找到文件ID为 {file_id} 的HDF5文件记录。")
+        # 1. 优先读取入库时预先计算的经纬度范围
+        with db_cursor() as cur:
+            execute_prepared(cur, "bbox_by_id",
+                             "SELECT lat_min, lat_max, lon_min, lon_max FROM hdf5_files WHERE id = $1",
+                             (file_id,))
+            bbox = cur.fetchone()
+        if not bbox:
+            logger.error("未找到文件ID为 %s 的HDF5文件记录。", file_id)
             return None
-        input_hdf_path = file_record[0]
-
-        # 2. 智能推断经纬度变量名和组路径 (复用 find_and_crop_hdf5 中的逻辑)
-        lat_var = None
-        lon_var = None
-        latlon_group = None
-
-        cur.execute(
-            "SELECT name, parent_path FROM hdf5_datasets WHERE file_id = %s AND (name ILIKE '%%lat%%' OR name ILIKE '%%latitude%%') LIMIT 1;",
-            (file_id,))
-        lat_record = cur.fetchone()
-        if lat_record:
-            lat_var, latlon_group = lat_record
-
-        if latlon_group:
-            cur.execute(
-                "SELECT name FROM hdf5_datasets WHERE file_id = %s AND parent_path = %s AND (name ILIKE '%%lon%%' OR name ILIKE '%%longitude%%') LIMIT 1;",
-                (file_id, latlon_group))
-            lon_record = cur.fetchone()
-            if lon_record:
-                lon_var = lon_record[0]
+        if None not in bbox:
+            return dict(zip(('lat_min', 'lat_max', 'lon_min', 'lon_max'), bbox))
 
-        if not lat_var or not lon_var:
-            print(f"[ERROR] 无法为文件 {input_hdf_path} 推断经纬度变量。")
+        # 2. 旧数据未预先计算：推断经纬度变量名和组路径，从文件中计算后回填
+        record = _query_latlon_meta('id', file_id)
+        if not record:
+            logger.error("未找到文件ID为 %s 的HDF5文件记录。", file_id)
             return None
+        _, input_hdf_path, lat_var, latlon_group, lon_var = record
 
-        # 3. 读取HDF5文件并获取经纬度数据
-        with h5py.File(input_hdf_path, 'r') as hf:
-            if latlon_group and latlon_group != '/':
-                group = hf[latlon_group]
-            else:
-                group = hf
+        if not lat_var or not lon_var:
+            logger.error("无法为文件 %s 推断经纬度变量。", input_hdf_path)
+            return None
 
-            if lat_var not in group or lon_var not in group:
-                print(f"[ERROR] HDF5文件中找不到经纬度变量: {lat_var} 或 {lon_var} 在组 {latlon_group} 中。")
-                return None
+        hf = open_hdf5(input_hdf_path)
+        if latlon_group and latlon_group != '/':
+            group = hf[latlon_group]
+        else:
+            group = hf
 
-            lats = group[lat_var][:]
-            lons = group[lon_var][:]
+        if lat_var not in group or lon_var not in group:
+            logger.error("HDF5文件中找不到经纬度变量: %s 或 %s 在组 %s 中。", lat_var, lon_var, latlon_group)
+            return None
 
-            # 过滤填充值 (假设 -9999.9 是填充值)
-            valid_lats = lats[lats > -9999.0] # 稍微放宽一点，避免浮点数精度问题
-            valid_lons = lons[lons > -9999.0]
+        bbox = compute_latlon_bbox(group[lat_var], group[lon_var])
 
-            if valid_lats.size == 0 or valid_lons.size == 0:
-                print(f"[WARNING] 文件 {input_hdf_path} 中没有有效的经纬度数据。")
-                return None
+        if bbox is None:
+            logger.warning("文件 %s 中没有有效的经纬度数据。", input_hdf_path)
+            return None
 
-            lat_min = float(np.min(valid_lats))
-            lat_max = float(np.max(valid_lats))
-            lon_min = float(np.min(valid_lons))
-            lon_max = float(np.max(valid_lons))
+        with db_cursor() as cur:
+            update_hdf5_file_bbox(cur, file_id, bbox)
 
-            return {
-                'lat_min': lat_min,
-                'lat_max': lat_max,
-                'lon_min': lon_min,
-                'lon_max': lon_max
-            }
+        return dict(zip(('lat_min', 'lat_max', 'lon_min', 'lon_max'), bbox))
 
     except Exception as e:
-        print(f"[ERROR] 获取HDF5文件经纬度数据失败: {e}")
-        traceback.print_exc()
+        logger.exception("获取HDF5文件经纬度数据失败: %s", e)
         return None
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+
+
+def find_files_by_bbox(lat_min: float, lat_max: float, lon_min: float, lon_max: float):
+    """
+    查找经纬度范围与给定矩形相交的所有文件（使用 hdf5_files 上的 box 空间索引，不读取HDF5文件）。
+    尚未计算经纬度范围的文件不会出现在结果中。
+
+    Returns:
+        list: [{'id', 'file_name', 'lat_min', 'lat_max', 'lon_min', 'lon_max'}, ...]，按文件名排序；
+              查询失败时返回空列表。
+    """
+    try:
+        with db_cursor() as cur:
+            # 表达式需与索引定义完全一致才能命中索引
+            execute_prepared(cur, "files_by_bbox",
+                             "SELECT id, file_name, lat_min, lat_max, lon_min, lon_max FROM hdf5_files"
+                             " WHERE box(point(lon_min, lat_min), point(lon_max, lat_max))"
+                             " && box(point($1, $2), point($3, $4))"
+                             " ORDER BY file_name",
+                             (lon_min, lat_min, lon_max, lat_max))
+            columns = ('id', 'file_name', 'lat_min', 'lat_max', 'lon_min', 'lon_max')
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+    except (Exception, psycopg2.Error) as error:
+        logger.exception("按经纬度范围查找文件失败: %s", error)
+        return []
+
+
+@cached(_groups_cache, lock=_metadata_cache_lock)
+def _query_groups(file_id: int):
+    """查询文件的组路径列表（结果按 file_id 缓存，查询失败时抛出异常且不缓存）。"""
+    with db_cursor() as cur:
+        execute_prepared(cur, "list_groups",
+                         "SELECT DISTINCT full_path FROM hdf5_groups WHERE file_id = $1 ORDER BY full_path",
+                         (file_id,))
+        groups = [row[0] for row in cur.fetchall()]
+    # 确保根路径存在
+    if '/' not in groups:
+        groups.insert(0, '/')
+    return tuple(groups)
 
 
 def get_hdf5_groups_from_db(file_id: int):
@@ -145,26 +258,51 @@ def get_hdf5_groups_from_db(file_id: int):
     Args:
         file_id (int): HDF5文件的数据库ID。
     Returns:
-        list: 包含组路径的列表，例如 ['/', '/FS', '/FS/Swath']。
+        tuple: 包含组路径的元组，例如 ('/', '/FS', '/FS/Swath')。
     """
-    conn = None
     try:
-        conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
-        cur = conn.cursor()
-        cur.execute("SELECT DISTINCT full_path FROM hdf5_groups WHERE file_id = %s ORDER BY full_path;", (file_id,))
-        groups = [row[0] for row in cur.fetchall()]
-        # 确保根路径存在
-        if '/' not in groups:
-            groups.insert(0, '/')
-        return groups
+        return _query_groups(file_id)
     except (Exception, psycopg2.Error) as error:
-        print(f"获取HDF5组列表失败: {error}")
-        traceback.print_exc()
-        return []
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+        logger.exception("获取HDF5组列表失败: %s", error)
+        return ()
+
+
+def _query_variables(file_id: int, group_path: str = None):
+    """
+    查询文件(指定组)的变量名列表（结果按 (file_id, group_path) 缓存，查询失败时抛出异常且不缓存）。
+
+    缓存未命中时一次查询取回该文件所有组的变量列表并全部写入缓存，
+    浏览同一文件的其他组时不再访问数据库（N 个组 N 次往返 → 1 次）。
+    """
+    cache_key = (file_id, group_path or None)
+    with _metadata_cache_lock:
+        variables = _variables_cache.get(cache_key)
+    if variables is not None:
+        return variables
+
+    with db_cursor() as cur:
+        # 物化视图中每个组一行预先排序去重的变量名数组；group_path = '' 的行汇总全部组
+        execute_prepared(cur, "file_vars_mv",
+                         "SELECT group_path, names FROM hdf5_file_variables WHERE file_id = $1",
+                         (file_id,))
+        per_group = {(file_id, path or None): tuple(names) for path, names in cur.fetchall()}
+
+        if per_group:
+            # 组内没有数据集时视图中无对应行
+            variables = per_group.get(cache_key, ())
+        else:
+            # 物化视图尚未刷新（如新入库的文件）时直接查询；group_path 为 NULL 时不按组过滤
+            execute_prepared(cur, "list_vars",
+                             "SELECT DISTINCT name FROM hdf5_datasets"
+                             " WHERE file_id = $1 AND ($2::text IS NULL OR parent_path = $2)"
+                             " ORDER BY name",
+                             (file_id, group_path or None))
+            variables = tuple([row[0] for row in cur.fetchall()])
+
+    with _metadata_cache_lock:
+        _variables_cache.update(per_group)
+        _variables_cache[cache_key] = variables
+    return variables
 
 
 def get_hdf5_variables_from_db(file_id: int, group_path: str = None):
@@ -175,37 +313,16 @@ def get_hdf5_variables_from_db(file_id: int, group_path: str = None):
     Args:
         file_id (int): HDF5文件的数据库ID。
     Returns:
-        list: 包含变量名的列表，例如 ['airTemperature', 'pressure', 'Latitude', 'Longitude']。
-              如果发生错误或找不到数据，返回空列表。
+        tuple: 包含变量名的元组，例如 ('airTemperature', 'pressure', 'Latitude', 'Longitude')。
+               如果发生错误或找不到数据，返回空元组。
     """
-    conn = None
     try:
-        conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
-        cur = conn.cursor()
-        # 动态构建查询语句
-        base_query = "SELECT name FROM hdf5_datasets WHERE file_id = %s"
-        params = [file_id]
-
-        if group_path:
-            base_query += " AND parent_path = %s"
-            params.append(group_path)
-        
-        base_query += " ORDER BY name;"
-        
-        cur.execute(base_query, tuple(params))
-
-        # 使用 set 来自动去重，然后转为 list 并排序
-        variables = sorted(list(set([row[0] for row in cur.fetchall()])))
-        print(f"[DEBUG] get_hdf5_variables_from_db (通用): file_id={file_id}, group='{group_path}', variables={variables}")
+        variables = _query_variables(file_id, group_path)
+        logger.debug("get_hdf5_variables_from_db (通用): file_id=%s, group='%s', variables=%s", file_id, group_path, variables)
         return variables
     except (Exception, psycopg2.Error) as error:
-        print(f"获取HDF5变量列表失败: {error}")
-        traceback.print_exc()
-        return []
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+        logger.exception("获取HDF5变量列表失败: %s", error)
+        return ()
 
 
 def find_and_crop_hdf5(file_name: str, lat_min: float, lat_max: float, lon_min: float, lon_max: float,
@@ -229,58 +346,31 @@ def find_and_crop_hdf5(file_name: str, lat_min: float, lat_max: float, lon_min:
         HDF5CropperError: 如果裁剪过程中发生错误。
         Exception: 其他数据库连接或未知错误。
     """
-    conn = None
     try:
-        # 1. 连接数据库
-        conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
-        cur = conn.cursor()
-        print(f"成功连接到数据库 '{DB_NAME}'。")
-
-        # 2. 查询文件元数据
-        print(f"正在数据库中查找文件: {file_name}...")
-        cur.execute("SELECT id, file_path FROM hdf5_files WHERE file_name = %s;", (file_name,))
-        file_record = cur.fetchone()
-        if not file_record:
+        # 1. 查询文件元数据并智能推断经纬度变量名和组路径 (一次数据库往返)
+        logger.info("正在数据库 '%s' 中查找文件: %s...", DB_NAME, file_name)
+        record = _query_latlon_meta('file_name', file_name)
+        if not record:
             raise ValueError(f"在数据库中未找到文件名为 '{file_name}' 的记录。")
 
-        file_id, input_hdf_path = file_record
-        # 将数据库中的路径转换为本地可访问的路径
-        input_hdf_path = input_hdf_path.replace(DB_PATH_PREFIX, LOCAL_MOUNT_POINT)
-        print(f"找到文件记录: ID={file_id}, Path='{input_hdf_path}'")
-
-        # 3. 智能推断经纬度变量名和组路径
-        # 推断纬度
-        cur.execute(
-            "SELECT name, parent_path FROM hdf5_datasets WHERE file_id = %s AND (name ILIKE '%%lat%%' OR name ILIKE '%%latitude%%') LIMIT 1;",
-            (file_id,))
-        lat_record = cur.fetchone()
-        if not lat_record:
+        # local_path 是数据库生成列，已转换为本地可访问的路径
+        file_id, input_hdf_path, lat_var, latlon_group, lon_var = record
+        logger.info("找到文件记录: ID=%s, Path='%s'", file_id, input_hdf_path)
+
+        if not lat_var:
             raise ValueError("在数据库中未能自动推断出纬度变量 (lat/latitude)。")
-        lat_var, latlon_group = lat_record
-        print(f"推断出纬度变量: '{lat_var}', 组: '{latlon_group}'")
-
-        # 推断经度
-        cur.execute(
-            "SELECT name FROM hdf5_datasets WHERE file_id = %s AND parent_path = %s AND (name ILIKE '%%lon%%' OR name ILIKE '%%longitude%%') LIMIT 1;",
-            (file_id, latlon_group))
-        lon_record = cur.fetchone()
-        if not lon_record:
+        logger.info("推断出纬度变量: '%s', 组: '%s'", lat_var, latlon_group)
+        if not lon_var:
             raise ValueError(f"在组 '{latlon_group}' 中未能自动推断出经度变量 (lon/longitude)。")
-        lon_var = lon_record[0]
-        print(f"推断出经度变量: '{lon_var}'")
+        logger.info("推断出经度变量: '%s'", lon_var)
 
         # 假设数据组和经纬度组是同一个
         data_group = latlon_group
-        print(f"假设数据组与经纬度组相同: '{data_group}'")
+        logger.info("假设数据组与经纬度组相同: '%s'", data_group)
 
     except (Exception, psycopg2.Error) as error:
-        print(f"数据库操作失败: {error}")
-        traceback.print_exc()
+        logger.exception("数据库操作失败: %s", error)
         raise
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
 
     # 4. 准备并执行裁剪
     try:
@@ -290,13 +380,13 @@ def find_and_crop_hdf5(file_name: str, lat_min: float, lat_max: float, lon_min:
         output_filename = f"{base_name}_cropped_{timestamp}.h5"
         output_path = os.path.join(output_dir, output_filename)
 
-        print(f"准备执行裁剪...")
-        print(f"  输入: {input_hdf_path}")
-        print(f"  输出: {output_path}")
-        print(f"  范围: Lat({lat_min}, {lat_max}), Lon({lon_min}, {lon_max})")
+        logger.info("准备执行裁剪...")
+        logger.info("  输入: %s", input_hdf_path)
+        logger.info("  输出: %s", output_path)
+        logger.info("  范围: Lat(%s, %s), Lon(%s, %s)", lat_min, lat_max, lon_min, lon_max)
 
         # 实例化裁剪器并执行
-        cropper = HDF5Cropper(verbose=True)
+        cropper = HDF5Cropper(verbose=True, compression=CROP_COMPRESSION)
 
         # data_vars 设置为 None，让 cropper 自动处理组内所有符合条件的数据集
         final_output_path = cropper.crop_file(
@@ -313,15 +403,14 @@ def find_and_crop_hdf5(file_name: str, lat_min: float, lat_max: float, lon_min:
             latlon_group=latlon_group
         )
 
-        print(f"裁剪成功完成！")
+        logger.info("裁剪成功完成！")
         return os.path.abspath(final_output_path)
 
     except HDF5CropperError as e:
-        print(f"HDF5 裁剪过程中发生错误: {e}")
+        logger.error("HDF5 裁剪过程中发生错误: %s", e)
         raise
     except Exception as e:
-        print(f"执行裁剪时发生未知错误: {e}")
-        traceback.print_exc()
+        logger.exception("执行裁剪时发生未知错误: %s", e)
         raise
 
 
@@ -348,23 +437,15 @@ def perform_interpolation(file_id: int, var_name: str, resolution: float,
     Returns:
         str: 成功插值后生成的文件的绝对路径。
     """
-    conn = None
     try:
-        conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
-        cur = conn.cursor()
-
-        cur.execute("SELECT file_path FROM hdf5_files WHERE id = %s;", (file_id,))
-        file_record = cur.fetchone()
-        if not file_record:
-            raise ValueError(f"未找到文件ID为 {file_id} 的HDF5文件记录。")
-        input_hdf_path = file_record[0]
-
-        print(f"准备执行插值任务...")
-        print(f"  输入文件: {input_hdf_path}")
-        print(f"  变量名: {var_name}")
-        print(f"  分辨率: {resolution}")
-        print(f"  经纬度范围: Lon({lon_min}, {lon_max}), Lat({lat_min}, {lat_max})")
-        print(f"  层范围: Layer({layer_min}, {layer_max})")
+        # 文件路径、变量路径和经纬度路径由 run_interpolation 在一次数据库会话中查询，
+        # 找不到文件时同样抛出 ValueError，这里不再单独预查文件路径
+        logger.info("准备执行插值任务...")
+        logger.info("  输入文件ID: %s", file_id)
+        logger.info("  变量名: %s", var_name)
+        logger.info("  分辨率: %s", resolution)
+        logger.info("  经纬度范围: Lon(%s, %s), Lat(%s, %s)", lon_min, lon_max, lat_min, lat_max)
+        logger.info("  层范围: Layer(%s, %s)", layer_min, layer_max)
 
         output_file_path = run_interpolation(
             file_id=file_id, # 传递 file_id 而不是文件路径
@@ -376,27 +457,26 @@ def perform_interpolation(file_id: int, var_name: str, resolution: float,
             lat_min=lat_min,
             lat_max=lat_max,
             layer_min=layer_min,
-            layer_max=layer_max
+            layer_max=layer_max,
+            compression=INTERP_COMPRESSION,
+            device=INTERP_DEVICE,
+            output_dtype=INTERP_DTYPE
         )
 
         if output_file_path:
-            print(f"插值成功完成！结果保存到: {output_file_path}")
+            logger.info("插值成功完成！结果保存到: %s", output_file_path)
             return os.path.abspath(output_file_path)
         else:
             raise Exception("插值失败，未生成输出文件。")
 
     except Exception as e:
-        print(f"执行插值时发生错误: {e}")
-        traceback.print_exc()
+        logger.exception("执行插值时发生错误: %s", e)
         raise
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
 
 
 if __name__ == '__main__':
     # --- 这是一个使用示例 ---
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     # 确保在运行此示例前，你已经运行过 writehdf5.py 将元数据存入数据库
 
     # 1. 指定要裁剪的文件名和范围
@@ -426,15 +506,38 @@ if __name__ == '__main__':
         print(f"\n--- 发生意外错误 ---")
         print(f"错误: {e}")
 
-def get_hdf5_internal_paths(file_id: int) -> list:
+@cached(_paths_cache, lock=_metadata_cache_lock)
+def get_hdf5_internal_paths(file_id: int) -> tuple:
     """
-    获取指定HDF5文件内部的所有Group和Dataset路径。
+    获取指定HDF5文件内部的所有Group和Dataset路径（结果按 file_id 缓存）。
     Args:
         file_id (int): HDF5文件的数据库ID。
     Returns:
-        list: 包含所有内部路径的列表。
+        tuple: 包含所有内部路径的元组。
+    Raises:
+        Exception: 数据库查询失败。
+    """
+    return tuple(extract_query_available_paths(file_id))
+
+
+def invalidate_metadata_cache(file_id: int = None):
     """
-    return extract_list_available_paths(file_id)
+    失效文件元数据（经纬度推断/组/变量/内部路径）查询缓存，在文件入库后调用。
+
+    Args:
+        file_id (int, optional): 只失效该文件的缓存项；为 None 时清空全部缓存。
+    """
+    with _metadata_cache_lock:
+        if file_id is None:
+            for cache in (_latlon_meta_cache, _groups_cache, _variables_cache, _paths_cache):
+                cache.clear()
+            return
+        for cache_key in [k for k, record in _latlon_meta_cache.items() if record[0] == file_id]:
+            _latlon_meta_cache.pop(cache_key, None)
+        # 组/变量/内部路径缓存的键以 file_id 开头
+        for cache in (_groups_cache, _variables_cache, _paths_cache):
+            for cache_key in [k for k in cache.keys() if k[0] == file_id]:
+                cache.pop(cache_key, None)
 
 def perform_hdf5_subset_extraction(file_id: int, target_path: str, output_filename: str = None) -> str:
     """
@@ -449,19 +552,9 @@ def perform_hdf5_subset_extraction(file_id: int, target_path: str, output_filena
         Exception: 如果提取失败。
     """
     # 获取原始文件信息，用于生成输出文件名
-    conn = None
-    try:
-        conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
-        cur = conn.cursor()
-        cur.execute("SELECT file_name FROM hdf5_files WHERE id = %s", (file_id,))
-        file_record = cur.fetchone()
-        if not file_record:
-            raise ValueError(f"未找到文件ID为 {file_id} 的HDF5文件记录。")
-        original_file_name = file_record[0]
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+    original_file_name = get_filename_by_id(int(file_id))
+    if not original_file_name:
+        raise ValueError(f"未找到文件ID为 {file_id} 的HDF5文件记录。")
 
     # 生成输出文件路径
     output_dir = "out" # 提取的输出目录
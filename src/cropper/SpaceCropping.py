@@ -19,11 +19,47 @@ HDF5气象数据空间裁剪模块
 import h5py
 import numpy as np
 import argparse
+import itertools
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 import sys
 import logging
 from collections import defaultdict
-from typing import Optional, List, Tuple, Union, Any
+from typing import Optional, List, Tuple, Union, Any, Dict
+
+# hdf5plugin 为可选依赖，仅在选择 Blosc2 压缩时需要
+try:
+    import hdf5plugin
+except ImportError:
+    hdf5plugin = None
+
+
+# 支持的输出压缩方式
+COMPRESSION_CHOICES = ('gzip', 'blosc2')
+
+# 输出数据集的目标 chunk 大小 (约 1 MB)
+OUTPUT_CHUNK_BYTES = 1 << 20
+# 小于该大小的数据集不压缩，以连续布局存储 (64 KB)
+COMPRESSION_MIN_BYTES = 64 * 1024
+# gzip 输出时并行压缩 chunk 的线程数（裁剪本身已在任务进程池中运行，不宜过多）
+COMPRESSION_THREADS = min(4, os.cpu_count() or 1)
+# 输出文件的 chunk cache 设置
+OUTPUT_RDCC_NBYTES = 64 * 1024 * 1024
+OUTPUT_RDCC_NSLOTS = 10007
+# 输出文件格式下限为 HDF5 1.10：启用密集属性存储和 v2 B-tree chunk 索引，
+# 数据集与属性较多时元数据写入更快，HDF5 1.10 及以上版本的工具均可读取
+OUTPUT_LIBVER = ('v110', 'latest')
+# 输出文件采用分页聚合 (paged aggregation) 的空间分配策略：元数据和小块原始数据按页聚合，
+# 配合页缓冲把大量零散的属性、数据集元数据写入合并为整页写出 (需要 HDF5 1.10.1+)
+OUTPUT_FS_PAGE_SIZE = 4096
+OUTPUT_PAGE_BUF_SIZE = 16 * 1024 * 1024
+# 裁剪结果超过该大小的多维数据集沿额外维度分片 (slab) 流式读写，不整体载入内存 (512 MB)
+STREAM_MIN_BYTES = 512 * 1024 * 1024
+# 流式读写时单个 slab 的目标大小 (64 MB)
+STREAM_SLAB_BYTES = 64 * 1024 * 1024
 
 
 class HDF5CropperError(Exception):
@@ -31,6 +67,97 @@ class HDF5CropperError(Exception):
     pass
 
 
+def range_mask(values: np.ndarray, low: float, high: float,
+               out: np.ndarray, scratch: np.ndarray) -> np.ndarray:
+    """
+    计算 low <= values <= high 的布尔掩码，结果写入 out，比较结果复用 scratch 缓冲区，
+    不分配新的与坐标数组同样大小的临时数组
+
+    Returns:
+        out
+    """
+    np.greater_equal(values, low, out=out)
+    np.less_equal(values, high, out=scratch)
+    np.logical_and(out, scratch, out=out)
+    return out
+
+
+def ranges_mask(values: np.ndarray, ranges: List[Tuple[float, float]],
+                out: np.ndarray, scratch: np.ndarray) -> np.ndarray:
+    """
+    计算 values 落在任一 [low, high] 区间内的布尔掩码 (如跨越180度经线时的两段经度)，
+    结果写入 out，多个区间按位或合并
+
+    Returns:
+        out
+    """
+    range_buffer = np.empty_like(out) if len(ranges) > 1 else None
+    for i, (low, high) in enumerate(ranges):
+        if i == 0:
+            range_mask(values, low, high, out, scratch)
+        else:
+            range_mask(values, low, high, range_buffer, scratch)
+            np.logical_or(out, range_buffer, out=out)
+    return out
+
+
+def as_slice(indices: np.ndarray) -> Union[slice, np.ndarray]:
+    """
+    升序无重复的索引若构成连续区间 (包括覆盖整个维度的情况)，转换为等价的 slice，
+    以基本切片代替高级索引；不连续时原样返回
+
+    Args:
+        indices: 升序的索引数组
+
+    Returns:
+        slice 或原索引数组
+    """
+    indices = np.asarray(indices)
+    if len(indices) == 0:
+        return indices
+    lo, hi = int(indices[0]), int(indices[-1])
+    if len(indices) == hi - lo + 1:
+        return slice(lo, hi + 1)
+    return indices
+
+
+def grid_selection(lat_indices: np.ndarray, lon_indices: np.ndarray) -> tuple:
+    """
+    返回二维经纬度网格的 (纬度, 经度) 选择元组：连续的一侧使用 slice，
+    两侧都不连续时才退回 np.ix_ 外积索引
+    """
+    lat_sel, lon_sel = as_slice(lat_indices), as_slice(lon_indices)
+    if isinstance(lat_sel, slice) or isinstance(lon_sel, slice):
+        return lat_sel, lon_sel
+    return np.ix_(lat_sel, lon_sel)
+
+
+def compute_chunk_shape(shape: Tuple[int, ...], itemsize: int,
+                        spatial_dims: Tuple[int, ...]) -> Optional[Tuple[int, ...]]:
+    """
+    计算输出数据集的 chunk 形状：非空间维度保持完整，经纬度维度等比缩小，
+    使单个 chunk 约为 OUTPUT_CHUNK_BYTES
+
+    Args:
+        shape: 数据形状
+        itemsize: 单个元素字节数
+        spatial_dims: 经纬度所在的维度
+
+    Returns:
+        chunk 形状；标量或空数据集返回 None (由 h5py 决定存储方式)
+    """
+    if not shape or 0 in shape:
+        return None
+    spatial_dims = tuple(sorted(set(spatial_dims)))
+    extra_size = int(np.prod([n for i, n in enumerate(shape) if i not in spatial_dims]))
+    elements = max(1.0, OUTPUT_CHUNK_BYTES / itemsize / max(extra_size, 1))
+    side = max(1, int(elements ** (1.0 / len(spatial_dims))))
+    chunks = list(shape)
+    for dim in spatial_dims:
+        chunks[dim] = min(shape[dim], side)
+    return tuple(chunks)
+
+
 class HDF5Inspector:
     """HDF5文件结构检查器"""
 
@@ -87,6 +214,36 @@ class HDF5Inspector:
 class AttributeCopier:
     """HDF5属性复制器"""
 
+    @staticmethod
+    def _copy_attributes(source: Union[h5py.Group, h5py.Dataset], target: Union[h5py.Group, h5py.Dataset],
+                         warn) -> int:
+        """
+        复制全部属性：先一次性读取源属性并批量写入；有属性写入失败时逐个重试，跳过无法复制的属性
+
+        Args:
+            source: 源对象
+            target: 目标对象
+            warn: 单个属性复制失败时的回调 warn(attr_name, error)
+
+        Returns:
+            复制的属性数量
+        """
+        items = dict(source.attrs.items())
+        try:
+            target.attrs.update(items)
+            return len(items)
+        except Exception:
+            pass
+
+        copied_count = 0
+        for attr_name, attr_value in items.items():
+            try:
+                target.attrs[attr_name] = attr_value
+                copied_count += 1
+            except Exception as e:
+                warn(attr_name, e)
+        return copied_count
+
     @staticmethod
     def copy_group_attributes(source_group: h5py.Group, target_group: h5py.Group,
                               logger: Optional[logging.Logger] = None) -> int:
@@ -101,16 +258,13 @@ class AttributeCopier:
         Returns:
             复制的属性数量
         """
-        copied_count = 0
-        for attr_name, attr_value in source_group.attrs.items():
-            try:
-                target_group.attrs[attr_name] = attr_value
-                copied_count += 1
-            except Exception as e:
-                if logger:
-                    logger.warning(f"无法复制组属性 '{attr_name}': {e}")
-                else:
-                    print(f"警告: 无法复制组属性 '{attr_name}': {e}")
+        def warn(attr_name, e):
+            if logger:
+                logger.warning(f"无法复制组属性 '{attr_name}': {e}")
+            else:
+                print(f"警告: 无法复制组属性 '{attr_name}': {e}")
+
+        copied_count = AttributeCopier._copy_attributes(source_group, target_group, warn)
 
         if logger and copied_count > 0:
             logger.info(f"已复制组的 {copied_count} 个属性")
@@ -126,11 +280,10 @@ class AttributeCopier:
             source_dataset: 源数据集
             target_dataset: 目标数据集
         """
-        for attr_name, attr_value in source_dataset.attrs.items():
-            try:
-                target_dataset.attrs[attr_name] = attr_value
-            except Exception as e:
-                print(f"警告: 无法复制属性 '{attr_name}': {e}")
+        def warn(attr_name, e):
+            print(f"警告: 无法复制属性 '{attr_name}': {e}")
+
+        AttributeCopier._copy_attributes(source_dataset, target_dataset, warn)
 
 
 class GroupManager:
@@ -164,20 +317,23 @@ class GroupManager:
             if part:  # 跳过空字符串
                 current_path = current_path + '/' + part if current_path else part
 
-                if current_path not in current_group:
+                # get 只做一次链接查找，代替 in 判断后再 __getitem__
+                existing_group = current_group.get(part)
+                if existing_group is None:
                     # 创建新组
                     new_group = current_group.create_group(part)
                     if logger:
                         logger.info(f"创建组: {current_path}")
 
                     # 如果源文件存在，复制组属性
-                    if source_file and current_path in source_file:
-                        AttributeCopier.copy_group_attributes(source_file[current_path], new_group, logger)
+                    source_group = source_file.get(current_path) if source_file else None
+                    if source_group is not None:
+                        AttributeCopier.copy_group_attributes(source_group, new_group, logger)
 
                     current_group = new_group
                 else:
                     # 组已存在，移动到该组
-                    current_group = current_group[part]
+                    current_group = existing_group
                     if logger:
                         logger.info(f"使用现有组: {current_path}")
 
@@ -190,7 +346,7 @@ class DimensionAnalyzer:
     @staticmethod
     def find_lat_lon_dimensions(lat_data: np.ndarray, lon_data: np.ndarray,
                                 data_shape: Tuple[int, ...]) -> Tuple[
-        Optional[int], Optional[int], bool, Optional[List[int]]]:
+        Optional[int], Optional[int], bool, Optional[Tuple[int, ...]]]:
         """
         智能识别经纬度在数据集中的维度位置
         支持多维2D网格数据的处理
@@ -203,8 +359,17 @@ class DimensionAnalyzer:
         Returns:
             (lat_dim, lon_dim, is_2d_grid, extra_dims)
         """
-        lat_shape = lat_data.shape
-        lon_shape = lon_data.shape
+        return DimensionAnalyzer.find_dimensions_by_shape(lat_data.shape, lon_data.shape, tuple(data_shape))
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def find_dimensions_by_shape(lat_shape: Tuple[int, ...], lon_shape: Tuple[int, ...],
+                                 data_shape: Tuple[int, ...]) -> Tuple[
+        Optional[int], Optional[int], bool, Optional[Tuple[int, ...]]]:
+        """
+        按形状识别经纬度维度。结果只取决于三个形状，在进程内缓存：同一产品的文件
+        形状一致，任务进程中后续裁剪的数据集无需重复分析。额外维度以元组返回，缓存结果不可变
+        """
 
         # 如果经纬度是1D数组
         if len(lat_shape) == 1 and len(lon_shape) == 1:
@@ -239,7 +404,7 @@ class DimensionAnalyzer:
 
             if matching_dims:
                 lat_dim, lon_dim = matching_dims[0]
-                return lat_dim, lon_dim, True, extra_dims  # True表示是2D网格，extra_dims是额外维度
+                return lat_dim, lon_dim, True, tuple(extra_dims)  # True表示是2D网格，extra_dims是额外维度
 
             # 如果没有找到连续的匹配维度，尝试分别匹配
             lat_dim = None
@@ -251,7 +416,7 @@ class DimensionAnalyzer:
                     lon_dim = i
 
             if lat_dim is not None and lon_dim is not None:
-                extra_dims = [i for i in range(len(data_shape)) if i not in [lat_dim, lon_dim]]
+                extra_dims = tuple(i for i in range(len(data_shape)) if i not in {lat_dim, lon_dim})
                 return lat_dim, lon_dim, True, extra_dims
 
         return None, None, False, None
@@ -261,14 +426,62 @@ class DataCropper:
     """数据裁剪器"""
 
     @staticmethod
-    def crop_multidim_2d_grid(data: np.ndarray, lat_indices: np.ndarray, lon_indices: np.ndarray,
-                              lat_dim: int, lon_dim: int, extra_dims: List[int],
+    def read_bbox(dataset: h5py.Dataset, lat_dim: int, lon_dim: int,
+                  lat_indices: np.ndarray, lon_indices: np.ndarray,
+                  extra_selection: Optional[Dict[int, slice]] = None) -> np.ndarray:
+        """
+        按经纬度索引的外接矩形读取超平面 (hyperslab)，HDF5 只解压与裁剪范围相交的 chunk
+
+        Args:
+            dataset: 源数据集
+            lat_dim: 纬度维度位置
+            lon_dim: 经度维度位置
+            lat_indices: 升序的纬度索引
+            lon_indices: 升序的经度索引
+            extra_selection: 额外维度的切片 {维度: slice}，用于分片读取，默认读取完整维度
+
+        Returns:
+            裁剪后的数据，索引不连续时在内存中对外接矩形重新取子集
+        """
+        lat_indices = np.asarray(lat_indices)
+        lon_indices = np.asarray(lon_indices)
+        lat_lo, lat_hi = int(lat_indices[0]), int(lat_indices[-1])
+        lon_lo, lon_hi = int(lon_indices[0]), int(lon_indices[-1])
+
+        selection = [slice(None)] * dataset.ndim
+        shape = list(dataset.shape)
+        for dim, dim_slice in (extra_selection or {}).items():
+            selection[dim] = dim_slice
+            shape[dim] = len(range(*dim_slice.indices(dataset.shape[dim])))
+        selection[lat_dim] = slice(lat_lo, lat_hi + 1)
+        selection[lon_dim] = slice(lon_lo, lon_hi + 1)
+        shape[lat_dim] = lat_hi - lat_lo + 1
+        shape[lon_dim] = lon_hi - lon_lo + 1
+        selection = tuple(selection)
+
+        if dataset.dtype.kind in 'biuf':
+            # 数值类型直接由 HDF5 写入预分配的缓冲区，跳过 h5py 高层选择与中间数组
+            data = np.empty(shape, dtype=dataset.dtype)
+            dataset.read_direct(data, source_sel=selection)
+        else:
+            data = dataset[selection]
+
+        # 升序且无重复的索引，个数等于跨度时即为连续区间，无需重新取子集
+        if len(lat_indices) != lat_hi - lat_lo + 1:
+            data = np.take(data, lat_indices - lat_lo, axis=lat_dim)
+        if len(lon_indices) != lon_hi - lon_lo + 1:
+            data = np.take(data, lon_indices - lon_lo, axis=lon_dim)
+        return data
+
+    @staticmethod
+    def crop_multidim_2d_grid(dataset: h5py.Dataset, lat_indices: np.ndarray, lon_indices: np.ndarray,
+                              lat_dim: int, lon_dim: int, extra_dims: Tuple[int, ...],
                               logger: logging.Logger) -> np.ndarray:
         """
-        对多维2D网格数据进行裁剪
+        对多维2D网格数据进行裁剪：只读取经纬度外接矩形对应的超平面，额外维度保持完整
 
         Args:
-            data: 原始数据数组
+            dataset: 源数据集
             lat_indices: 纬度索引
             lon_indices: 经度索引
             lat_dim: 纬度维度位置
@@ -279,37 +492,11 @@ class DataCropper:
         Returns:
             裁剪后的数据
         """
-        data_shape = data.shape
-        logger.info(f"处理多维2D网格数据，原始形状: {data_shape}")
+        logger.info(f"处理多维2D网格数据，原始形状: {dataset.shape}")
         logger.info(f"纬度维度: {lat_dim}, 经度维度: {lon_dim}, 额外维度: {extra_dims}")
         logger.info(f"纬度索引数量: {len(lat_indices)}, 经度索引数量: {len(lon_indices)}")
 
-        # 对于多维2D网格数据，需要特别处理索引
-        if len(data_shape) == 3 and lat_dim == 0 and lon_dim == 1:
-            # 最常见的情况：(lat, lon, other_dim)
-            cropped_data = data[np.ix_(lat_indices, lon_indices, range(data_shape[2]))]
-        elif len(data_shape) == 3:
-            # 其他三维情况，根据维度位置构建索引
-            indices = [slice(None)] * len(data_shape)
-            indices[lat_dim] = lat_indices
-            indices[lon_dim] = lon_indices
-
-            # 对于额外维度，保持完整
-            for dim in extra_dims:
-                indices[dim] = slice(None)
-
-            cropped_data = data[tuple(indices)]
-        else:
-            # 通用多维情况
-            indices = [slice(None)] * len(data_shape)
-            indices[lat_dim] = lat_indices
-            indices[lon_dim] = lon_indices
-
-            # 对于额外维度，保持完整
-            for dim in extra_dims:
-                indices[dim] = slice(None)
-
-            cropped_data = data[tuple(indices)]
+        cropped_data = DataCropper.read_bbox(dataset, lat_dim, lon_dim, lat_indices, lon_indices)
 
         logger.info(f"裁剪后形状: {cropped_data.shape}")
         return cropped_data
@@ -318,15 +505,66 @@ class DataCropper:
 class HDF5Cropper:
     """HDF5文件裁剪器主类"""
 
-    def __init__(self, verbose: bool = False):
+    def __init__(self, verbose: bool = False, compression: str = 'gzip'):
         """
         初始化HDF5裁剪器
 
         Args:
             verbose: 是否显示详细日志
+            compression: 输出压缩方式。'gzip' (默认，DEFLATE 级别 4，任何 HDF5 工具均可读取)；
+                         'blosc2' (Blosc2 + Zstd + Bitshuffle，压缩更快，读取端需要安装 hdf5plugin)
         """
         self.verbose = verbose
         self.logger = self._setup_logger()
+        self.compression_args = self._get_compression_args(compression)
+        # (组路径, 数据集名称) -> 数据集对象，同一文件中每个名称只查找一次
+        self._dataset_cache = {}
+
+    @staticmethod
+    def _get_compression_args(compression: str) -> Dict[str, Any]:
+        """返回 create_dataset 使用的压缩参数"""
+        if compression == 'gzip':
+            return {'compression': 'gzip', 'compression_opts': 4}
+        if compression == 'blosc2':
+            if hdf5plugin is None:
+                raise HDF5CropperError("使用 Blosc2 压缩需要安装 hdf5plugin")
+            return dict(hdf5plugin.Blosc2(cname='zstd', clevel=3, filters=hdf5plugin.Blosc2.BITSHUFFLE))
+        raise HDF5CropperError(f"不支持的压缩方式: {compression}，可选: {COMPRESSION_CHOICES}")
+
+    @staticmethod
+    def _write_gzip_chunks(dataset: h5py.Dataset, data: np.ndarray) -> None:
+        """
+        多线程压缩并直接写入 gzip chunk
+
+        h5py 的所有 HDF5 调用共用一把全局锁，按数据集开线程并不能让读取或过滤器管线并行；
+        这里在线程中调用 zlib (压缩期间释放 GIL) 生成与 HDF5 deflate 过滤器相同格式的数据，
+        再由当前线程通过 write_direct_chunk 顺序写入。边界 chunk 用 0 (默认填充值) 补齐到完整形状。
+        """
+        chunks = dataset.chunks
+        level = dataset.compression_opts
+
+        def compress(offset):
+            block = data[tuple(slice(o, o + c) for o, c in zip(offset, chunks))]
+            if block.shape != chunks:
+                padded = np.zeros(chunks, dtype=data.dtype)
+                padded[tuple(slice(0, n) for n in block.shape)] = block
+                block = padded
+            return offset, zlib.compress(np.ascontiguousarray(block), level)
+
+        offsets = itertools.product(*[range(0, n, c) for n, c in zip(data.shape, chunks)])
+        with ThreadPoolExecutor(max_workers=COMPRESSION_THREADS) as executor:
+            for offset, payload in executor.map(compress, offsets):
+                dataset.id.write_direct_chunk(offset, payload)
+
+    def _storage_args(self, data: np.ndarray, spatial_dims: Tuple[int, ...]) -> Dict[str, Any]:
+        """
+        返回 create_dataset 的存储参数：小数据集 (如一维经纬度) 压缩收益不抵过滤器开销，
+        直接连续存储；其余按经纬度维度分块并压缩
+        """
+        chunks = compute_chunk_shape(data.shape, data.dtype.itemsize, spatial_dims)
+        if chunks is None or data.nbytes < COMPRESSION_MIN_BYTES:
+            return {}
+        return dict(self.compression_args, chunks=chunks)
 
     def _setup_logger(self) -> logging.Logger:
         """设置日志记录器"""
@@ -424,7 +662,11 @@ class HDF5Cropper:
         Path(output_hdf).parent.mkdir(parents=True, exist_ok=True)
 
         try:
-            with h5py.File(input_hdf, 'r') as fin, h5py.File(output_hdf, 'w') as fout:
+            with h5py.File(input_hdf, 'r') as fin, \
+                    h5py.File(output_hdf, 'w', libver=OUTPUT_LIBVER,
+                              fs_strategy='page', fs_page_size=OUTPUT_FS_PAGE_SIZE,
+                              page_buf_size=OUTPUT_PAGE_BUF_SIZE,
+                              rdcc_nbytes=OUTPUT_RDCC_NBYTES, rdcc_nslots=OUTPUT_RDCC_NSLOTS) as fout:
                 self._process_file(fin, fout, lat_min, lat_max, lon_ranges,
                                    lat_var, lon_var, data_vars, data_group, latlon_group)
 
@@ -441,6 +683,8 @@ class HDF5Cropper:
                       data_vars: Optional[List[str]], data_group: Optional[str],
                       latlon_group: Optional[str]) -> None:
         """处理文件的内部方法"""
+        self._dataset_cache = {}
+
         # 复制全局属性
         root_attrs_count = AttributeCopier.copy_group_attributes(fin, fout, self.logger)
         self.logger.info(f"已复制根级别的 {root_attrs_count} 个属性")
@@ -460,14 +704,16 @@ class HDF5Cropper:
             output_latlon_group = GroupManager.create_hierarchy(fout, latlon_group, fin, self.logger)
             input_latlon_group = fin[latlon_group]
 
-        # 检查经纬度变量
-        if lat_var not in input_latlon_group or lon_var not in input_latlon_group:
+        # 检查经纬度变量：数据集对象只打开一次，读取数据和复制属性都复用同一句柄
+        lat_dataset = input_latlon_group.get(lat_var)
+        lon_dataset = input_latlon_group.get(lon_var)
+        if lat_dataset is None or lon_dataset is None:
             available_vars = list(input_latlon_group.keys())
             raise HDF5CropperError(f"找不到经纬度变量: {lat_var} 或 {lon_var}. 可用变量: {available_vars}")
 
         # 读取经纬度数据
-        lats = input_latlon_group[lat_var][:]
-        lons = input_latlon_group[lon_var][:]
+        lats = lat_dataset[:]
+        lons = lon_dataset[:]
 
         self.logger.info(f"经纬度数据形状: lat={lats.shape}, lon={lons.shape}")
 
@@ -479,7 +725,7 @@ class HDF5Cropper:
         # 处理经纬度数据
         self._process_coordinates(
             lats, lons, lat_indices, all_lon_indices, is_2d_grid,
-            lat_var, lon_var, input_latlon_group, output_latlon_group
+            lat_var, lon_var, lat_dataset, lon_dataset, output_latlon_group
         )
 
         # 处理数据集
@@ -489,46 +735,49 @@ class HDF5Cropper:
         )
 
     def _get_indices(self, lats: np.ndarray, lons: np.ndarray, lat_min: float, lat_max: float,
-                     lon_ranges: List[Tuple[float, float]]) -> Tuple[np.ndarray, List[int], bool]:
-        """获取经纬度索引"""
-        # 过滤填充值
-        fill_value = -9999.9
-        valid_lats = lats[lats > fill_value]
-        valid_lons = lons[lons > fill_value]
-
-        if valid_lats.size > 0 and valid_lons.size > 0:
-            self.logger.info(f"文件的有效纬度范围: {np.min(valid_lats)}°N - {np.max(valid_lats)}°N")
-            self.logger.info(f"文件的有效经度范围: {np.min(valid_lons)}°E - {np.max(valid_lons)}°E")
+                     lon_ranges: List[Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray, bool]:
+        """获取经纬度索引，返回的纬度、经度索引均为升序、无重复的整数数组"""
+        # 有效范围仅用于日志，未启用 INFO 日志时跳过过滤和求最值
+        if self.logger.isEnabledFor(logging.INFO):
+            # 过滤填充值
+            fill_value = -9999.9
+            valid_lats = lats[lats > fill_value]
+            valid_lons = lons[lons > fill_value]
+
+            if valid_lats.size > 0 and valid_lons.size > 0:
+                self.logger.info(f"文件的有效纬度范围: {np.min(valid_lats)}°N - {np.max(valid_lats)}°N")
+                self.logger.info(f"文件的有效经度范围: {np.min(valid_lons)}°E - {np.max(valid_lons)}°E")
 
         # 找到符合条件的索引
         if lats.ndim == 1 and lons.ndim == 1:
-            # 1D经纬度数组
-            lat_indices = np.where((lats >= lat_min) & (lats <= lat_max))[0]
-
-            all_lon_indices = []
-            for lon_min_range, lon_max_range in lon_ranges:
-                lon_indices = np.where((lons >= lon_min_range) & (lons <= lon_max_range))[0]
-                if len(lon_indices) > 0:
-                    all_lon_indices.extend(lon_indices)
-            all_lon_indices = sorted(set(all_lon_indices))
+            # 1D经纬度数组：掩码写入预分配的缓冲区，多个经度区间按位或合并，
+            # np.flatnonzero 直接得到升序、无重复的索引
+            lat_mask = np.empty(lats.shape, dtype=bool)
+            range_mask(lats, lat_min, lat_max, lat_mask, np.empty_like(lat_mask))
+            lat_indices = np.flatnonzero(lat_mask)
+
+            lon_mask = np.empty(lons.shape, dtype=bool)
+            ranges_mask(lons, lon_ranges, lon_mask, np.empty_like(lon_mask))
+            all_lon_indices = np.flatnonzero(lon_mask)
             is_2d_grid = False
 
         elif lats.ndim == 2 and lons.ndim == 2:
-            # 2D经纬度网格
-            lat_mask = (lats >= lat_min) & (lats <= lat_max)
+            # 2D经纬度网格：所有比较结果写入预分配的缓冲区，避免逐步生成多个网格大小的临时数组
+            combined_mask = np.empty(lats.shape, dtype=bool)
+            scratch = np.empty_like(combined_mask)
+            range_mask(lats, lat_min, lat_max, combined_mask, scratch)
 
-            lon_mask = np.zeros_like(lats, dtype=bool)
-            for lon_min_range, lon_max_range in lon_ranges:
-                lon_mask |= (lons >= lon_min_range) & (lons <= lon_max_range)
+            lon_mask = ranges_mask(lons, lon_ranges, np.empty_like(combined_mask), scratch)
 
-            combined_mask = lat_mask & lon_mask
+            np.logical_and(combined_mask, lon_mask, out=combined_mask)
 
-            if not np.any(combined_mask):
+            # 按行/列归约得到包含有效点的行列索引 (已升序、无重复)，无需 np.where 展开坐标再排序去重
+            row_any = combined_mask.any(axis=1)
+            if not row_any.any():
                 raise HDF5CropperError("在指定范围内没有找到符合条件的点")
 
-            valid_rows, valid_cols = np.where(combined_mask)
-            lat_indices = np.unique(valid_rows)
-            all_lon_indices = np.unique(valid_cols)
+            lat_indices = np.flatnonzero(row_any)
+            all_lon_indices = np.flatnonzero(combined_mask.any(axis=0))
             is_2d_grid = True
 
         else:
@@ -544,17 +793,18 @@ class HDF5Cropper:
         return lat_indices, all_lon_indices, is_2d_grid
 
     def _process_coordinates(self, lats: np.ndarray, lons: np.ndarray,
-                             lat_indices: np.ndarray, all_lon_indices: List[int], is_2d_grid: bool,
-                             lat_var: str, lon_var: str, input_latlon_group: h5py.Group,
+                             lat_indices: np.ndarray, all_lon_indices: np.ndarray, is_2d_grid: bool,
+                             lat_var: str, lon_var: str, lat_dataset: h5py.Dataset, lon_dataset: h5py.Dataset,
                              output_latlon_group: h5py.Group) -> None:
         """处理经纬度坐标"""
         # 裁剪经纬度数据
         if is_2d_grid:
-            cropped_lats = lats[np.ix_(lat_indices, all_lon_indices)]
-            cropped_lons = lons[np.ix_(lat_indices, all_lon_indices)]
+            selection = grid_selection(lat_indices, all_lon_indices)
+            cropped_lats = lats[selection]
+            cropped_lons = lons[selection]
         else:
-            cropped_lats = lats[lat_indices]
-            cropped_lons = lons[all_lon_indices]
+            cropped_lats = lats[as_slice(lat_indices)]
+            cropped_lons = lons[as_slice(all_lon_indices)]
 
         # 创建数据集
         if lat_var in output_latlon_group:
@@ -562,53 +812,70 @@ class HDF5Cropper:
         if lon_var in output_latlon_group:
             del output_latlon_group[lon_var]
 
-        lat_dataset = output_latlon_group.create_dataset(
-            lat_var, data=cropped_lats, compression='gzip', compression_opts=4
+        new_lat_dataset = output_latlon_group.create_dataset(
+            lat_var, data=cropped_lats, **self._storage_args(cropped_lats, tuple(range(cropped_lats.ndim)))
         )
-        lon_dataset = output_latlon_group.create_dataset(
-            lon_var, data=cropped_lons, compression='gzip', compression_opts=4
+        new_lon_dataset = output_latlon_group.create_dataset(
+            lon_var, data=cropped_lons, **self._storage_args(cropped_lons, tuple(range(cropped_lons.ndim)))
         )
 
         # 复制属性
-        AttributeCopier.copy_dataset_attributes(input_latlon_group[lat_var], lat_dataset)
-        AttributeCopier.copy_dataset_attributes(input_latlon_group[lon_var], lon_dataset)
+        AttributeCopier.copy_dataset_attributes(lat_dataset, new_lat_dataset)
+        AttributeCopier.copy_dataset_attributes(lon_dataset, new_lon_dataset)
 
-        self.logger.info(f"已复制纬度变量 '{lat_var}' 的 {len(input_latlon_group[lat_var].attrs)} 个属性")
-        self.logger.info(f"已复制经度变量 '{lon_var}' 的 {len(input_latlon_group[lon_var].attrs)} 个属性")
+        self.logger.info(f"已复制纬度变量 '{lat_var}' 的 {len(lat_dataset.attrs)} 个属性")
+        self.logger.info(f"已复制经度变量 '{lon_var}' 的 {len(lon_dataset.attrs)} 个属性")
 
     def _process_datasets(self, input_data_group: h5py.Group, output_data_group: h5py.Group,
                           data_vars: Optional[List[str]], lats: np.ndarray, lons: np.ndarray,
-                          lat_indices: np.ndarray, all_lon_indices: List[int], is_2d_grid: bool,
+                          lat_indices: np.ndarray, all_lon_indices: np.ndarray, is_2d_grid: bool,
                           lat_var: str, lon_var: str, data_group: Optional[str]) -> None:
         """处理数据集"""
         processed_datasets = 0
         skipped_datasets = 0
 
-        # 如果未指定数据集，则处理所有可能的数据集
+        # 构建数据集清单 [(名称, 数据集对象)]：未指定数据集时一次遍历组内链接，
+        # 直接得到数据集对象，后续不再按名称逐个查找
         if data_vars is None:
-            data_vars = []
-            for name in input_data_group:
-                if name in [lat_var, lon_var]:
-                    continue
-                obj = input_data_group[name]
-                if isinstance(obj, h5py.Dataset):
-                    data_vars.append(name)
+            coordinate_vars = {lat_var, lon_var}
+            manifest = [(name, obj) for name, obj in input_data_group.items()
+                        if name not in coordinate_vars and isinstance(obj, h5py.Dataset)]
+        else:
+            manifest = [(var_name, self._get_dataset(input_data_group, var_name))
+                        for var_name in data_vars]
 
-        for var_name in data_vars:
+        for var_name, dataset in manifest:
             try:
-                dataset = self._get_dataset(input_data_group, var_name, data_group)
                 if dataset is None:
                     self.logger.warning(f"数据集 '{var_name}' 不存在，跳过")
                     skipped_datasets += 1
                     continue
 
-                cropped_data = self._crop_dataset(dataset, lats, lons, lat_indices, all_lon_indices, is_2d_grid,
-                                                  var_name)
+                dimensions = self._analyze_dataset(dataset, lats, lons, var_name)
+                if dimensions is None:
+                    skipped_datasets += 1
+                    continue
+
+                if self._can_copy_chunks(dataset, dimensions, lat_indices, all_lon_indices):
+                    self._copy_chunks(output_data_group, var_name, dataset, data_group, dimensions,
+                                      lat_indices, all_lon_indices)
+                    processed_datasets += 1
+                    continue
+
+                if self._should_stream(dataset, dimensions, lat_indices, all_lon_indices):
+                    self._stream_dataset(output_data_group, var_name, dataset, data_group, dimensions,
+                                         lat_indices, all_lon_indices)
+                    processed_datasets += 1
+                    continue
+
+                cropped_data = self._crop_dataset(dataset, dimensions, lat_indices, all_lon_indices, var_name)
                 if cropped_data is None:
                     skipped_datasets += 1
                     continue
 
-                self._save_dataset(output_data_group, var_name, cropped_data, dataset, data_group)
+                lat_dim, lon_dim = dimensions[:2]
+                self._save_dataset(output_data_group, var_name, cropped_data, dataset, data_group,
+                                   (lat_dim, lon_dim))
                 processed_datasets += 1
 
             except Exception as e:
@@ -618,34 +885,35 @@ class HDF5Cropper:
         self.logger.info(f"处理完成! 总数据集数: {processed_datasets + skipped_datasets}, "
                          f"成功: {processed_datasets}, 跳过: {skipped_datasets}")
 
-    def _get_dataset(self, input_data_group: h5py.Group, var_name: str,
-                     data_group: Optional[str]) -> Optional[h5py.Dataset]:
-        """获取数据集"""
-        # 处理绝对路径和相对路径
-        if data_group is not None and not var_name.startswith(data_group):
-            full_var_name = f"{data_group}/{var_name}"
-        else:
-            full_var_name = var_name
-
-        if var_name in input_data_group:
-            return input_data_group[var_name]
-        return None
-
-    def _crop_dataset(self, dataset: h5py.Dataset, lats: np.ndarray, lons: np.ndarray,
-                      lat_indices: np.ndarray, all_lon_indices: List[int], is_2d_grid: bool,
-                      var_name: str) -> Optional[np.ndarray]:
-        """裁剪数据集"""
+    def _get_dataset(self, input_data_group: h5py.Group, var_name: str) -> Optional[h5py.Dataset]:
+        """获取数据集，不存在时返回 None；查找结果按 (组路径, 名称) 缓存"""
+        cache_key = (input_data_group.name, var_name)
+        if cache_key not in self._dataset_cache:
+            # get 只做一次链接查找，代替 in 判断后再 __getitem__ 的两次查找
+            self._dataset_cache[cache_key] = input_data_group.get(var_name)
+        return self._dataset_cache[cache_key]
+
+    def _analyze_dataset(self, dataset: h5py.Dataset, lats: np.ndarray, lons: np.ndarray,
+                         var_name: str) -> Optional[Tuple[int, int, bool, Tuple[int, ...]]]:
+        """识别数据集的经纬度维度，返回 (纬度维度, 经度维度, 是否2D网格, 额外维度)，无法识别时返回 None"""
         data_shape = dataset.shape
         self.logger.info(f"处理数据集 '{var_name}', 形状: {data_shape}")
 
-        # 智能识别经纬度维度
-        lat_dim, lon_dim, is_data_2d_grid, extra_dims = DimensionAnalyzer.find_lat_lon_dimensions(
-            lats, lons, data_shape
-        )
+        # 智能识别经纬度维度（结果只取决于形状，由 DimensionAnalyzer 按形状缓存）
+        dimensions = DimensionAnalyzer.find_lat_lon_dimensions(lats, lons, data_shape)
+        lat_dim, lon_dim = dimensions[:2]
 
         if lat_dim is None or lon_dim is None:
             self.logger.warning(f"无法识别数据集 '{var_name}' 中的经纬度维度，跳过")
             return None
+        return dimensions
+
+    def _crop_dataset(self, dataset: h5py.Dataset, dimensions: Tuple[int, int, bool, Tuple[int, ...]],
+                      lat_indices: np.ndarray, all_lon_indices: np.ndarray,
+                      var_name: str) -> Optional[np.ndarray]:
+        """按维度识别结果裁剪数据集，维度结构不支持时返回 None"""
+        data_shape = dataset.shape
+        lat_dim, lon_dim, is_data_2d_grid, extra_dims = dimensions
 
         # 根据数据类型进行裁剪
         if is_data_2d_grid:
@@ -653,22 +921,19 @@ class HDF5Cropper:
                 # 多维2D网格数据
                 self.logger.info(f"检测到多维2D网格数据，额外维度数量: {len(extra_dims)}")
                 cropped_data = DataCropper.crop_multidim_2d_grid(
-                    dataset[:], lat_indices, all_lon_indices,
+                    dataset, lat_indices, all_lon_indices,
                     lat_dim, lon_dim, extra_dims, self.logger
                 )
             else:
                 # 纯2D网格数据
                 if len(data_shape) == 2:
-                    cropped_data = dataset[:][np.ix_(lat_indices, all_lon_indices)]
+                    cropped_data = DataCropper.read_bbox(dataset, lat_dim, lon_dim, lat_indices, all_lon_indices)
                 else:
                     self.logger.warning(f"数据集 '{var_name}' 的维度结构不支持，跳过")
                     return None
         else:
             # 1D数组情况
-            indices = [slice(None)] * len(data_shape)
-            indices[lat_dim] = lat_indices
-            indices[lon_dim] = all_lon_indices
-            cropped_data = dataset[tuple(indices)]
+            cropped_data = DataCropper.read_bbox(dataset, lat_dim, lon_dim, lat_indices, all_lon_indices)
 
         self.logger.info(f"成功处理数据集 '{var_name}', 裁剪后形状: {cropped_data.shape}")
 
@@ -677,21 +942,168 @@ class HDF5Cropper:
 
         return cropped_data
 
-    def _save_dataset(self, output_data_group: h5py.Group, var_name: str,
-                      cropped_data: np.ndarray, original_dataset: h5py.Dataset,
-                      data_group: Optional[str]) -> None:
-        """保存数据集"""
+    @staticmethod
+    def _should_stream(dataset: h5py.Dataset, dimensions: Tuple[int, int, bool, Tuple[int, ...]],
+                       lat_indices: np.ndarray, all_lon_indices: np.ndarray) -> bool:
+        """裁剪结果超过 STREAM_MIN_BYTES 的多维2D网格数据集改为分片流式处理"""
+        lat_dim, lon_dim, is_data_2d_grid, extra_dims = dimensions
+        if not is_data_2d_grid or not extra_dims:
+            return False
+        extra_size = int(np.prod([dataset.shape[dim] for dim in extra_dims]))
+        nbytes = extra_size * len(lat_indices) * len(all_lon_indices) * dataset.dtype.itemsize
+        return nbytes > STREAM_MIN_BYTES
+
+    def _stream_dataset(self, output_data_group: h5py.Group, var_name: str, dataset: h5py.Dataset,
+                        data_group: Optional[str], dimensions: Tuple[int, int, bool, Tuple[int, ...]],
+                        lat_indices: np.ndarray, all_lon_indices: np.ndarray) -> None:
+        """
+        沿最长的额外维度按 chunk 对齐的分片读取、裁剪并写出，内存占用只与单个分片有关，
+        可以处理大于内存的数据集。输出数据集按最终形状预先创建，其 chunk 在该维度上与分片等长，
+        每个分片恰好写满整数个输出 chunk
+        """
+        lat_dim, lon_dim, _, extra_dims = dimensions
+        axis = max(extra_dims, key=lambda dim: dataset.shape[dim])
+        length = dataset.shape[axis]
+
+        out_shape = list(dataset.shape)
+        out_shape[lat_dim] = len(lat_indices)
+        out_shape[lon_dim] = len(all_lon_indices)
+        itemsize = dataset.dtype.itemsize
+        unit_bytes = max(1, int(np.prod(out_shape)) // length * itemsize)
+
+        # 分片长度取源 chunk 在该维度上的整数倍，每个源 chunk 只解压一次
+        source_step = dataset.chunks[axis] if dataset.chunks else 1
+        step = source_step * max(1, STREAM_SLAB_BYTES // (unit_bytes * source_step))
+        step = min(step, length)
+
+        slab_shape = list(out_shape)
+        slab_shape[axis] = step
+        chunks = compute_chunk_shape(tuple(slab_shape), itemsize, (lat_dim, lon_dim))
+
+        rel_var_name = self._release_output_name(output_data_group, var_name, data_group)
+        new_dataset = output_data_group.create_dataset(
+            rel_var_name, shape=tuple(out_shape), dtype=dataset.dtype,
+            **dict(self.compression_args, chunks=chunks)
+        )
+        self.logger.info(f"流式处理数据集 '{var_name}': 沿维度 {axis} 每次 {step} 个切片，"
+                         f"裁剪后形状: {tuple(out_shape)}")
+
+        target = [slice(None)] * len(out_shape)
+        for start in range(0, length, step):
+            slab_slice = slice(start, min(start + step, length))
+            slab = DataCropper.read_bbox(dataset, lat_dim, lon_dim, lat_indices, all_lon_indices,
+                                         extra_selection={axis: slab_slice})
+            target[axis] = slab_slice
+            new_dataset[tuple(target)] = slab
+
+        AttributeCopier.copy_dataset_attributes(dataset, new_dataset)
+        self.logger.info(f"已复制数据集 '{var_name}' 的 {len(dataset.attrs)} 个属性")
+
+    @staticmethod
+    def _can_copy_chunks(dataset: h5py.Dataset, dimensions: Tuple[int, int, bool, Tuple[int, ...]],
+                         lat_indices: np.ndarray, all_lon_indices: np.ndarray) -> bool:
+        """
+        判断能否直接复制压缩后的 chunk：源数据集为 gzip 分块存储，经纬度索引连续，
+        裁剪起点与 chunk 边界对齐，且裁剪结果在每个维度上至少包含一个完整 chunk
+        """
+        lat_dim, lon_dim, is_data_2d_grid, extra_dims = dimensions
+        if dataset.chunks is None or dataset.compression != 'gzip' or dataset.scaleoffset is not None:
+            return False
+        if not hasattr(dataset.id, 'read_direct_chunk'):
+            return False
+        if is_data_2d_grid and not extra_dims and dataset.ndim != 2:
+            return False
+        out_shape = list(dataset.shape)
+        for dim, indices in ((lat_dim, lat_indices), (lon_dim, all_lon_indices)):
+            selection = as_slice(indices)
+            if not isinstance(selection, slice) or selection.start % dataset.chunks[dim] != 0:
+                return False
+            out_shape[dim] = len(indices)
+        return all(n >= c for n, c in zip(out_shape, dataset.chunks))
+
+    def _copy_chunks(self, output_data_group: h5py.Group, var_name: str, dataset: h5py.Dataset,
+                     data_group: Optional[str], dimensions: Tuple[int, int, bool, Tuple[int, ...]],
+                     lat_indices: np.ndarray, all_lon_indices: np.ndarray) -> None:
+        """
+        输出数据集沿用源数据集的 chunk 形状与过滤器，完全落在裁剪范围内的 chunk
+        通过 read_direct_chunk / write_direct_chunk 原样复制压缩字节，跳过解压与重新压缩；
+        只有裁剪边界上的 chunk 经过 HDF5 过滤器管线读写
+        """
+        lat_dim, lon_dim = dimensions[:2]
+        chunks = dataset.chunks
+        origin = [0] * dataset.ndim
+        origin[lat_dim] = int(lat_indices[0])
+        origin[lon_dim] = int(all_lon_indices[0])
+        out_shape = list(dataset.shape)
+        out_shape[lat_dim] = len(lat_indices)
+        out_shape[lon_dim] = len(all_lon_indices)
+
+        rel_var_name = self._release_output_name(output_data_group, var_name, data_group)
+        new_dataset = output_data_group.create_dataset(
+            rel_var_name, shape=tuple(out_shape), dtype=dataset.dtype, chunks=chunks,
+            compression='gzip', compression_opts=dataset.compression_opts,
+            shuffle=dataset.shuffle, fletcher32=dataset.fletcher32, fillvalue=dataset.fillvalue
+        )
+
+        copied = decoded = 0
+        for offset in itertools.product(*[range(0, n, c) for n, c in zip(out_shape, chunks)]):
+            source_offset = tuple(o + base for o, base in zip(offset, origin))
+            # 起点已对齐，每个输出 chunk 恰好对应一个源 chunk；源 chunk 完整落在裁剪范围内，
+            # 或裁剪范围延伸到源数据集末端 (两者是有效范围相同的边界 chunk) 时可以直接复制
+            covered = all(o + c <= n or base + n == total
+                          for o, base, c, n, total in zip(offset, origin, chunks, out_shape, dataset.shape))
+            if covered:
+                try:
+                    filter_mask, payload = dataset.id.read_direct_chunk(source_offset)
+                except Exception:
+                    # 源 chunk 尚未分配 (全部为填充值) 等情况，改为经过过滤器管线读写
+                    pass
+                else:
+                    new_dataset.id.write_direct_chunk(offset, payload, filter_mask)
+                    copied += 1
+                    continue
+
+            target = tuple(slice(o, min(o + c, n)) for o, c, n in zip(offset, chunks, out_shape))
+            source = tuple(slice(s, s + (t.stop - t.start)) for s, t in zip(source_offset, target))
+            new_dataset[target] = dataset[source]
+            decoded += 1
+
+        self.logger.info(f"数据集 '{var_name}' 直接复制 {copied} 个 chunk，重新编码 {decoded} 个边界 chunk，"
+                         f"裁剪后形状: {tuple(out_shape)}")
+
+        AttributeCopier.copy_dataset_attributes(dataset, new_dataset)
+        self.logger.info(f"已复制数据集 '{var_name}' 的 {len(dataset.attrs)} 个属性")
+
+    def _release_output_name(self, output_data_group: h5py.Group, var_name: str,
+                             data_group: Optional[str]) -> str:
+        """返回输出组内的数据集名称；同名数据集已存在时先删除，保证可以重新创建"""
         rel_var_name = var_name if data_group is None else var_name.replace(f"{data_group}/", "")
 
-        # 安全创建数据集：如果数据集已存在则先删除再创建
         if rel_var_name in output_data_group:
             self.logger.info(f"数据集 '{rel_var_name}' 已存在，将覆盖")
             del output_data_group[rel_var_name]
+        return rel_var_name
 
-        new_dataset = output_data_group.create_dataset(
-            rel_var_name, data=cropped_data,
-            compression='gzip', compression_opts=4
-        )
+    def _save_dataset(self, output_data_group: h5py.Group, var_name: str,
+                      cropped_data: np.ndarray, original_dataset: h5py.Dataset,
+                      data_group: Optional[str], spatial_dims: Tuple[int, int]) -> None:
+        """保存数据集，按经纬度维度设置约 1 MB 的 chunk (小数据集连续存储)"""
+        # 安全创建数据集：如果数据集已存在则先删除再创建
+        rel_var_name = self._release_output_name(output_data_group, var_name, data_group)
+
+        storage_args = self._storage_args(cropped_data, spatial_dims)
+        chunks = storage_args.get('chunks')
+        if (storage_args.get('compression') == 'gzip' and cropped_data.dtype.kind in 'biuf'
+                and np.prod(cropped_data.shape) > np.prod(chunks)):
+            # 多个 chunk 的数值数据集：先建空数据集，再并行压缩写入
+            new_dataset = output_data_group.create_dataset(
+                rel_var_name, shape=cropped_data.shape, dtype=cropped_data.dtype, **storage_args
+            )
+            self._write_gzip_chunks(new_dataset, cropped_data)
+        else:
+            new_dataset = output_data_group.create_dataset(
+                rel_var_name, data=cropped_data, **storage_args
+            )
 
         # 复制属性
         AttributeCopier.copy_dataset_attributes(original_dataset, new_dataset)
@@ -702,7 +1114,7 @@ def crop_hdf5_file(input_hdf: Union[str, Path], output_hdf: Union[str, Path],
                    lat_min: float, lat_max: float, lon_min: float, lon_max: float,
                    lat_var: str, lon_var: str, data_vars: Optional[List[str]] = None,
                    data_group: Optional[str] = None, latlon_group: Optional[str] = None,
-                   verbose: bool = False) -> str:
+                   verbose: bool = False, compression: str = 'gzip') -> str:
     """
     裁剪HDF5文件到指定的经纬度范围
 
@@ -719,6 +1131,7 @@ def crop_hdf5_file(input_hdf: Union[str, Path], output_hdf: Union[str, Path],
         data_group: 数据所在的组路径，None表示根目录
         latlon_group: 经纬度所在的组路径，None表示根目录
         verbose: 是否显示详细处理信息
+        compression: 输出压缩方式，'gzip' 或 'blosc2'
 
     Returns:
         输出文件路径
@@ -736,7 +1149,7 @@ def crop_hdf5_file(input_hdf: Union[str, Path], output_hdf: Union[str, Path],
         ... )
         'output.h5'
     """
-    cropper = HDF5Cropper(verbose=verbose)
+    cropper = HDF5Cropper(verbose=verbose, compression=compression)
     return cropper.crop_file(
         input_hdf, output_hdf, lat_min, lat_max, lon_min, lon_max,
         lat_var, lon_var, data_vars, data_group, latlon_group
@@ -819,6 +1232,8 @@ def main():
                         help='数据所在的组路径，默认为根目录')
     parser.add_argument('--latlon-group',
                         help='经纬度所在的组路径，默认为根目录')
+    parser.add_argument('--compression', choices=COMPRESSION_CHOICES, default='gzip',
+                        help='输出压缩方式，默认 gzip；blosc2 更快但读取端需要 hdf5plugin')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='显示详细处理信息')
 
@@ -850,7 +1265,8 @@ def main():
             args.data_vars,
             args.data_group,
             args.latlon_group,
-            args.verbose
+            args.verbose,
+            args.compression
         )
         print(f"成功! 裁剪后的HDF5文件已保存至: {output_file}")
 
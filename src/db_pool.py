@@ -0,0 +1,89 @@
+import os
+import threading
+from contextlib import contextmanager
+
+from psycopg2 import extensions, pool
+from config import DB_HOST, DB_NAME, DB_USER, DB_PASSWORD, DB_POOL_MINCONN, DB_POOL_MAXCONN
+
+class PreparingConnection(extensions.connection):
+    """记录本连接上已 PREPARE 过的语句名，配合 execute_prepared 使用。"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> pool.ThreadedConnectionPool:
+    """
+    获取当前进程的 PostgreSQL 连接池（首次调用时创建）。
+
+    连接池按进程隔离：任务进程池 fork 出的子进程不能复用父进程的连接套接字，
+    检测到 pid 变化时会为子进程重新创建一个连接池。
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = pool.ThreadedConnectionPool(
+                    DB_POOL_MINCONN, DB_POOL_MAXCONN,
+                    host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD,
+                    connection_factory=PreparingConnection
+                )
+                _pool_pid = pid
+    return _pool
+
+
+@contextmanager
+def db_cursor(name: str = None, itersize: int = 2000):
+    """
+    从连接池借出一个连接并返回游标，正常退出时提交，异常时回滚，最后归还连接。
+
+    Args:
+        name (str, optional): 指定时创建服务端命名游标，迭代游标时按 itersize 分批拉取行，
+                              结果集不会一次性全部加载到客户端内存。
+        itersize (int, optional): 命名游标每批拉取的行数。
+
+    用法:
+        with db_cursor() as cur:
+            cur.execute("SELECT ...")
+    """
+    db_pool = get_pool()
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor(name=name) as cur:
+            if name:
+                cur.itersize = itersize
+            yield cur
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn, close=bool(conn.closed))
+
+
+def execute_prepared(cur, name: str, statement: str, params: tuple = ()):
+    """
+    以服务端预备语句执行查询：每个连接首次使用时 PREPARE，之后直接 EXECUTE，
+    PostgreSQL 跳过重复的解析与规划。
+
+    Args:
+        cur: db_cursor() 返回的游标。
+        name (str): 预备语句名，在连接内唯一。
+        statement (str): 使用 $1, $2... 占位符的 SQL（不经过 psycopg2 的 % 格式化）。
+        params (tuple, optional): 语句参数。
+    """
+    prepared = cur.connection.prepared
+    if name not in prepared:
+        # PREPARE 不随事务回滚，成功后即可在该连接上长期复用
+        cur.execute(f"PREPARE {name} AS {statement}")
+        prepared.add(name)
+    placeholders = ', '.join(['%s'] * len(params))
+    cur.execute(f"EXECUTE {name}({placeholders})" if params else f"EXECUTE {name}", params or None)
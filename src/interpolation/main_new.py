@@ -10,102 +10,164 @@ MAX_NEIGHBORS = 10      # 最大邻居数
 MAX_DISTANCE = 0.5      # 搜索半径 (度)
 POWER = 2               # IDW的幂次
 
+# 输出参数
+OUTPUT_CHUNK_SIDE = 512 # 结果数据集 chunk 的行列上限 (512x512 float32 = 1 MB)
+
 # 并行处理参数
-BLOCK_SIZE = 100        # 分块大小
+QUERY_BATCH_POINTS = 1_000_000  # 网格近邻查询每批的最大点数
+LAYER_BATCH_POINTS = 16_000_000  # 多层插值每批结果的最大元素数 (float32 约 64 MB)
+IDW_TILE_POINTS = 4096  # NumPy 加权计算每块的查询点数 (约 4096x10 个邻居，中间数组可留在 L2 缓存)
 PARALLEL = True         # 是否启用并行处理
 NUM_CORES = -1          # 并行核心数，-1表示使用所有可用核心
 import h5py
 import os
 import time
-import psycopg2
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 import traceback
+from scipy import sparse
 from scipy.spatial import cKDTree
 from tqdm import tqdm
 from joblib import Parallel, delayed
-from config import DB_HOST, DB_NAME, DB_USER, DB_PASSWORD, DB_PATH_PREFIX, LOCAL_MOUNT_POINT
-
-
+from src.db_pool import db_cursor, execute_prepared
+from config import TASK_MAX_WORKERS
+
+# 按 chunk 压缩结果的线程数：插值任务本身在任务进程池中运行，各任务进程均分 CPU 核心，
+# 避免 任务进程数 × 核心数 个压缩线程同时运行
+COMPRESS_WORKERS = max(1, (os.cpu_count() or 1) // (TASK_MAX_WORKERS or os.cpu_count() or 1))
+
+# numba 为可选依赖：安装后 IDW 加权使用并行编译内核，否则使用 NumPy 整批运算
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# hdf5plugin 为可选依赖，仅在输出选择 Blosc2 压缩时需要
+try:
+    import hdf5plugin
+except ImportError:
+    hdf5plugin = None
+
+# cupy 为可选依赖，仅在 device='gpu' 时需要
+try:
+    import cupy as cp
+    import cupyx.scipy.sparse as cp_sparse
+except ImportError:
+    cp = None
+
+# pykdtree 为可选依赖（OpenMP 并行查询，比 cKDTree 更快），未安装时使用 scipy 的 cKDTree
+try:
+    from pykdtree.kdtree import KDTree as PyKDTree
+except ImportError:
+    PyKDTree = None
+
+
+
+
+# 一次查询返回文件路径、变量路径及推断出的经纬度路径：
+# 经纬度优先取与变量同组的数据集，同组没有时取全文件第一个名称匹配的数据集。
+# 使用 LEFT JOIN LATERAL，文件存在但变量或经纬度缺失时对应列为 NULL，便于区分错误原因。
+_PATHS_SQL = """
+    SELECT f.local_path, v.full_path, lat.full_path, lon.full_path
+    FROM hdf5_files f
+    LEFT JOIN LATERAL (
+        SELECT d.full_path, d.parent_path FROM hdf5_datasets d
+        WHERE d.file_id = f.id AND d.name = $2
+        LIMIT 1
+    ) v ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT d.full_path FROM hdf5_datasets d
+        WHERE d.file_id = f.id AND (d.name ILIKE '%lat%' OR d.name ILIKE '%latitude%')
+        ORDER BY (d.parent_path = v.parent_path) DESC NULLS LAST
+        LIMIT 1
+    ) lat ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT d.full_path FROM hdf5_datasets d
+        WHERE d.file_id = f.id AND (d.name ILIKE '%lon%' OR d.name ILIKE '%longitude%')
+        ORDER BY (d.parent_path = v.parent_path) DESC NULLS LAST
+        LIMIT 1
+    ) lon ON TRUE
+    WHERE f.id = $1
+"""
 
 
 def _get_paths_from_db(file_id: int, var_name: str):
-    """从数据库查询文件路径、变量路径和经纬度路径"""
-    conn = None
-    try:
-        conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
-        cur = conn.cursor()
-
-        # 1. 获取文件物理路径
-        cur.execute("SELECT file_path FROM hdf5_files WHERE id = %s;", (file_id,))
-        file_record = cur.fetchone()
-        if not file_record:
-            raise ValueError(f"未找到文件ID为 {file_id} 的记录")
-        file_path = file_record[0]
-
-        # 将数据库中的路径转换为本地可访问的路径
-        file_path = file_path.replace(DB_PATH_PREFIX, LOCAL_MOUNT_POINT)
-
-        # 2. 获取目标变量的完整路径
-        cur.execute("SELECT full_path, parent_path FROM hdf5_datasets WHERE file_id = %s AND name = %s LIMIT 1;", (file_id, var_name))
-        var_record = cur.fetchone()
-        if not var_record:
-            raise ValueError(f"在文件ID {file_id} 中未找到变量名 '{var_name}'")
-        data_full_path, data_parent_path = var_record
-
-        # 3. 智能推断经纬度路径
-        lat_path, lon_path = None, None
-        # 优先在同级目录下查找
-        cur.execute("""
-            SELECT name, full_path FROM hdf5_datasets
-            WHERE file_id = %s AND parent_path = %s AND (name ILIKE '%%lat%%' OR name ILIKE '%%latitude%%')
-            LIMIT 1;
-        """, (file_id, data_parent_path))
-        lat_record = cur.fetchone()
-        if lat_record:
-            lat_path = lat_record[1]
-
-        cur.execute("""
-            SELECT name, full_path FROM hdf5_datasets
-            WHERE file_id = %s AND parent_path = %s AND (name ILIKE '%%lon%%' OR name ILIKE '%%longitude%%')
-            LIMIT 1;
-        """, (file_id, data_parent_path))
-        lon_record = cur.fetchone()
-        if lon_record:
-            lon_path = lon_record[1]
-
-        # 如果同级找不到，则在全文件中查找
-        if not lat_path:
-            cur.execute("SELECT full_path FROM hdf5_datasets WHERE file_id = %s AND (name ILIKE '%%lat%%' OR name ILIKE '%%latitude%%') LIMIT 1;", (file_id,))
-            lat_record = cur.fetchone()
-            if lat_record: lat_path = lat_record[0]
-
-        if not lon_path:
-            cur.execute("SELECT full_path FROM hdf5_datasets WHERE file_id = %s AND (name ILIKE '%%lon%%' OR name ILIKE '%%longitude%%') LIMIT 1;", (file_id,))
-            lon_record = cur.fetchone()
-            if lon_record: lon_path = lon_record[0]
-
-        if not lat_path or not lon_path:
-            raise ValueError(f"无法为文件ID {file_id} 自动推断经纬度变量路径")
-
-        print(f"[INFO] DB Paths: file='{file_path}', data='{data_full_path}', lat='{lat_path}', lon='{lon_path}'")
-        return file_path, data_full_path, lat_path, lon_path
-
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
-
-
-def read_hdf5_data(file_path, data_path, lat_path, lon_path):
-    """使用动态路径读取HDF5数据"""
+    """从数据库查询文件路径、变量路径和经纬度路径（一次往返，使用预备语句）"""
+    with db_cursor() as cur:
+        # local_path 是数据库生成列，已转换为本地可访问的路径
+        execute_prepared(cur, "interp_paths", _PATHS_SQL, (file_id, var_name))
+        record = cur.fetchone()
+
+    if not record:
+        raise ValueError(f"未找到文件ID为 {file_id} 的记录")
+    file_path, data_full_path, lat_path, lon_path = record
+    if not data_full_path:
+        raise ValueError(f"在文件ID {file_id} 中未找到变量名 '{var_name}'")
+    if not lat_path or not lon_path:
+        raise ValueError(f"无法为文件ID {file_id} 自动推断经纬度变量路径")
+
+    print(f"[INFO] DB Paths: file='{file_path}', data='{data_full_path}', lat='{lat_path}', lon='{lon_path}'")
+    return file_path, data_full_path, lat_path, lon_path
+
+
+def _bbox_window(longitude, latitude, lon_min, lon_max, lat_min, lat_max):
+    """
+    计算经纬度范围 (向外扩展 MAX_DISTANCE，保留边界格点与边界缺失值插值所需的邻居) 内像元的最小行列窗口。
+    未指定范围或范围内没有像元时返回整个数组
+    """
+    whole = (slice(None), slice(None))
+    if longitude.ndim != 2 or all(v is None for v in (lon_min, lon_max, lat_min, lat_max)):
+        return whole
+    inside = np.ones(longitude.shape, dtype=bool)
+    if lon_min is not None: inside &= longitude >= lon_min - MAX_DISTANCE
+    if lon_max is not None: inside &= longitude <= lon_max + MAX_DISTANCE
+    if lat_min is not None: inside &= latitude >= lat_min - MAX_DISTANCE
+    if lat_max is not None: inside &= latitude <= lat_max + MAX_DISTANCE
+    rows = np.flatnonzero(inside.any(axis=1))
+    cols = np.flatnonzero(inside.any(axis=0))
+    if len(rows) == 0:
+        return whole
+    return slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1)
+
+
+def read_hdf5_data(file_path, data_path, lat_path, lon_path, layer_min=None, layer_max=None,
+                   lon_min=None, lon_max=None, lat_min=None, lat_max=None):
+    """
+    使用动态路径读取HDF5数据。变量只按超平面 (hyperslab) 读取：指定经纬度范围时只读取覆盖该范围的
+    行列窗口，三维变量只读取 layer_min~layer_max 层，窗口外的像元与未选中的层不会读入内存
+
+    Returns:
+        (longitude, latitude, data, original_dim)，data 统一为 (行, 列, 层) 的 float32 数组
+    """
     print(f"读取文件: {file_path}")
     with h5py.File(file_path, 'r') as f:
         longitude = f[lon_path][:].astype(np.float32)
         latitude = f[lat_path][:].astype(np.float32)
-        data = f[data_path][:].astype(np.float32)
+        data_ds = f[data_path]
+        assert data_ds.ndim in (2, 3), f"变量必须为二维或三维，实际形状: {data_ds.shape}"
+
+        window = (slice(None), slice(None))
+        if data_ds.shape[:2] == longitude.shape:
+            window = _bbox_window(longitude, latitude, lon_min, lon_max, lat_min, lat_max)
+            longitude = np.ascontiguousarray(longitude[window])
+            latitude = np.ascontiguousarray(latitude[window])
+            if window[0] != slice(None):
+                print(f"按经纬度范围读取窗口：行 {window[0].start}-{window[0].stop - 1}，列 {window[1].start}-{window[1].stop - 1}")
+
+        original_dim = 2 if data_ds.ndim == 2 or data_ds.shape[2] == 1 else 3
+        if original_dim == 3:
+            # 三维变量的层范围过滤
+            total_layers = data_ds.shape[2]
+            layer_min = 0 if layer_min is None else max(0, min(layer_min, total_layers - 1))
+            layer_max = total_layers - 1 if layer_max is None else max(layer_min, min(layer_max, total_layers - 1))
+            # astype 让 HDF5 在读取时直接转换为 float32，不生成原始类型的中间数组
+            data = data_ds.astype(np.float32)[window + (slice(layer_min, layer_max + 1),)]
+            print(f"三维变量层范围过滤：保留第{layer_min}至{layer_max}层，共{data.shape[2]}层")
+        else:
+            data = data_ds.astype(np.float32)[window]
 
     # 维度校验
     assert longitude.shape == latitude.shape, "经纬度维度不匹配"
-    assert len(data.shape) in (2, 3), f"变量必须为二维或三维，实际形状: {data.shape}"
 
     # 对于GPM等数据，数据的前两维通常与经纬度匹配
     if data.shape[:2] != longitude.shape:
@@ -117,68 +179,253 @@ def read_hdf5_data(file_path, data_path, lat_path, lon_path):
         print(f"检测到二维变量，自动转换为单一层格式 (添加维度)")
         data = data.reshape(data.shape[0], data.shape[1], 1)
 
-    return longitude, latitude, data
+    return longitude, latitude, data, original_dim
+
+
+# kd 树坐标使用的浮点类型：pykdtree 要求建树与查询类型一致，统一为 float32；
+# cKDTree 内部以 float64 计算，直接提供 float64 避免再转换一次
+POINT_DTYPE = np.float32 if PyKDTree is not None else np.float64
+
+
+def stack_points(lon, lat):
+    """把经度、纬度写入预分配的 (n, 2) 坐标数组，不经过 column_stack 的中间数组与类型转换"""
+    points = np.empty((len(lon), 2), dtype=POINT_DTYPE)
+    points[:, 0] = lon
+    points[:, 1] = lat
+    return points
+
+
+def _spread_bits(v):
+    """把 16 位整数的各位间隔展开到 32 位的偶数位上，用于交织生成 Morton 编码"""
+    v = v.astype(np.uint32)
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+
+def morton_order(lon, lat):
+    """
+    返回把点按 Morton (Z 序) 曲线排序的下标。空间上相邻的点在数组中也相邻，
+    kd 树的叶节点与插值时按邻居下标取值都落在较少的缓存行上
+    """
+    def quantize(x):
+        lo, hi = float(x.min()), float(x.max())
+        scale = 65535 / (hi - lo) if hi > lo else 0.0
+        return ((x - lo) * scale).astype(np.uint32)
+
+    codes = _spread_bits(quantize(lon)) | (_spread_bits(quantize(lat)) << 1)
+    return np.argsort(codes, kind='stable')
+
+
+def build_kdtree(lon, lat):
+    """用 (经度, 纬度) 点构建 kd 树，优先使用 pykdtree"""
+    points = stack_points(lon, lat)
+    if PyKDTree is not None:
+        return PyKDTree(points)
+    return cKDTree(points)
+
+
+def query_kdtree(tree, query_points, k, workers=1):
+    """
+    查询每个点在 MAX_DISTANCE 内的 k 个最近邻。两种实现返回格式一致：
+    距离为 float32、索引为 int32，超出半径的邻居距离为 inf、索引等于点数。
+    cKDTree 返回的 float64 距离与 int64 索引在此收窄，后续权重计算与保存的近邻数组的内存流量减半
+
+    workers 为 cKDTree 的查询线程数 (-1 表示全部核心)；pykdtree 由 OpenMP 自动并行
+    """
+    if PyKDTree is not None and isinstance(tree, PyKDTree):
+        query_points = np.ascontiguousarray(query_points, dtype=np.float32)
+        distances, indices = tree.query(query_points, k=k, distance_upper_bound=MAX_DISTANCE)
+    else:
+        distances, indices = tree.query(query_points, k=k, distance_upper_bound=MAX_DISTANCE, workers=workers)
+    return distances.astype(np.float32, copy=False), indices.astype(np.int32, copy=False)
+
+
+def neighbor_count(n_valid):
+    """
+    kd 树查询的近邻数 k：不超过 MAX_NEIGHBORS 与有效点数，且至少为 2。
+    k=1 时 tree.query 返回一维数组，固定 k>=2 使查询结果始终为 (N, k)，加权计算只需一条路径；
+    有效点数不足 k 时多出的邻居距离为 inf，按无效邻居处理
+    """
+    return max(2, min(MAX_NEIGHBORS, n_valid))
+
+
+def _idw_weighted_values_numpy(distances, indices, values, result):
+    """
+    NumPy 实现：按 IDW_TILE_POINTS 个查询点分块，每块整批计算权重、取邻居值并按行归一化。
+    分块使各步骤的 (块大小, k) 中间数组留在 CPU 缓存中，且不随网格规模增长
+    """
+    for start in range(0, len(distances), IDW_TILE_POINTS):
+        tile = slice(start, start + IDW_TILE_POINTS)
+        tile_distances = distances[tile]
+        valid_nb = tile_distances < MAX_DISTANCE
+        with np.errstate(divide='ignore'):
+            weights = np.where(valid_nb, 1.0 / tile_distances ** POWER, 0.0)
+        # 无效邻居的索引越界，先替换为 0 再取值，其权重为 0 不影响结果
+        neighbor_values = values[np.where(valid_nb, indices[tile], 0)]
+
+        enough = np.count_nonzero(valid_nb, axis=1) >= MIN_NEIGHBORS
+        weighted_sum = np.sum(neighbor_values[enough] * weights[enough], axis=1)
+        result[tile][enough] = weighted_sum / weights[enough].sum(axis=1)
+
+
+if njit is not None:
+    # 只开启不改变 inf 语义的 fastmath 选项：允许重排加法与乘加融合以便向量化邻居求和；
+    # 不使用 fastmath=True，其 nnan/ninf 假设会让编译器优化掉对超出半径邻居 (距离为 inf) 的判断
+    @njit(parallel=True, cache=True, fastmath={'reassoc', 'contract', 'arcp'})
+    def _idw_kernel(distances, indices, values, max_distance, power, min_neighbors, result):
+        """每个查询点一次遍历完成权重、加权和与归一化，不分配 (N, k) 的中间数组。"""
+        for i in prange(distances.shape[0]):
+            weight_sum = 0.0
+            value_sum = 0.0
+            count = 0
+            for j in range(distances.shape[1]):
+                d = distances[i, j]
+                if d < max_distance:
+                    w = 1.0 / d ** power
+                    weight_sum += w
+                    value_sum += w * values[indices[i, j]]
+                    count += 1
+            if count >= min_neighbors:
+                result[i] = value_sum / weight_sum
+
+    def _idw_weighted_values_into(distances, indices, values, result):
+        _idw_kernel(distances, indices, values, MAX_DISTANCE, POWER, MIN_NEIGHBORS, result)
+else:
+    _idw_weighted_values_into = _idw_weighted_values_numpy
+
+
+def idw_weighted_values(distances, indices, values):
+    """
+    根据 kd 树查询结果一次性计算所有查询点的 IDW 插值（安装 numba 时使用并行编译内核，否则整批 NumPy 运算）
+
+    distances/indices 为 tree.query 返回的 (N, k) 数组（k 由 neighbor_count 确定），超出搜索半径的邻居
+    距离为 inf、索引越界。有效邻居数不足 MIN_NEIGHBORS 的点返回 CUSTOM_MISSING。
+    """
+    result = np.full(len(distances), CUSTOM_MISSING, dtype=np.float32)
+    _idw_weighted_values_into(distances, indices, values, result)
+    return result
+
+
+def gap_fill_neighbors(longitude, latitude, coord_valid, any_missing, workers=1):
+    """
+    为各层的缺失值填补预先查询共用的近邻：用全部坐标有效点只建一棵 kd 树，
+    一次查询在任一层缺失的所有点的 2k 个近邻。fill_layer 从中去掉在该层同样缺失的邻居，
+    剩下的即该层有效点中的最近邻，不必再逐层建树、查询
+
+    Returns:
+        (query_rows, distances, indices)：query_rows 把像元 (按行优先展平) 映射到查询结果的行号，
+        indices 为坐标有效点 (按 coord_valid 的顺序) 的序号；没有缺失点时返回 None
+    """
+    if not any_missing.any():
+        return None
+    tree = build_kdtree(longitude[coord_valid], latitude[coord_valid])
+    k = 2 * neighbor_count(int(np.count_nonzero(coord_valid)))
+    missing_points = stack_points(longitude[any_missing], latitude[any_missing])
+    distances, indices = query_kdtree(tree, missing_points, k, workers=workers)
+    query_rows = np.full(any_missing.size, -1, dtype=np.int64)
+    query_rows[np.flatnonzero(any_missing)] = np.arange(len(distances))
+    return query_rows, distances, indices
+
+
+def fill_layer(data_layer, longitude, latitude, coord_valid, shared=None, workers=1):
+    """
+    用同层有效点的 IDW 插值原地填补单层数据中的缺失值。
+    shared 为 gap_fill_neighbors 的共用查询结果：若某缺失点的候选邻居中该层有效的已够 k 个，
+    或候选已包含半径内的全部点，其前 k 个有效邻居与该层单独建树查询的结果相同，直接使用；
+    其余缺失点 (或未提供 shared 时的全部缺失点) 用该层有效点建树查询。
+    workers 为 kd 树查询线程数，多层已并行处理时应为 1，避免线程过度订阅
+
+    Returns:
+        插值后仍缺失的点的掩码；该层没有缺失值或有效点不足时返回 None
+    """
+    missing_mask = (data_layer == CUSTOM_MISSING) | np.isnan(data_layer)
+    missing_mask &= coord_valid
+    if not missing_mask.any():
+        return None
+
+    valid_mask = ~missing_mask & coord_valid
+    n_valid = np.count_nonzero(valid_mask)
+    if n_valid < MIN_NEIGHBORS:
+        return None
+    k = neighbor_count(n_valid)
+
+    interpolated_values = np.full(np.count_nonzero(missing_mask), CUSTOM_MISSING, dtype=np.float32)
+    pending = np.ones(len(interpolated_values), dtype=bool)
+    if shared is not None:
+        query_rows, distances, indices = shared
+        rows = query_rows[np.flatnonzero(missing_mask)]
+        distances, indices = distances[rows], indices[rows]
+        in_radius = distances < MAX_DISTANCE
+        layer_valid = valid_mask[coord_valid]
+        # 半径内且在该层有效的候选邻居，按距离顺序只保留前 k 个
+        usable = in_radius & layer_valid[np.where(in_radius, indices, 0)]
+        usable &= np.cumsum(usable, axis=1) <= k
+        exact = (np.count_nonzero(usable, axis=1) >= k) | ~in_radius[:, -1]
+        interpolated_values[exact] = idw_weighted_values(
+            np.where(usable[exact], distances[exact], np.inf), indices[exact], data_layer[coord_valid]
+        )
+        pending = ~exact
+
+    if pending.any():
+        tree = build_kdtree(longitude[valid_mask], latitude[valid_mask])
+        pending_points = stack_points(longitude[missing_mask][pending], latitude[missing_mask][pending])
+        distances, indices = query_kdtree(tree, pending_points, k, workers=workers)
+        interpolated_values[pending] = idw_weighted_values(distances, indices, data_layer[valid_mask])
+    data_layer[missing_mask] = interpolated_values
+
+    unfilled_mask = missing_mask.copy()
+    unfilled_mask[missing_mask] = interpolated_values == CUSTOM_MISSING
+    return unfilled_mask
 
 
-def preprocess_data(longitude, latitude, data, lon_min_arg=None, lon_max_arg=None, lat_min_arg=None, lat_max_arg=None, layer_min=None, layer_max=None):
+def preprocess_data(longitude, latitude, data, lon_min_arg=None, lon_max_arg=None, lat_min_arg=None, lat_max_arg=None):
+    # data 由 read_hdf5_data 新读取，缺失值直接在其上原地填补，不再复制整个数组
     print("预处理数据...")
     start = time.time()
-    filled_data = data.copy()
+    filled_data = data
     total_layers = filled_data.shape[2]
 
-    # 三维变量的层范围过滤
-    if total_layers > 1:  # 仅对三维变量生效
-        if layer_min is not None:
-            layer_min = max(0, min(layer_min, total_layers - 1))
-        else:
-            layer_min = 0
-        if layer_max is not None:
-            layer_max = max(layer_min, min(layer_max, total_layers - 1))
-        else:
-            layer_max = total_layers - 1
-
-        filled_data = filled_data[:, :, layer_min:layer_max + 1]
-        total_layers = filled_data.shape[2]
-        print(f"三维变量层范围过滤：保留第{layer_min}至{layer_max}层，共{total_layers}层")
-
-    # 经纬度有效性校验
-    lon_valid = ~np.isnan(longitude) & (longitude >= -180) & (longitude <= 180)
-    lat_valid = ~np.isnan(latitude) & (latitude >= -90) & (latitude <= 90)
-    coord_valid = lon_valid & lat_valid
+    # 经纬度有效性校验（NaN 与任何数比较均为 False，范围比较已排除 NaN）
+    coord_valid = (longitude >= -180) & (longitude <= 180)
+    coord_valid &= latitude >= -90
+    coord_valid &= latitude <= 90
 
     global_valid = coord_valid.copy()
 
-    # 逐层处理缺失值
-    for layer in range(total_layers):
-        data_layer = filled_data[:, :, layer]
-        missing_mask = (data_layer == CUSTOM_MISSING) | np.isnan(data_layer)
-        missing_mask &= coord_valid
-
-        if np.sum(missing_mask) > 0:
-            valid_mask = ~missing_mask & coord_valid
-            valid_lon_layer = longitude[valid_mask]
-            valid_lat_layer = latitude[valid_mask]
-            valid_data_layer = data_layer[valid_mask]
-
-            if len(valid_data_layer) >= MIN_NEIGHBORS:
-                tree = cKDTree(np.column_stack((valid_lon_layer, valid_lat_layer)))
-                missing_points = np.column_stack((longitude[missing_mask], latitude[missing_mask]))
-                distances, indices = tree.query(missing_points, k=min(MAX_NEIGHBORS, len(valid_data_layer)), distance_upper_bound=MAX_DISTANCE)
-
-                interpolated_values = np.full(missing_points.shape[0], CUSTOM_MISSING, dtype=np.float32)
-                for i in range(len(missing_points)):
-                    valid_nb = distances[i] < MAX_DISTANCE
-                    if np.isscalar(distances[i]): # k=1
-                        if valid_nb:
-                            interpolated_values[i] = valid_data_layer[indices[i]]
-                    elif np.sum(valid_nb) >= MIN_NEIGHBORS:
-                        weights = 1.0 / (distances[i][valid_nb] ** POWER)
-                        weights /= weights.sum()
-                        interpolated_values[i] = np.sum(valid_data_layer[indices[i][valid_nb]] * weights)
-
-                data_layer[missing_mask] = interpolated_values
-                filled_data[:, :, layer] = data_layer
-                global_valid &= ~(missing_mask & (interpolated_values == CUSTOM_MISSING))
+    # 逐层处理缺失值：各层相互独立，使用线程并行（kd 树查询和 NumPy 运算释放 GIL，
+    # 各线程原地写入 filled_data 中互不重叠的层，无需复制或序列化数组）。
+    # require='sharedmem' 保证始终使用线程：若改用进程，经纬度数组会逐任务序列化，原地填补的结果也会丢失
+    layer_views = [filled_data[:, :, layer] for layer in range(total_layers)]
+
+    # 多层时先用一棵 kd 树一次查询所有层的缺失点，各层复用查询结果
+    shared = None
+    if total_layers > 1:
+        any_missing = np.zeros_like(coord_valid)
+        for data_layer in layer_views:
+            any_missing |= data_layer == CUSTOM_MISSING
+            any_missing |= np.isnan(data_layer)
+        any_missing &= coord_valid
+        shared = gap_fill_neighbors(longitude, latitude, coord_valid, any_missing, workers=NUM_CORES)
+
+    if PARALLEL and total_layers > 1:
+        # 以生成器返回结果，由 tqdm 按层显示进度，代替 joblib 自身逐任务打印的 verbose 日志
+        unfilled_masks = list(tqdm(
+            Parallel(n_jobs=NUM_CORES, require='sharedmem', return_as='generator')(
+                delayed(fill_layer)(data_layer, longitude, latitude, coord_valid, shared) for data_layer in layer_views
+            ),
+            total=total_layers, desc="缺失值填补"
+        ))
+    else:
+        # 逐层串行处理时，由 kd 树查询自身使用全部核心
+        unfilled_masks = [fill_layer(data_layer, longitude, latitude, coord_valid, shared, workers=NUM_CORES)
+                          for data_layer in layer_views]
+
+    for unfilled_mask in unfilled_masks:
+        if unfilled_mask is not None:
+            global_valid &= ~unfilled_mask
 
     # 提取有效数据与范围
     valid_lon = longitude[global_valid]
@@ -186,7 +433,6 @@ def preprocess_data(longitude, latitude, data, lon_min_arg=None, lon_max_arg=Non
     if len(valid_lon) == 0:
         raise ValueError("无有效数据点")
 
-    valid_data_layers = [filled_data[:, :, l][global_valid] for l in range(total_layers)]
     lon_min, lon_max = valid_lon.min(), valid_lon.max()
     lat_min, lat_max = valid_lat.min(), valid_lat.max()
 
@@ -198,13 +444,16 @@ def preprocess_data(longitude, latitude, data, lon_min_arg=None, lon_max_arg=Non
 
     final_mask = (valid_lon >= lon_min) & (valid_lon <= lon_max) & (valid_lat >= lat_min) & (valid_lat <= lat_max)
     valid_lon, valid_lat = valid_lon[final_mask], valid_lat[final_mask]
-    valid_data_layers = [l[final_mask] for l in valid_data_layers]
+
+    # 合并两次筛选后一次取出所有层：(有效点数, 层数) 的连续数组，每个有效点的各层数值相邻存放
+    global_valid[global_valid] = final_mask
+    valid_data = filled_data.reshape(-1, total_layers)[global_valid.ravel()]
 
     if len(valid_lon) == 0:
         raise ValueError(f"指定的经纬度范围 (lon: [{lon_min_arg}, {lon_max_arg}], lat: [{lat_min_arg}, {lat_max_arg}]) 内没有找到任何有效的数据点。")
 
     print(f"预处理耗时: {time.time() - start:.2f}秒")
-    return valid_lon, valid_lat, valid_data_layers, lon_min, lon_max, lat_min, lat_max, total_layers
+    return valid_lon, valid_lat, valid_data, lon_min, lon_max, lat_min, lat_max, total_layers
 
 
 def create_interpolation_grid(lon_min, lon_max, lat_min, lat_max, resolution):
@@ -214,89 +463,229 @@ def create_interpolation_grid(lon_min, lon_max, lat_min, lat_max, resolution):
     return grid_lon, grid_lat
 
 
-def idw_interpolation(lon_valid, lat_valid, data_valid, query_points):
-    if len(lon_valid) < MIN_NEIGHBORS:
-        return np.full(len(query_points), CUSTOM_MISSING, dtype=np.float32)
-
-    tree = cKDTree(np.column_stack((lon_valid, lat_valid)))
-    distances, indices = tree.query(query_points, k=min(MAX_NEIGHBORS, len(lon_valid)), distance_upper_bound=MAX_DISTANCE)
-    result = np.full(len(query_points), CUSTOM_MISSING, dtype=np.float32)
-
-    for i in range(len(query_points)):
-        if np.isscalar(distances[i]):
-            if distances[i] < MAX_DISTANCE: result[i] = data_valid[indices[i]]
-            continue
-
-        valid_nb = distances[i] < MAX_DISTANCE
-        if np.sum(valid_nb) >= MIN_NEIGHBORS:
-            weights = 1.0 / (distances[i][valid_nb] ** POWER)
-            weights /= weights.sum()
-            result[i] = np.sum(data_valid[indices[i][valid_nb]] * weights)
-    return result
-
-
-def process_block(args):
-    block_id, lon_valid, lat_valid, data_valid, grid_lon, grid_lat, i_start, i_end, j_start, j_end = args
-    lon_block = grid_lon[j_start:j_end]
-    lat_block = grid_lat[i_start:i_end]
-    lon_grid, lat_grid = np.meshgrid(lon_block, lat_block)
-    query_points = np.column_stack((lon_grid.flatten(), lat_grid.flatten()))
-    block_shape = (i_end - i_start, j_end - j_start)
-
-    in_range = (lon_valid >= lon_block.min() - MAX_DISTANCE) & (lon_valid <= lon_block.max() + MAX_DISTANCE) & \
-               (lat_valid >= lat_block.min() - MAX_DISTANCE) & (lat_valid <= lat_block.max() + MAX_DISTANCE)
-
-    if np.sum(in_range) < MIN_NEIGHBORS:
-        return np.full(block_shape, CUSTOM_MISSING, dtype=np.float32), i_start, i_end, j_start, j_end
-
-    result_flat = idw_interpolation(lon_valid[in_range], lat_valid[in_range], data_valid[in_range], query_points)
-    return result_flat.reshape(block_shape), i_start, i_end, j_start, j_end
-
-
-def batch_idw(lon_valid, lat_valid, data_valid, grid_lon, grid_lat, layer_idx):
-    print(f"\\n===== 插值层 {layer_idx + 1} =====")
+def query_grid_neighbors(tree, grid_lon, grid_lat, k):
+    """
+    一次性查询整个插值网格每个格点的近邻。各层有效点坐标相同，查询结果对所有层通用，
+    只需查询一次。网格按行分段查询，控制查询点数组和结果数组的临时内存
+
+    Returns:
+        (distances, indices)，形状为 (网格点数, k)，按行优先展开
+    """
+    nx = len(grid_lon)
+    rows_per_batch = max(1, min(len(grid_lat), QUERY_BATCH_POINTS // max(nx, 1)))
+
+    # 查询点缓冲区只分配一次：每批都是完整的若干行，经度列对所有批次相同，只需填充一次；
+    # 每批只更新纬度列，不再逐批生成 meshgrid 再拼接
+    query_buffer = np.empty((rows_per_batch * nx, 2), dtype=POINT_DTYPE)
+    query_buffer[:, 0] = np.tile(grid_lon, rows_per_batch)
+
+    distance_parts, index_parts = [], []
+    for i in range(0, len(grid_lat), rows_per_batch):
+        lat_rows = grid_lat[i:i + rows_per_batch]
+        query_points = query_buffer[:len(lat_rows) * nx]
+        query_points[:, 1] = np.repeat(lat_rows, nx)
+        distances, indices = query_kdtree(tree, query_points, k, workers=NUM_CORES)
+        distance_parts.append(distances)
+        index_parts.append(indices)
+    if not distance_parts:  # 空网格
+        return np.empty((0, k), dtype=np.float32), np.empty((0, k), dtype=np.int32)
+    return np.concatenate(distance_parts), np.concatenate(index_parts)
+
+
+def idw_weight_matrix(distances, indices, n_valid):
+    """
+    把网格近邻查询结果转换为归一化的 IDW 权重稀疏矩阵 W (网格点数 x 有效点数)。
+    权重只取决于坐标，对所有层通用：每层的插值结果即 W @ 该层有效点数值，
+    只需一次稀疏矩阵-向量乘，不再逐层重复计算权重、筛选邻居与归一化
+
+    Returns:
+        (W, enough)：W 为 float32 的 CSR 矩阵，每行只保存半径内的邻居；
+        enough 标记有效邻居数不少于 MIN_NEIGHBORS 的网格点，其余网格点的行为空，结果应为 CUSTOM_MISSING
+    """
+    valid_nb = distances < MAX_DISTANCE
+    counts = np.count_nonzero(valid_nb, axis=1)
+    enough = counts >= MIN_NEIGHBORS
+    valid_nb &= enough[:, None]
+    counts[~enough] = 0
+
+    weights = np.zeros(distances.shape, dtype=np.float32)
+    with np.errstate(divide='ignore'):
+        np.divide(1.0, distances ** POWER, out=weights, where=valid_nb, casting='unsafe')
+    weight_sum = weights.sum(axis=1, keepdims=True)
+    np.divide(weights, weight_sum, out=weights, where=enough[:, None])
+
+    # 按行优先取出有效邻居，正好是 CSR 的 data/indices 顺序
+    indptr = np.zeros(len(distances) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    matrix = sparse.csr_matrix((weights[valid_nb], indices[valid_nb], indptr),
+                               shape=(len(distances), n_valid))
+    return matrix, enough
+
+
+def batch_idw(weights, data_valid, grid_shape, layer_idx):
+    """
+    用 idw_weight_matrix 预先计算的权重同时插值连续的若干层。data_valid 为 (有效点数, 层数) 的数组，
+    各层一起做一次稀疏矩阵-矩阵乘，每个邻居的各层数值连续读取。weights 为 (W, enough)，
+    device='gpu' 时二者已上传为 cupy 数组，只需上传这几层数值、下载插值结果；为 None 时整批缺失
+
+    Returns:
+        (result, valid_count, total)，result 形状为 (层数, 纬度, 经度)
+    """
+    n_layers = data_valid.shape[1]
+    print(f"\n===== 插值层 {layer_idx + 1}-{layer_idx + n_layers} =====")
     start = time.time()
-    blocks = []
-    for i in range(0, len(grid_lat), BLOCK_SIZE):
-        i_end = min(i + BLOCK_SIZE, len(grid_lat))
-        for j in range(0, len(grid_lon), BLOCK_SIZE):
-            j_end = min(j + BLOCK_SIZE, len(grid_lon))
-            blocks.append((f"block_{i//BLOCK_SIZE}_{j//BLOCK_SIZE}", lon_valid, lat_valid, data_valid, grid_lon, grid_lat, i, i_end, j, j_end))
-
-    result = np.full((len(grid_lat), len(grid_lon)), CUSTOM_MISSING, dtype=np.float32)
-    if PARALLEL and len(blocks) > 1:
-        results = Parallel(n_jobs=NUM_CORES, verbose=5)(delayed(process_block)(b) for b in blocks)
-        for block_result, i_s, i_e, j_s, j_e in results:
-            result[i_s:i_e, j_s:j_e] = block_result
+    if weights is None:
+        result = np.full((n_layers,) + grid_shape, CUSTOM_MISSING, dtype=np.float32)
     else:
-        for block_args in tqdm(blocks, desc="分块处理"):
-            block_result, i_s, i_e, j_s, j_e = process_block(block_args)
-            result[i_s:i_e, j_s:j_e] = block_result
-
-    valid_count = np.sum(result != CUSTOM_MISSING)
+        matrix, enough = weights
+        if isinstance(enough, np.ndarray):
+            result = matrix @ data_valid
+        else:
+            result = matrix @ cp.asarray(data_valid)
+        result[~enough] = CUSTOM_MISSING
+        # (网格点数, 层数) 转置为逐层连续的 (层数, 网格点数)
+        result = result.T.astype(np.float32, order='C')
+        if not isinstance(result, np.ndarray):
+            result = cp.asnumpy(result)
+        result = result.reshape((n_layers,) + grid_shape)
+
+    valid_count = np.count_nonzero(result != CUSTOM_MISSING)
     coverage = 100 * valid_count / result.size if result.size else 0
-    print(f"层 {layer_idx + 1} 完成，耗时: {time.time() - start:.2f}秒，覆盖率: {coverage:.2f}%")
+    print(f"层 {layer_idx + 1}-{layer_idx + n_layers} 完成，耗时: {time.time() - start:.2f}秒，覆盖率: {coverage:.2f}%")
     return result, valid_count, result.size
 
 
-def save_to_hdf5(output_path, grid_lon, grid_lat, all_results, total_layers, var_name, original_dim, resolution, layer_min_arg=None, layer_max_arg=None):
-    print(f"保存结果到: {output_path}")
-    with h5py.File(output_path, 'w') as f:
-        grp = f.create_group('idw_interpolation')
-        grp.create_dataset('longitude', data=grid_lon)
-        grp.create_dataset('latitude', data=grid_lat)
-
-        if original_dim == 2 and total_layers == 1:
-            dset = grp.create_dataset(var_name, data=all_results[0], compression='gzip', compression_opts=3)
-        else:
-            dset = grp.create_dataset(var_name, data=np.array(all_results), compression='gzip', compression_opts=3)
+def output_compression_args(compression):
+    """
+    返回结果数据集的压缩参数：'none' (不压缩)；'gzip' (级别 3，任何 HDF5 工具均可读取)；
+    'blosc2' (Blosc2 + Zstd + 字节重排，压缩更快、float32 压缩率更高，读取端需要安装 hdf5plugin)
+    """
+    if compression == 'none':
+        return {}
+    if compression == 'gzip':
+        return {'compression': 'gzip', 'compression_opts': 3}
+    if compression == 'blosc2':
+        if hdf5plugin is None:
+            raise ValueError("使用 Blosc2 压缩需要安装 hdf5plugin")
+        return dict(hdf5plugin.Blosc2(cname='zstd', clevel=3, filters=hdf5plugin.Blosc2.SHUFFLE))
+    raise ValueError(f"不支持的压缩方式: {compression}，可选: none, gzip, blosc2")
+
+
+def output_packing(output_dtype, data_valid):
+    """
+    确定结果的存储类型：'float32' 原样保存；'float16' 半精度；'int16' 按 CF 约定以
+    scale_factor/add_offset 线性打包。IDW 结果是有效点数值的加权平均，不会超出输入数值范围，
+    因此打包参数可以在插值前由输入数据确定，结果仍可逐层写出
+
+    Returns:
+        dict: dtype、missing_value，int16 另含 scale_factor、add_offset
+    """
+    if output_dtype == 'float32':
+        return {'dtype': np.float32, 'missing_value': np.float32(CUSTOM_MISSING)}
+    if output_dtype == 'float16':
+        # CUSTOM_MISSING 在半精度下可能被舍入，缺失值属性记录舍入后的值
+        return {'dtype': np.float16, 'missing_value': np.float16(CUSTOM_MISSING)}
+    if output_dtype == 'int16':
+        valid = data_valid[(data_valid != CUSTOM_MISSING) & ~np.isnan(data_valid)]
+        vmin, vmax = (float(valid.min()), float(valid.max())) if valid.size else (0.0, 0.0)
+        # 有效值映射到 [-32767, 32767]，-32768 保留给缺失值
+        scale = (vmax - vmin) / 65534 if vmax > vmin else 1.0
+        return {'dtype': np.int16, 'missing_value': np.int16(-32768),
+                'scale_factor': np.float32(scale), 'add_offset': np.float32((vmax + vmin) / 2)}
+    raise ValueError(f"不支持的输出类型: {output_dtype}，可选: float32, float16, int16")
+
+
+def pack_layer(result, packing):
+    """按 output_packing 的结果转换一层插值结果，缺失值 (含 NaN) 写为对应的 missing_value"""
+    missing = (result == CUSTOM_MISSING) | np.isnan(result)
+    if packing['dtype'] == np.int16:
+        packed = np.rint((result - packing['add_offset']) / packing['scale_factor'])
+        packed[missing] = packing['missing_value']
+        return packed.astype(np.int16)
+    packed = result.astype(packing['dtype'], copy=False)
+    if packing['dtype'] != np.float32:
+        packed[missing] = packing['missing_value']
+    return packed
+
+
+def create_output_dataset(f, grid_lon, grid_lat, total_layers, var_name, original_dim, resolution, layer_min_arg=None, layer_max_arg=None, compression='gzip', packing=None):
+    """
+    在输出文件中按最终形状预先创建结果数据集并写入网格坐标与属性，
+    插值结果随后逐层写入，不需要在内存中保留所有层
+
+    Returns:
+        结果数据集：二维变量为 (纬度, 经度)，三维变量为 (层, 纬度, 经度)
+    """
+    grp = f.create_group('idw_interpolation')
+    grp.create_dataset('longitude', data=grid_lon)
+    grp.create_dataset('latitude', data=grid_lat)
+
+    ny, nx = len(grid_lat), len(grid_lon)
+    if original_dim == 2 and total_layers == 1:
+        shape, chunks = (ny, nx), (min(ny, OUTPUT_CHUNK_SIDE), min(nx, OUTPUT_CHUNK_SIDE))
+    else:
+        shape, chunks = (total_layers, ny, nx), (1, min(ny, OUTPUT_CHUNK_SIDE), min(nx, OUTPUT_CHUNK_SIDE))
+    if 0 in shape:
+        chunks = None
+    packing = packing or output_packing('float32', None)
+    dset = grp.create_dataset(var_name, shape=shape, dtype=packing['dtype'], chunks=chunks,
+                              fillvalue=packing['missing_value'], **output_compression_args(compression))
+
+    dset.attrs['missing_value'] = packing['missing_value']
+    if 'scale_factor' in packing:
+        # CF 约定：实际值 = 存储值 * scale_factor + add_offset
+        dset.attrs['scale_factor'] = packing['scale_factor']
+        dset.attrs['add_offset'] = packing['add_offset']
+        dset.attrs['_FillValue'] = packing['missing_value']
+    grp.attrs['grid_resolution'] = resolution
+    grp.attrs['variable_name'] = var_name
+    grp.attrs['original_dimension'] = original_dim
+    if original_dim == 3:
+        grp.attrs['layers_processed'] = f"{layer_min_arg or 0}-{layer_max_arg or (total_layers-1)}"
+    return dset
+
+
+def _write_layer_chunks(dset, layer_idx, result, level, executor):
+    """
+    按 chunk 直接写入一层结果 (result 已是数据集的存储类型)，跳过 HDF5 的过滤器管线与类型转换。
+    level 为 gzip 级别时在 executor 的线程中用 zlib 压缩 (压缩期间释放 GIL，输出格式与 HDF5 deflate 过滤器相同)，
+    为 None 时写入未压缩的原始字节；边界 chunk 用 0 补齐到完整形状
+    """
+    chunk_rows, chunk_cols = dset.chunks[-2:]
+
+    def encode(offset):
+        row, col = offset
+        block = result[row:row + chunk_rows, col:col + chunk_cols]
+        if block.shape != (chunk_rows, chunk_cols):
+            padded = np.zeros((chunk_rows, chunk_cols), dtype=result.dtype)
+            padded[:block.shape[0], :block.shape[1]] = block
+            block = padded
+        payload = np.ascontiguousarray(block).tobytes()
+        return offset, payload if level is None else zlib.compress(payload, level)
+
+    offsets = [(row, col) for row in range(0, result.shape[0], chunk_rows)
+               for col in range(0, result.shape[1], chunk_cols)]
+    prefix = () if dset.ndim == 2 else (layer_idx,)
+    for (row, col), payload in executor.map(encode, offsets):
+        dset.id.write_direct_chunk(prefix + (row, col), payload)
+
+
+def write_layer(dset, layer_idx, result, executor):
+    """将一层插值结果写入结果数据集；gzip 或未压缩的数据集按 chunk 直接写入，压缩在 executor 中进行"""
+    if dset.chunks is not None:
+        nfilters = dset.id.get_create_plist().get_nfilters()
+        if nfilters == 0:
+            _write_layer_chunks(dset, layer_idx, result, None, executor)
+            return
+        if nfilters == 1 and dset.compression == 'gzip':
+            _write_layer_chunks(dset, layer_idx, result, dset.compression_opts, executor)
+            return
+
+    if dset.ndim == 2:
+        dset[...] = result
+    else:
+        dset[layer_idx] = result
 
-        dset.attrs['missing_value'] = CUSTOM_MISSING
-        grp.attrs['grid_resolution'] = resolution
-        grp.attrs['variable_name'] = var_name
-        grp.attrs['original_dimension'] = original_dim
-        if original_dim == 3:
-            grp.attrs['layers_processed'] = f"{layer_min_arg or 0}-{layer_max_arg or (total_layers-1)}"
 
 def generate_report(total_valid, total_points, total_layers, var_name, original_dim, output_file, layer_min_arg=None, layer_max_arg=None):
     coverage = 100 * total_valid / total_points if total_points else 0
@@ -323,9 +712,16 @@ def run_interpolation(
     lat_min: float = None,
     lat_max: float = None,
     layer_min: int = None,
-    layer_max: int = None
+    layer_max: int = None,
+    compression: str = 'gzip',
+    device: str = 'cpu',
+    output_dtype: str = 'float32'
 ):
     try:
+        if device not in ('cpu', 'gpu'):
+            raise ValueError(f"不支持的计算设备: {device}，可选: cpu, gpu")
+        if device == 'gpu' and cp is None:
+            raise ValueError("使用 GPU 插值需要安装 cupy")
         start = time.time()
         # 从数据库获取路径
         file_path, data_path, lat_path, lon_path = _get_paths_from_db(file_id, var_name)
@@ -339,28 +735,60 @@ def run_interpolation(
         )
 
         # 读取数据
-        lon, lat, data = read_hdf5_data(file_path, data_path, lat_path, lon_path)
-        original_dim = 2 if data.shape[2] == 1 else 3
+        lon, lat, data, original_dim = read_hdf5_data(file_path, data_path, lat_path, lon_path, layer_min, layer_max,
+                                                     lon_min, lon_max, lat_min, lat_max)
 
         # 预处理
-        valid_lon, valid_lat, data_layers, lon_min_res, lon_max_res, lat_min_res, lat_max_res, total_layers = preprocess_data(
-            lon, lat, data, lon_min, lon_max, lat_min, lat_max, layer_min, layer_max
+        valid_lon, valid_lat, data_valid, lon_min_res, lon_max_res, lat_min_res, lat_max_res, total_layers = preprocess_data(
+            lon, lat, data, lon_min, lon_max, lat_min, lat_max
         )
 
+        del lon, lat, data
+
         # 创建插值网格
         grid_lon, grid_lat = create_interpolation_grid(lon_min_res, lon_max_res, lat_min_res, lat_max_res, resolution)
 
-        # 批量插值
-        all_results = []
+        # 批量插值：各层的有效点坐标相同，kd 树只构建一次，网格近邻只查询一次，
+        # IDW 权重也只计算一次，每层只需一次稀疏矩阵-向量乘
+        grid_shape = (len(grid_lat), len(grid_lon))
+        weights = None
+        if len(valid_lon) >= MIN_NEIGHBORS:
+            query_start = time.time()
+            # 有效点按 Morton 曲线重排后再建树，权重矩阵的列下标随之局部化
+            order = morton_order(valid_lon, valid_lat)
+            valid_lon, valid_lat, data_valid = valid_lon[order], valid_lat[order], data_valid[order]
+            del order
+            tree = build_kdtree(valid_lon, valid_lat)
+            distances, indices = query_grid_neighbors(tree, grid_lon, grid_lat, neighbor_count(len(valid_lon)))
+            weights = idw_weight_matrix(distances, indices, len(valid_lon))
+            del tree, distances, indices
+            print(f"网格近邻查询与权重计算耗时: {time.time() - query_start:.2f}秒")
+            if device == 'gpu':
+                # 权重矩阵只上传一次，逐层的矩阵-向量乘在 GPU 上完成
+                weights = (cp_sparse.csr_matrix(weights[0]), cp.asarray(weights[1]))
+
+        # 逐层插值并直接写入输出文件，内存中只保留当前层的结果
+        print(f"保存结果到: {output_file}")
         total_valid, total_points = 0, 0
-        for i, layer in enumerate(tqdm(data_layers, desc="总进度")):
-            res, valid, total = batch_idw(valid_lon, valid_lat, layer, grid_lon, grid_lat, i)
-            all_results.append(res)
-            total_valid += valid
-            total_points += total
-
-        # 保存结果
-        save_to_hdf5(output_file, grid_lon, grid_lat, all_results, total_layers, var_name, original_dim, resolution, layer_min, layer_max)
+        try:
+            # 压缩线程池在整个输出过程中只创建一次，各层复用
+            with h5py.File(output_file, 'w') as f, ThreadPoolExecutor(max_workers=COMPRESS_WORKERS) as executor:
+                packing = output_packing(output_dtype, data_valid)
+                dset = create_output_dataset(f, grid_lon, grid_lat, total_layers, var_name, original_dim, resolution, layer_min, layer_max, compression, packing)
+                # 按批插值若干层，控制每批结果数组的大小
+                layers_per_batch = max(1, LAYER_BATCH_POINTS // max(grid_shape[0] * grid_shape[1], 1))
+                for lo in tqdm(range(0, total_layers, layers_per_batch), desc="总进度"):
+                    res, valid, total = batch_idw(weights, data_valid[:, lo:lo + layers_per_batch], grid_shape, lo)
+                    for j, layer_result in enumerate(res):
+                        write_layer(dset, lo + j, pack_layer(layer_result, packing), executor)
+                    del res
+                    total_valid += valid
+                    total_points += total
+        except Exception:
+            # 中途失败时删除不完整的输出文件
+            if os.path.exists(output_file):
+                os.remove(output_file)
+            raise
 
         # 生成报告
         generate_report(total_valid, total_points, total_layers, var_name, original_dim, output_file, layer_min, layer_max)
@@ -6,6 +6,11 @@ import os
 hdf5_path = "HDF格式示例文件1/2A.GPM.Ka.V9-20211125.20230101-S231026-E004258.050253.V07A.HDF5"
 index_output_path = "HDF格式示例文件1/2A.GPM.Ka.V9-20211125.20230101-S231026-E004258.050253.V07A.HDF5.index.json"
 
+# 读取参数：chunk cache 64 MB；页缓冲 16 MB (仅对以分页聚合方式创建的文件生效)
+RDCC_NBYTES = 64 * 1024 * 1024
+RDCC_NSLOTS = 1000003
+PAGE_BUF_SIZE = 16 * 1024 * 1024
+
 index_data = {}
 
 def extract_info(name, obj):
@@ -13,7 +18,7 @@ def extract_info(name, obj):
         info = {
             "shape": obj.shape,
             "dtype": str(obj.dtype),
-            "attrs": {k: str(obj.attrs[k]) for k in obj.attrs},
+            "attrs": {k: str(v) for k, v in obj.attrs.items()},
         }
 
         # 获取文件偏移量：通过低层接口（注意：不适用于压缩数据）
@@ -25,12 +30,24 @@ def extract_info(name, obj):
 
         index_data[name] = info
 
-# 打开 HDF5 文件并递归遍历数据集
-with h5py.File(hdf5_path, "r") as f:
-    f.visititems(extract_info)
-
-# 保存为 JSON 文件
-with open(index_output_path, "w") as f:
-    json.dump(index_data, f, indent=2)
-
-print(f"[✓] 索引已保存到: {index_output_path}")
+def open_hdf5(path):
+    """打开 HDF5 文件：先尝试启用页缓冲，文件不是分页格式时退回普通方式打开"""
+    try:
+        return h5py.File(path, "r", rdcc_nbytes=RDCC_NBYTES, rdcc_nslots=RDCC_NSLOTS,
+                         page_buf_size=PAGE_BUF_SIZE)
+    except (OSError, ValueError):
+        return h5py.File(path, "r", rdcc_nbytes=RDCC_NBYTES, rdcc_nslots=RDCC_NSLOTS)
+
+# 索引文件比 HDF5 文件新时直接复用，不再遍历元数据
+if os.path.exists(index_output_path) and os.path.getmtime(index_output_path) >= os.path.getmtime(hdf5_path):
+    print(f"[✓] 索引已是最新，跳过: {index_output_path}")
+else:
+    # 打开 HDF5 文件并递归遍历数据集
+    with open_hdf5(hdf5_path) as f:
+        f.visititems(extract_info)
+
+    # 保存为 JSON 文件
+    with open(index_output_path, "w") as f:
+        json.dump(index_data, f, indent=2)
+
+    print(f"[✓] 索引已保存到: {index_output_path}")
@@ -1,40 +1,81 @@
-import psycopg2
+import atexit
 import h5py
 import numpy as np
 import json
 import os
+import threading
+import uuid
+from collections import OrderedDict
 from datetime import datetime
-from config import DB_HOST, DB_NAME, DB_USER, DB_PASSWORD
+from src.db_pool import db_cursor
+
+
+# 只读 HDF5 句柄缓存：复用已打开的文件，跳过重复的 H5Fopen 元数据遍历；
+# 同时把 chunk cache 从默认的 1 MB 调大，读取相邻的经纬度块时不会反复解压同一个 chunk。
+HDF5_HANDLE_CACHE_SIZE = 32
+HDF5_RDCC_NBYTES = 128 * 1024 * 1024
+HDF5_RDCC_NSLOTS = 1_000_003  # 取质数以减少哈希冲突
+HDF5_RDCC_W0 = 0.75
+
+_hdf5_handles = OrderedDict()
+_hdf5_handles_pid = None
+_hdf5_handles_lock = threading.Lock()
+
+
+def open_hdf5(path: str) -> h5py.File:
+    """
+    以只读方式打开（或复用已打开的）HDF5 文件。调用方不要关闭返回的句柄。
+
+    句柄按进程隔离，任务子进程不会复用父进程打开的句柄；超过缓存上限时丢弃最久未用的句柄，
+    由 h5py 在最后一个引用释放后关闭，避免关闭其他线程正在读取的文件。
+    """
+    global _hdf5_handles_pid
+    with _hdf5_handles_lock:
+        if _hdf5_handles_pid != os.getpid():
+            _hdf5_handles.clear()
+            _hdf5_handles_pid = os.getpid()
+        hf = _hdf5_handles.get(path)
+        if hf is not None and hf.id.valid:
+            _hdf5_handles.move_to_end(path)
+            return hf
+        hf = h5py.File(path, 'r', rdcc_nbytes=HDF5_RDCC_NBYTES,
+                       rdcc_nslots=HDF5_RDCC_NSLOTS, rdcc_w0=HDF5_RDCC_W0)
+        _hdf5_handles[path] = hf
+        if len(_hdf5_handles) > HDF5_HANDLE_CACHE_SIZE:
+            _hdf5_handles.popitem(last=False)
+        return hf
+
+
+@atexit.register
+def close_hdf5_handles():
+    """关闭当前进程缓存的所有 HDF5 句柄（进程退出时自动调用）。"""
+    with _hdf5_handles_lock:
+        if _hdf5_handles_pid == os.getpid():
+            for hf in _hdf5_handles.values():
+                if hf.id.valid:
+                    hf.close()
+        _hdf5_handles.clear()
 
 
 def find_hdf5_files_by_path(search_path):
     """根据路径查找包含该路径的HDF5文件"""
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
-        cur = conn.cursor()
-
-        # 查找包含指定路径的文件
-        cur.execute("""
-            SELECT DISTINCT f.id, f.file_name, f.file_path, f.created_at
-            FROM hdf5_files f
-            JOIN hdf5_groups g ON f.id = g.file_id
-            WHERE g.full_path LIKE %s
-            UNION
-            SELECT DISTINCT f.id, f.file_name, f.file_path, f.created_at
-            FROM hdf5_files f
-            JOIN hdf5_datasets d ON f.id = d.file_id
-            WHERE d.full_path LIKE %s
-            ORDER BY created_at DESC
-        """, (f"%{search_path}%", f"%{search_path}%"))
-
-        files = cur.fetchall()
-        cur.close()
-        conn.close()
+        with db_cursor() as cur:
+            # 查找包含指定路径的文件；返回的 path 为数据库生成列 local_path，已是本地可访问路径
+            cur.execute("""
+                SELECT DISTINCT f.id, f.file_name, f.local_path, f.created_at
+                FROM hdf5_files f
+                JOIN hdf5_groups g ON f.id = g.file_id
+                WHERE g.full_path LIKE %s
+                UNION
+                SELECT DISTINCT f.id, f.file_name, f.local_path, f.created_at
+                FROM hdf5_files f
+                JOIN hdf5_datasets d ON f.id = d.file_id
+                WHERE d.full_path LIKE %s
+                ORDER BY created_at DESC
+            """, (f"%{search_path}%", f"%{search_path}%"))
+
+            files = cur.fetchall()
 
         return [{'id': f[0], 'name': f[1], 'path': f[2], 'created_at': f[3]} for f in files]
 
@@ -43,70 +84,56 @@ def find_hdf5_files_by_path(search_path):
         return []
 
 
-def extract_hdf5_subset(file_id, target_path, output_file):
-    """从数据库中提取指定路径的HDF5子集并创建新文件"""
-    try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
-        cur = conn.cursor()
-
-        # 获取原始文件信息
-        cur.execute("SELECT file_name, file_path FROM hdf5_files WHERE id = %s", (file_id,))
+def _get_source_file_path(file_id, target_path):
+    """查询原始文件的本地路径，文件记录或物理文件不存在时返回 None"""
+    # 获取原始文件信息 (连接在读取HDF5之前即归还连接池)
+    with db_cursor() as cur:
+        cur.execute("SELECT file_name, local_path FROM hdf5_files WHERE id = %s", (file_id,))
         file_info = cur.fetchone()
-        if not file_info:
-            print(f"❌ 文件ID {file_id} 不存在")
-            return False
-
-        original_file_name = file_info[0]
-        original_file_path = file_info[1]
+    if not file_info:
+        print(f"❌ 文件ID {file_id} 不存在")
+        return None
+
+    original_file_name = file_info[0]
+    original_file_path = file_info[1]
+
+    print(f"📖 正在从文件 {original_file_name} 提取路径: {target_path}")
+
+    # 检查原始文件是否存在
+    if not os.path.exists(original_file_path):
+        print(f"❌ 原始文件不存在: {original_file_path}")
+        return None
+    return original_file_path
+
+
+def _copy_subset(src_file, target_path, dst_file):
+    """
+    用 HDF5 原生的对象复制 (H5Ocopy) 复制指定路径及其子路径：组的层次结构与属性一并复制，
+    压缩的 chunk 按原始字节复制，不经过解压/重新压缩，也不逐个对象往返 Python
+    """
+    if target_path in src_file:
+        src_obj = src_file[target_path]
+        if src_obj.name == '/':
+            # 根组不能作为复制目标，逐个复制其子对象与属性
+            for key in src_obj:
+                src_file.copy(src_obj[key], dst_file, name=key)
+            dst_file.attrs.update(src_obj.attrs)
+        else:
+            dst_file.require_group(os.path.dirname(src_obj.name))
+            src_file.copy(src_obj, dst_file, name=src_obj.name)
 
-        print(f"📖 正在从文件 {original_file_name} 提取路径: {target_path}")
 
-        # 检查原始文件是否存在
-        if not os.path.exists(original_file_path):
-            print(f"❌ 原始文件不存在: {original_file_path}")
+def extract_hdf5_subset(file_id, target_path, output_file):
+    """从数据库中提取指定路径的HDF5子集并创建新文件"""
+    try:
+        original_file_path = _get_source_file_path(file_id, target_path)
+        if original_file_path is None:
             return False
 
-        # 从原始HDF5文件读取数据
-        with h5py.File(original_file_path, 'r') as src_file:
-            # 创建新的HDF5文件
-            with h5py.File(output_file, 'w') as dst_file:
-
-                # 递归复制指定路径及其子路径
-                def copy_path(src_path, dst_path):
-                    """递归复制路径"""
-                    if src_path in src_file:
-                        src_obj = src_file[src_path]
-
-                        if isinstance(src_obj, h5py.Group):
-                            # 复制Group
-                            if dst_path not in dst_file:
-                                dst_file.create_group(dst_path)
-
-                            # 复制Group的属性
-                            for attr_name, attr_value in src_obj.attrs.items():
-                                dst_file[dst_path].attrs[attr_name] = attr_value
-
-                            # 递归复制子对象
-                            for key in src_obj.keys():
-                                child_src_path = f"{src_path}/{key}"
-                                child_dst_path = f"{dst_path}/{key}"
-                                copy_path(child_src_path, child_dst_path)
-
-                        elif isinstance(src_obj, h5py.Dataset):
-                            # 复制Dataset
-                            dst_file.create_dataset(dst_path, data=src_obj)
-
-                            # 复制Dataset的属性
-                            for attr_name, attr_value in src_obj.attrs.items():
-                                dst_file[dst_path].attrs[attr_name] = attr_value
-
-                # 开始复制
-                copy_path(target_path, target_path)
+        # 源文件使用缓存的只读句柄，对同一文件的重复提取不再重新打开文件
+        src_file = open_hdf5(original_file_path)
+        with h5py.File(output_file, 'w') as dst_file:
+            _copy_subset(src_file, target_path, dst_file)
 
         print(f"✅ 提取完成！新文件: {output_file}")
         return True
@@ -116,6 +143,31 @@ def extract_hdf5_subset(file_id, target_path, output_file):
         return False
 
 
+def extract_hdf5_subset_to_mem(file_id, target_path):
+    """
+    提取指定路径的HDF5子集到内存文件 (core 驱动，不落盘)，返回打开的 h5py.File，
+    失败时返回 None。调用方读取完毕后负责关闭返回的文件。
+    """
+    try:
+        original_file_path = _get_source_file_path(file_id, target_path)
+        if original_file_path is None:
+            return None
+
+        src_file = open_hdf5(original_file_path)
+        # core 驱动按文件名登记已打开的文件，用随机名避免并发提取时冲突
+        mem_file = h5py.File(f"subset_{uuid.uuid4().hex}.h5", 'w', driver='core', backing_store=False)
+        try:
+            _copy_subset(src_file, target_path, mem_file)
+        except Exception:
+            mem_file.close()
+            raise
+        return mem_file
+
+    except Exception as e:
+        print(f"❌ 提取失败: {e}")
+        return None
+
+
 def extract_hdf5_by_path(search_path, output_dir="extracted"):
     """根据路径提取HDF5文件"""
     print(f"🔍 搜索包含路径 '{search_path}' 的HDF5文件...")
@@ -155,17 +207,9 @@ def extract_hdf5_by_path(search_path, output_dir="extracted"):
             print(f"❌ 文件提取失败: {file_info['name']}")
 
 
-def list_available_paths(file_id):
-    """列出指定文件中所有可用的路径"""
-    try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
-        cur = conn.cursor()
-
+def query_available_paths(file_id):
+    """查询指定文件中所有可用的路径，数据库错误直接抛出"""
+    with db_cursor() as cur:
         # 获取所有Groups路径
         cur.execute("""
             SELECT full_path FROM hdf5_groups
@@ -182,11 +226,13 @@ def list_available_paths(file_id):
         """, (file_id,))
         dataset_paths = [row[0] for row in cur.fetchall()]
 
-        cur.close()
-        conn.close()
+    return sorted(set(group_paths + dataset_paths))
+
 
-        all_paths = sorted(set(group_paths + dataset_paths))
-        return all_paths
+def list_available_paths(file_id):
+    """列出指定文件中所有可用的路径"""
+    try:
+        return query_available_paths(file_id)
 
     except Exception as e:
         print(f"❌ 获取路径列表失败: {e}")
@@ -0,0 +1,69 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class TaskStore:
+    """
+    基于 SQLite (WAL 模式) 的任务状态存储。
+
+    替代 multiprocessing.Manager().dict()：状态读写不再经过 Manager 进程的
+    pickle + socket 往返，而是一次本地文件读写；多个 Flask 进程和任务进程
+    也可以共享同一个数据库文件。对象只保存数据库路径，可以安全地传递给子进程，
+    每个进程/线程在首次访问时各自打开连接。
+    """
+
+    def __init__(self, db_path: str, ttl: int = 86400):
+        """
+        Args:
+            db_path (str): SQLite 数据库文件路径。
+            ttl (int, optional): 任务状态的保留时间（秒），默认 1 天。
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self._local = threading.local()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS task_statuses ("
+            " task_id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL);"
+        )
+        conn.execute("DELETE FROM task_statuses WHERE expires_at < ?;", (time.time(),))
+
+    def __getstate__(self):
+        # 连接对象不可序列化，子进程中重新打开
+        return {'db_path': self.db_path, 'ttl': self.ttl}
+
+    def __setstate__(self, state):
+        self.db_path = state['db_path']
+        self.ttl = state['ttl']
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def set(self, task_id: str, status: dict) -> None:
+        """写入（覆盖）任务状态。"""
+        self._conn().execute(
+            "INSERT OR REPLACE INTO task_statuses (task_id, data, expires_at) VALUES (?, ?, ?);",
+            (task_id, json.dumps(status), time.time() + self.ttl)
+        )
+
+    def get(self, task_id: str):
+        """读取任务状态，不存在或已过期时返回 None。"""
+        row = self._conn().execute(
+            "SELECT data FROM task_statuses WHERE task_id = ? AND expires_at >= ?;",
+            (task_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
@@ -1,173 +1,545 @@
+import base64
+import io
+import logging
+import queue
+import threading
+import time
 import h5py
-import psycopg2
+from psycopg2.extras import execute_values
 import os
 import numpy as np
 from datetime import datetime
 import traceback
-from config import DB_HOST, DB_NAME, DB_USER, DB_PASSWORD
+from src.db_pool import db_cursor, execute_prepared
 
-# PostgreSQL 数据库连接参数
+# numba 为可选依赖：安装后经纬度范围计算使用单次遍历的编译循环，否则退回 NumPy
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
+# 逐对象的调试信息走 logging，默认级别下不输出，也不格式化字符串
+logger = logging.getLogger(__name__)
 
+# 组/数据集/属性元数据批量插入时，每条多行 INSERT 语句包含的行数
+INSERT_PAGE_SIZE = 1000
 
-def insert_hdf5_file_metadata(cursor, file_name, file_path):
+# 入库遍历时使用的 HDF5 元数据缓存初始大小 (128 MB)
+MDC_INITIAL_SIZE = 128 * 1024 * 1024
+
+# 变量列表物化视图的刷新延迟 (秒)：期间的多次入库合并为一次刷新
+FILE_VARIABLES_REFRESH_DELAY = 30
+
+
+def open_hdf5_for_metadata_scan(hdf5_file_path):
+    """
+    以只读方式打开 HDF5 文件，并调大元数据缓存 (metadata cache)。
+
+    默认的元数据缓存只有 2 MB 且会自动调整大小；遍历 Group/Dataset/Attribute 较多的文件时
+    会频繁换入换出。这里固定初始大小为 128 MB，关闭自动增减和驱逐，让一次遍历中读到的
+    元数据块都留在缓存里。
+    """
+    fapl = h5py.h5p.create(h5py.h5p.FILE_ACCESS)
+    mdc = fapl.get_mdc_config()
+    mdc.set_initial_size = True
+    mdc.initial_size = MDC_INITIAL_SIZE
+    mdc.max_size = max(mdc.max_size, MDC_INITIAL_SIZE)
+    mdc.min_size = min(mdc.min_size, MDC_INITIAL_SIZE)
+    # 关闭自动调整 (H5C_incr__off / H5C_flash_incr__off / H5C_decr__off 均为 0)，才能关闭驱逐
+    mdc.incr_mode = 0
+    mdc.flash_incr_mode = 0
+    mdc.decr_mode = 0
+    mdc.evictions_enabled = False
+    fapl.set_mdc_config(mdc)
+    fid = h5py.h5f.open(os.fsencode(hdf5_file_path), h5py.h5f.ACC_RDONLY, fapl=fapl)
+    return h5py.File(fid)
+
+
+# 经纬度数组中小于等于该值的视为填充值 (如 -9999.9)
+LATLON_FILL_THRESHOLD = -9999.0
+
+
+def find_latlon_datasets(datasets):
+    """
+    按名称推断经纬度数据集，规则与 api_service 中的数据库推断一致：
+    纬度取第一个名称含 lat 的数据集，经度取与纬度同组、名称含 lon 的数据集。
+
+    Args:
+        datasets (list): [(parent_path, name), ...]，按遍历顺序排列。
+
+    Returns:
+        tuple: (group_path, lat_name, lon_name)；推断失败时返回 None。
+    """
+    for lat_parent, lat_name in datasets:
+        if 'lat' not in lat_name.lower():
+            continue
+        for parent, name in datasets:
+            if parent == lat_parent and 'lon' in name.lower():
+                return lat_parent, lat_name, name
+        return None
+    return None
+
+
+# 非分块存储的数据集按行分批读取时，每批的目标元素数
+RANGE_SCAN_BLOCK_ELEMENTS = 1 << 20
+
+
+def _iter_blocks(dataset):
+    """按 HDF5 chunk（非分块存储时按行批次）迭代数据集，每次只读入一块。"""
+    if dataset.ndim == 0:
+        yield np.atleast_1d(dataset[()])
+        return
+    if dataset.chunks:
+        for sel in dataset.iter_chunks():
+            yield dataset[sel]
+        return
+    row_elements = max(1, int(np.prod(dataset.shape[1:])))
+    step = max(1, RANGE_SCAN_BLOCK_ELEMENTS // row_elements)
+    for start in range(0, dataset.shape[0], step):
+        yield dataset[start:start + step]
+
+
+def _block_minmax_numpy(block, fill):
+    """NumPy 实现：先按阈值过滤，再分别求最小值和最大值。"""
+    valid = block[block > fill]
+    if valid.size == 0:
+        return np.inf, -np.inf
+    return valid.min(), valid.max()
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _block_minmax_numba(values, fill):
+        """一次遍历同时求有效值的最小值和最大值，不分配掩码和过滤后的中间数组。"""
+        lo = np.inf
+        hi = -np.inf
+        for i in prange(values.size):
+            v = values[i]
+            if v > fill:
+                lo = min(lo, v)
+                hi = max(hi, v)
+        return lo, hi
+
+    def _block_minmax(block, fill):
+        return _block_minmax_numba(np.ravel(block), fill)
+else:
+    _block_minmax = _block_minmax_numpy
+
+
+def _valid_range(dataset):
+    """流式计算数据集中有效值（大于填充值阈值）的最小值和最大值，没有有效值时返回 None。"""
+    lo, hi = np.inf, -np.inf
+    for block in _iter_blocks(dataset):
+        block_lo, block_hi = _block_minmax(block, LATLON_FILL_THRESHOLD)
+        lo = min(lo, block_lo)
+        hi = max(hi, block_hi)
+    if lo > hi:
+        return None
+    return float(lo), float(hi)
+
+
+def compute_latlon_bbox(lat_ds, lon_ds):
+    """
+    计算经纬度数据集的有效值范围（忽略填充值）。
+    逐块读取并累计最值，峰值内存为一个 chunk 而非整个数组。
+
+    Returns:
+        tuple: (lat_min, lat_max, lon_min, lon_max)；没有有效数据时返回 None。
+    """
+    lat_range = _valid_range(lat_ds)
+    if lat_range is None:
+        return None
+    lon_range = _valid_range(lon_ds)
+    if lon_range is None:
+        return None
+    return lat_range + lon_range
+
+
+def update_hdf5_file_bbox(cursor, file_id, bbox):
+    """写入文件的经纬度范围 (lat_min, lat_max, lon_min, lon_max)。"""
+    update_sql = "UPDATE hdf5_files SET lat_min = %s, lat_max = %s, lon_min = %s, lon_max = %s WHERE id = %s;"
+    cursor.execute(update_sql, (*bbox, file_id))
+
+
+def insert_hdf5_file_metadata(cursor, file_name, file_path, sha256=None):
     """插入 HDF5 文件信息到 hdf5_files 表，并返回新插入的 file_id。"""
-    insert_sql = "INSERT INTO hdf5_files (file_name, file_path) VALUES (%s, %s) RETURNING id;"
-    cursor.execute(insert_sql, (file_name, file_path))
+    # 连接池中的连接长期存在，预备语句在该连接上首次入库时 PREPARE，之后的文件直接 EXECUTE
+    execute_prepared(cursor, "hdf5_file_ins",
+                     "INSERT INTO hdf5_files (file_name, file_path, sha256) VALUES ($1, $2, $3) RETURNING id",
+                     (file_name, file_path, sha256))
     file_id = cursor.fetchone()[0]
     return file_id
 
 
-def insert_hdf5_group_metadata(cursor, file_id, name, full_path, parent_path):
-    """插入 HDF5 Group 信息到 hdf5_groups 表。"""
-    insert_sql = "INSERT INTO hdf5_groups (file_id, name, full_path, parent_path) VALUES (%s, %s, %s, %s);"
-    cursor.execute(insert_sql, (file_id, name, full_path, parent_path))
+def hdf5_group_row(file_id, name, full_path, parent_path):
+    """生成 hdf5_groups 表的一行。"""
+    return file_id, name, full_path, parent_path
 
 
-def insert_hdf5_dataset_metadata(cursor, file_id, name, full_path, parent_path, dataset):
-    """插入 HDF5 Dataset 信息到 hdf5_datasets 表。"""
-    shape = str(dataset.shape) if dataset.shape else None
-    dtype = str(dataset.dtype) if dataset.dtype else None
-    chunks = str(dataset.chunks) if dataset.chunks else None
-    compression = dataset.compression
-    compression_opts = str(dataset.compression_opts) if dataset.compression_opts is not None else None
-    fill_value = str(dataset.fillvalue) if dataset.fillvalue is not None else None
+def _dcpl_compression(dcpl):
+    """从数据集创建属性列表读出 (压缩方式, 压缩参数)，与 h5py 的 compression / compression_opts 取值一致。"""
+    found = {}
+    for i in range(dcpl.get_nfilters()):
+        code, _, values, _ = dcpl.get_filter(i)
+        if code == h5py.h5z.FILTER_DEFLATE:
+            found['gzip'] = values[0]
+        elif code == h5py.h5z.FILTER_LZF:
+            found['lzf'] = None
+        elif code == h5py.h5z.FILTER_SZIP:
+            mask, pixels = values[:2]
+            found['szip'] = ('ec' if mask & h5py.h5z.SZIP_EC_OPTION_MASK else 'nn', pixels)
+    for name in ('gzip', 'lzf', 'szip'):
+        if name in found:
+            return name, found[name]
+    return None, None
 
-    insert_sql = """
-        INSERT INTO hdf5_datasets (file_id, name, full_path, parent_path, shape, dtype, chunks, compression, compression_opts, fill_value)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+
+def hdf5_dataset_row(file_id, name, full_path, parent_path, dataset):
+    """
+    生成 hdf5_datasets 表的一行。分块、压缩与填充值都从同一个创建属性列表 (DCPL) 读取，
+    不经过 h5py 各属性每次重新解析过滤器管线。
     """
-    cursor.execute(insert_sql, (
-    file_id, name, full_path, parent_path, shape, dtype, chunks, compression, compression_opts, fill_value))
+    dsid = dataset.id
+    dcpl = dsid.get_create_plist()
+    # shape/chunks 列为 BIGINT[]，psycopg2 把列表适配为数组
+    shape = list(dsid.shape) if dsid.shape else None
+    dtype = str(dsid.dtype) if dsid.dtype else None
+    chunks = list(dcpl.get_chunk()) if dcpl.get_layout() == h5py.h5d.CHUNKED else None
+    compression, compression_opts = _dcpl_compression(dcpl)
+    compression_opts = str(compression_opts) if compression_opts is not None else None
+    fill = np.zeros((1,), dtype=dsid.dtype)
+    dcpl.get_fill_value(fill)
+    fill_value = str(fill[0])
+    return file_id, name, full_path, parent_path, shape, dtype, chunks, compression, compression_opts, fill_value
+
+
+def safe_decode(val):
+    """bytes 按 UTF-8 解码，无法解码时保存为 base64: 前缀的 Base64 文本；其他值转为字符串。"""
+    if isinstance(val, bytes):
+        # HDF5 属性字符串绝大多数是 ASCII：isascii 只扫描一遍字节，直接走最快的 ASCII 解码
+        if val.isascii():
+            return val.decode('ascii')
+        try:
+            return val.decode('utf-8')
+        except UnicodeDecodeError:
+            return f"base64:{base64.b64encode(val).decode('ascii')}"
+    return str(val)
+
+
+def _decode_bytes_array(values):
+    """
+    一维定长字节串数组整体按 UTF-8 解码 (np.char.decode 在 C 中循环)；
+    含非 UTF-8 字节时退回逐元素 safe_decode，保留 base64 表示
+    """
+    try:
+        return np.char.decode(values, 'utf-8').tolist()
+    except UnicodeDecodeError:
+        return [safe_decode(v) for v in values]
 
 
-def insert_hdf5_attribute_metadata(cursor, file_id, parent_path, attr_name, attr_value):
-    """插入 HDF5 Attribute 信息到 hdf5_attributes 表。"""
-    import base64
+# 以下按属性值类型生成 hdf5_attributes 的
+# (value, is_array, array_length, dtype, str_length, padding, cset) 七列
+_NDARRAY_CSET = {'U': "H5T_CSET_UTF8", 'S': "H5T_CSET_ASCII"}
 
-    def safe_decode(val):
-        if isinstance(val, bytes):
-            try:
-                return val.decode('utf-8')
-            except UnicodeDecodeError:
-                return f"base64:{base64.b64encode(val).decode('ascii')}"
-        return str(val)
-
-    # 针对 numpy 数组
-    if isinstance(attr_value, np.ndarray):
-        if attr_value.dtype.type is np.bytes_ or attr_value.dtype == object:
-            value_text = [safe_decode(v) for v in attr_value]
-        else:
-            value_text = str(attr_value)
-    # 针对列表/元组
-    elif isinstance(attr_value, (list, tuple)):
+
+def _ndarray_attr_fields(attr_value):
+    kind = attr_value.dtype.kind  # 'S' 定长字节串, 'U' Unicode, 'O' 变长字符串等对象
+    if kind == 'S' and attr_value.ndim == 1:
+        value_text = _decode_bytes_array(attr_value)
+    elif kind in ('S', 'O'):
         value_text = [safe_decode(v) for v in attr_value]
     else:
-        value_text = safe_decode(attr_value)
+        value_text = str(attr_value)
+    is_string = kind in ('S', 'U')
+    return (value_text, True, int(attr_value.size) if attr_value.ndim > 0 else None, f"numpy.{attr_value.dtype}",
+            int(attr_value.size) if is_string else None, "H5T_STR_NULLTERM" if is_string else None,
+            _NDARRAY_CSET.get(kind))
 
-    is_array = isinstance(attr_value, (list, tuple, np.ndarray))
 
-    # array_length
-    if isinstance(attr_value, np.ndarray):
-        array_length = int(attr_value.size) if attr_value.ndim > 0 else None
-    elif isinstance(attr_value, (list, tuple)):
-        array_length = len(attr_value)
-    else:
-        array_length = None
-
-    # dtype
-    if isinstance(attr_value, np.ndarray):
-        dtype = f"numpy.{attr_value.dtype}"
-    elif isinstance(attr_value, bytes):
-        dtype = "bytes"
-    elif isinstance(attr_value, str):
-        dtype = "string"
-    elif isinstance(attr_value, (list, tuple)):
-        dtype = f"{type(attr_value).__name__}[{len(attr_value)}]"
-    else:
-        dtype = str(type(attr_value).__name__)
-
-    # str_length
-    if isinstance(attr_value, str):
-        str_length = len(attr_value)
-    elif isinstance(attr_value, bytes):
-        str_length = len(attr_value)
-    elif isinstance(attr_value, np.ndarray) and attr_value.dtype.type in [np.string_, np.unicode_]:
-        str_length = int(attr_value.size)
-    else:
-        str_length = None
+def _sequence_attr_fields(attr_value):
+    return ([safe_decode(v) for v in attr_value], True, len(attr_value),
+            f"{type(attr_value).__name__}[{len(attr_value)}]", None, None, None)
 
-    # padding
-    if isinstance(attr_value, (str, bytes)) or (isinstance(attr_value, np.ndarray) and attr_value.dtype.type in [np.string_, np.unicode_]):
-        padding = "H5T_STR_NULLTERM"
-    else:
-        padding = None
 
-    # cset
-    if isinstance(attr_value, str) or (isinstance(attr_value, np.ndarray) and attr_value.dtype.type == np.unicode_):
-        cset = "H5T_CSET_UTF8"
-    elif isinstance(attr_value, bytes) or (isinstance(attr_value, np.ndarray) and attr_value.dtype.type == np.string_):
-        cset = "H5T_CSET_ASCII"
-    else:
-        cset = None
+def _bytes_attr_fields(attr_value):
+    return safe_decode(attr_value), False, None, "bytes", len(attr_value), "H5T_STR_NULLTERM", "H5T_CSET_ASCII"
+
 
-    # 调试输出
-    insert_sql = """
-        INSERT INTO hdf5_attributes (file_id, parent_path, name, value, is_array, array_length, dtype, str_length, padding, cset)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+def _str_attr_fields(attr_value):
+    return str(attr_value), False, None, "string", len(attr_value), "H5T_STR_NULLTERM", "H5T_CSET_UTF8"
+
+
+def _scalar_attr_fields(attr_value):
+    return str(attr_value), False, None, type(attr_value).__name__, None, None, None
+
+
+# 按 type(attr_value) 查找处理函数；子类 (如 np.bytes_、np.str_) 与数值标量类型首次出现时
+# 按 isinstance 确定处理函数并记入表中，之后同类型的属性只需一次字典查找
+_ATTR_FIELD_HANDLERS = {
+    np.ndarray: _ndarray_attr_fields,
+    list: _sequence_attr_fields,
+    tuple: _sequence_attr_fields,
+    bytes: _bytes_attr_fields,
+    str: _str_attr_fields,
+}
+# 绝大多数属性是数值标量：常见标量类型预先登记，首次出现时也只需一次字典查找
+_ATTR_FIELD_HANDLERS.update(dict.fromkeys(
+    (int, float, bool, np.bool_, np.int8, np.int16, np.int32, np.int64,
+     np.uint8, np.uint16, np.uint32, np.uint64, np.float32, np.float64),
+    _scalar_attr_fields))
+
+
+def _attr_field_handler(attr_value):
+    value_type = type(attr_value)
+    handler = _ATTR_FIELD_HANDLERS.get(value_type)
+    if handler is None:
+        handler = _scalar_attr_fields
+        for base in (np.ndarray, list, tuple, bytes, str):
+            if issubclass(value_type, base):
+                handler = _ATTR_FIELD_HANDLERS[base]
+                break
+        _ATTR_FIELD_HANDLERS[value_type] = handler
+    return handler
+
+
+def hdf5_attribute_row(file_id, parent_path, attr_name, attr_value):
+    """生成 hdf5_attributes 表的一行。"""
+    return (file_id, parent_path, attr_name) + _attr_field_handler(attr_value)(attr_value)
+
+
+def read_all_attrs(obj):
     """
-    cursor.execute(insert_sql, (
-    file_id, parent_path, attr_name, value_text, is_array, array_length, dtype, str_length, padding, cset))
+    一次取出对象的全部属性，返回 [(name, value), ...]。属性名由一次 C 层 h5a.iterate 取得，
+    之后按名称直接读取，不再经过 items() 视图逐项的 Mapping.get 调用
+    """
+    attrs = obj.attrs
+    return [(attr_name, attrs[attr_name]) for attr_name in attrs]
 
-def parse_and_store_hdf5_metadata(hdf5_file_path):
-    conn = None
-    try:
-        conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
-        cur = conn.cursor()
 
-        file_name = os.path.basename(hdf5_file_path)
-        print(f"[DEBUG] 连接数据库成功，开始处理文件 {file_name}")
+# 组与数据集元数据行的多行 INSERT 语句与行模板 (属性行使用 COPY，见 copy_attribute_rows)
+_METADATA_INSERTS = {
+    'group': ("INSERT INTO hdf5_groups (file_id, name, full_path, parent_path) VALUES %s", None),
+    'dataset': ("""
+        INSERT INTO hdf5_datasets (file_id, name, full_path, parent_path, shape, dtype, chunks, compression, compression_opts, fill_value)
+        VALUES %s
+    """, None),
+}
+
+# 遍历线程与写入线程之间排队的批次上限，写入跟不上时遍历线程等待，内存占用有上界
+PIPELINE_QUEUE_SIZE = 16
+
+
+# PostgreSQL 数组输出中需要给元素加引号的字符 (array_out 的规则)
+_PG_ARRAY_QUOTE_CHARS = frozenset('{}",\\ \t\n\r\v\f')
+
+
+def _pg_array_text(items):
+    """把字符串列表格式化为 text[] 转换为 text 时的文本 (如 {a,"b c"})，与此前 INSERT 时的转换结果一致。"""
+    parts = []
+    for item in items:
+        if item == '' or item.lower() == 'null' or not _PG_ARRAY_QUOTE_CHARS.isdisjoint(item):
+            item = '"' + item.replace('\\', '\\\\').replace('"', '\\"') + '"'
+        parts.append(item)
+    return '{' + ','.join(parts) + '}'
+
+
+def _csv_field(value):
+    """COPY ... WITH (FORMAT csv) 的字段：None 为不加引号的空字段 (NULL)，字符串一律加引号。"""
+    if value is None:
+        return ''
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, list):
+        value = _pg_array_text(value)
+    return '"' + value.replace('"', '""') + '"'
+
+
+def copy_attribute_rows(cursor, rows):
+    """用 COPY FROM STDIN (CSV) 写入一批属性行，跳过逐行的 SQL 解析。"""
+    buf = io.StringIO()
+    buf.writelines(','.join(map(_csv_field, row)) + '\n' for row in rows)
+    buf.seek(0)
+    cursor.copy_expert(
+        "COPY hdf5_attributes (file_id, parent_path, name, value, is_array, array_length, dtype, str_length, padding, cset) "
+        "FROM STDIN WITH (FORMAT csv)", buf
+    )
+
+
+def insert_metadata_rows(cursor, kind, rows):
+    """
+    批量写入一类元数据 ('group' / 'dataset' / 'attribute')：属性行使用 COPY，
+    组与数据集使用多行 INSERT (execute_values)，每 INSERT_PAGE_SIZE 行一条语句。
+    """
+    if kind == 'attribute':
+        copy_attribute_rows(cursor, rows)
+        return
+    sql, template = _METADATA_INSERTS[kind]
+    execute_values(cursor, sql, rows, template=template, page_size=INSERT_PAGE_SIZE)
 
-        file_id = insert_hdf5_file_metadata(cur, file_name, hdf5_file_path)
-        print(f"[DEBUG] 插入文件元数据，file_id={file_id}")
 
-        with h5py.File(hdf5_file_path, 'r') as hf:
-            def visitor_func(name, obj):
-                full_path = "/" + name
-                parent_path = os.path.dirname(full_path)
-                if parent_path == "/":
-                    parent_path = "/"
+def _metadata_writer(cursor, batches, errors):
+    """
+    写入线程：依次把队列中的 (kind, rows) 批次写入数据库，取到 None 时结束。
+    写入出错后记录异常并继续取空队列，遍历线程不会因队列已满而阻塞。
+    """
+    while True:
+        batch = batches.get()
+        if batch is None:
+            return
+        if not errors:
+            try:
+                insert_metadata_rows(cursor, *batch)
+            except Exception as e:
+                errors.append(e)
+
 
-                print(f"[DEBUG] 访问组/数据集/属性: {full_path} 类型: {type(obj)}")
+def refresh_file_variables(cursor):
+    """
+    并发刷新变量列表物化视图 hdf5_file_variables（刷新期间不阻塞查询）。
+    刷新失败不影响已提交的入库结果，查询端会退回直接查询 hdf5_datasets。
+    """
+    try:
+        cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY hdf5_file_variables;")
+        cursor.connection.commit()
+    except Exception as e:
+        logger.warning("刷新 hdf5_file_variables 失败: %s", e)
+        cursor.connection.rollback()
 
-                if isinstance(obj, h5py.Group):
-                    insert_hdf5_group_metadata(cur, file_id, obj.name.split('/')[-1], full_path, parent_path)
-                    for attr_name, attr_value in obj.attrs.items():
-                        insert_hdf5_attribute_metadata(cur, file_id, full_path, attr_name, attr_value)
 
-                elif isinstance(obj, h5py.Dataset):
-                    insert_hdf5_dataset_metadata(cur, file_id, obj.name.split('/')[-1], full_path, parent_path, obj)
-                    for attr_name, attr_value in obj.attrs.items():
-                        insert_hdf5_attribute_metadata(cur, file_id, full_path, attr_name, attr_value)
+_refresh_lock = threading.Lock()
+_refresh_pending = False
+_refresh_thread = None
+_refresh_pid = None
 
-            hf.visititems(visitor_func)
 
-        conn.commit()
+def schedule_file_variables_refresh():
+    """
+    请求在后台刷新 hdf5_file_variables，不占用上传请求的时间。
+
+    刷新会重新计算整个 hdf5_datasets，代价与目录大小成正比，且并发刷新彼此排队；
+    因此由每个进程的后台线程在 FILE_VARIABLES_REFRESH_DELAY 秒后执行，
+    这段时间内的多次入库只触发一次刷新。视图刷新之前，新文件的变量列表由 hdf5_datasets 查询得到。
+    """
+    global _refresh_pending, _refresh_thread, _refresh_pid
+    with _refresh_lock:
+        _refresh_pending = True
+        if _refresh_thread is None or _refresh_pid != os.getpid():
+            _refresh_thread = threading.Thread(target=_file_variables_refresher, daemon=True)
+            _refresh_pid = os.getpid()
+            _refresh_thread.start()
+
+
+def _file_variables_refresher():
+    global _refresh_pending, _refresh_thread
+    while True:
+        time.sleep(FILE_VARIABLES_REFRESH_DELAY)
+        with _refresh_lock:
+            if not _refresh_pending:
+                # 在锁内登记退出，之后的刷新请求会启动新的线程
+                _refresh_thread = None
+                return
+            _refresh_pending = False
+        try:
+            with db_cursor() as cur:
+                refresh_file_variables(cur)
+        except Exception as e:
+            logger.warning("刷新 hdf5_file_variables 失败: %s", e)
+
+
+def parse_and_store_hdf5_metadata(hdf5_file_path, sha256=None):
+    try:
+        file_name = os.path.basename(hdf5_file_path)
+
+        # 从进程内连接池借用连接，正常退出时提交，异常时回滚
+        with db_cursor() as cur:
+            logger.debug("连接数据库成功，开始处理文件 %s", file_name)
+            # 整个文件的入库在同一个事务中完成；本事务提交时不等待 WAL 刷盘。
+            # 数据库崩溃可能丢失最近提交的入库结果 (不会损坏数据)，此时从源 HDF5 文件重新入库即可
+            cur.execute("SET LOCAL synchronous_commit = off;")
+
+            file_id = insert_hdf5_file_metadata(cur, file_name, hdf5_file_path, sha256)
+            logger.debug("插入文件元数据，file_id=%s", file_id)
+
+            with open_hdf5_for_metadata_scan(hdf5_file_path) as hf:
+                debug = logger.isEnabledFor(logging.DEBUG)
+                datasets = []
+                # 遍历与写入流水线：遍历线程每攒满 INSERT_PAGE_SIZE 行交给写入线程，
+                # 写入线程等待数据库往返时 (psycopg2 释放 GIL) 遍历继续进行。
+                # 两者共用同一连接与事务，遍历期间主线程不使用该游标
+                pending = {'group': [], 'dataset': [], 'attribute': []}
+                batches = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+                errors = []
+
+                def flush(kind, min_rows=INSERT_PAGE_SIZE):
+                    rows = pending[kind]
+                    if rows and len(rows) >= min_rows:
+                        batches.put((kind, rows))
+                        pending[kind] = []
+
+                def visitor_func(name, info):
+                    # 低层 h5o.visit 回调：name 为 bytes，info 为对象头信息 (类型、属性个数)，
+                    # 只在需要读取属性或数据集属性时才打开对象，没有属性的组不创建 Python 包装对象
+                    name = name.decode('utf-8')
+                    full_path = "/" + name
+                    # 一次 rpartition 同时得到父路径与名称 (HDF5 路径固定以 / 分隔)
+                    parent, _, basename = name.rpartition('/')
+                    parent_path = "/" + parent
+
+                    if debug:
+                        logger.debug("访问组/数据集/属性: %s 类型: %s", full_path, info.type)
+
+                    if info.type == h5py.h5o.TYPE_GROUP:
+                        pending['group'].append(hdf5_group_row(file_id, basename, full_path, parent_path))
+                        flush('group')
+                        if info.num_attrs:
+                            pending['attribute'].extend(hdf5_attribute_row(file_id, full_path, attr_name, attr_value)
+                                                        for attr_name, attr_value in read_all_attrs(hf[name]))
+
+                    elif info.type == h5py.h5o.TYPE_DATASET:
+                        obj = hf[name]
+                        pending['dataset'].append(hdf5_dataset_row(file_id, basename, full_path, parent_path, obj))
+                        flush('dataset')
+                        datasets.append((parent_path, basename))
+                        if info.num_attrs:
+                            pending['attribute'].extend(hdf5_attribute_row(file_id, full_path, attr_name, attr_value)
+                                                        for attr_name, attr_value in read_all_attrs(obj))
+                    flush('attribute')
+
+                writer = threading.Thread(target=_metadata_writer, args=(cur, batches, errors), daemon=True)
+                writer.start()
+                try:
+                    h5py.h5o.visit(hf.id, visitor_func, info=True)
+                    for kind in pending:
+                        flush(kind, min_rows=1)
+                finally:
+                    # 遍历出错时也要结束写入线程，之后异常照常抛出、事务回滚
+                    batches.put(None)
+                    writer.join()
+                if errors:
+                    raise errors[0]
+
+                # 入库时预先计算经纬度范围，查询时无需再读取文件
+                latlon = find_latlon_datasets(datasets)
+                if latlon:
+                    group_path, lat_name, lon_name = latlon
+                    group = hf[group_path]
+                    bbox = compute_latlon_bbox(group[lat_name], group[lon_name])
+                    if bbox:
+                        update_hdf5_file_bbox(cur, file_id, bbox)
+                        logger.debug("写入经纬度范围: %s", bbox)
+
+        schedule_file_variables_refresh()
         return True, file_id
 
     except Exception as e:
         print(f"[ERROR] 处理文件时发生异常: {e}")
-        import traceback
         traceback.print_exc()
-        if conn:
-            conn.rollback()
         return False, None
 
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
-
 
 if __name__ == "__main__":
     HDF5_FILE_TO_PROCESS = '/Users/crocotear/Documents/挑战者杯/data/hdf5/2A.GPM.Ku.V9-20211125.20230101-S231026-E004258.050253.V07A.HDF5'
@@ -118,17 +118,6 @@ def insert_hdf5_attribute_metadata(cursor, file_id, parent_path, attr_name, attr
     else:
         cset = None
 
-    # 调试输出
-    print(f"属性名: {attr_name}")
-    print(f"  原始类型: {type(attr_value)}")
-    print(f"  is_array: {is_array}")
-    print(f"  array_length: {array_length}")
-    print(f"  dtype: {dtype}")
-    print(f"  str_length: {str_length}")
-    print(f"  padding: {padding}")
-    print(f"  cset: {cset}")
-    print(f"  value_text: {repr(value_text)}")
-
     insert_sql = """
         INSERT INTO hdf5_attributes (file_id, parent_path, name, value, is_array, array_length, dtype, str_length, padding, cset)
         VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
@@ -162,7 +151,6 @@ def parse_and_store_hdf5_metadata(hdf5_file_path):
                     insert_hdf5_group_metadata(cur, file_id, obj.name.split('/')[-1], full_path, parent_path)
                     # 存储 Group 的属性
                     for attr_name, attr_value in obj.attrs.items():
-                        print("属性名:", repr(attr_name), "类型:", type(attr_value), "值:", repr(attr_value))
                         insert_hdf5_attribute_metadata(cur, file_id, full_path, attr_name, attr_value)
 
                 elif isinstance(obj, h5py.Dataset):
@@ -170,7 +158,6 @@ def parse_and_store_hdf5_metadata(hdf5_file_path):
                     insert_hdf5_dataset_metadata(cur, file_id, obj.name.split('/')[-1], full_path, parent_path, obj)
                     # 存储 Dataset 的属性
                     for attr_name, attr_value in obj.attrs.items():
-                        print("属性名:", repr(attr_name), "类型:", type(attr_value), "值:", repr(attr_value))
                         insert_hdf5_attribute_metadata(cur, file_id, full_path, attr_name, attr_value)
 
             # 遍历 HDF5 文件的所有对象
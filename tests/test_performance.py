@@ -5,24 +5,26 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import psycopg2
 import numpy as np
-from datetime import datetime
 
-# 假设 config.py 存在且包含 DB_HOST, DB_NAME, DB_USER, DB_PASSWORD, LOCAL_MOUNT_POINT
-from config import DB_HOST, DB_NAME, DB_USER, DB_PASSWORD, LOCAL_MOUNT_POINT, DB_PATH_PREFIX
+# 假设 config.py 存在且包含 DB_HOST, DB_NAME, DB_USER, DB_PASSWORD
+from config import DB_HOST, DB_NAME, DB_USER, DB_PASSWORD
 
 # 导入我们的提取函数
 # 假设 extract_hdf5.py 在 src/read/ 目录下
 sys.path.append(os.path.join(os.path.dirname(__file__), '../src/read'))
-from extract_hdf5 import extract_hdf5_subset
+from extract_hdf5 import extract_hdf5_subset_to_mem
 
 # --- 配置测试参数 ---
 # 请替换为您的实际文件ID和目标路径
 TEST_FILE_ID = 14 # 替换为数据库中一个大HDF5文件的ID
 TEST_TARGET_PATH = "/FS/Longitude" # 替换为该文件内部一个数据集的路径
 
-OUTPUT_DIR = "performance_test_output"
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
+def read_dataset(dataset):
+    """预分配结果数组后用 read_direct 读取整个数据集，解压结果直接写入最终缓冲区"""
+    data = np.empty(dataset.shape, dtype=dataset.dtype)
+    if data.size:
+        dataset.read_direct(data)
+    return data
 
 def get_original_file_path(file_id):
     """从数据库获取原始HDF5文件的物理路径"""
@@ -30,12 +32,12 @@ def get_original_file_path(file_id):
     try:
         conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
         cur = conn.cursor()
-        cur.execute("SELECT file_path FROM hdf5_files WHERE id = %s;", (file_id,))
+        # local_path 由数据库生成列完成路径转换
+        cur.execute("SELECT local_path FROM hdf5_files WHERE id = %s;", (file_id,))
         file_record = cur.fetchone()
         if not file_record:
             raise ValueError(f"未找到文件ID为 {file_id} 的记录")
-        # 转换数据库路径到本地可访问路径
-        return file_record[0].replace(DB_PATH_PREFIX, LOCAL_MOUNT_POINT)
+        return file_record[0]
     finally:
         if conn:
             cur.close()
@@ -51,7 +53,7 @@ def test_traditional_read(file_path, dataset_path):
         with h5py.File(file_path, 'r') as hf:
             if dataset_path not in hf:
                 raise ValueError(f"数据集 {dataset_path} 不存在于文件 {file_path} 中。")
-            data = hf[dataset_path][:]
+            data = read_dataset(hf[dataset_path])
             print(f"  成功读取数据集，形状: {data.shape}, 数据类型: {data.dtype}")
     except Exception as e:
         print(f"  传统方式读取失败: {e}")
@@ -63,23 +65,21 @@ def test_traditional_read(file_path, dataset_path):
 
 def test_our_method_read(file_id, target_path):
     """
-    我们的方式：使用 extract_hdf5_subset 提取子集，然后读取新文件。
+    我们的方式：使用 extract_hdf5_subset_to_mem 把子集提取到内存文件，然后直接读取。
     """
     print(f"\n--- 我们的方式读取: {target_path} ---")
     start_time = time.time()
-    output_file_name = f"extracted_subset_{datetime.now().strftime('%Y%m%d%H%M%S')}.h5"
-    output_file_path = os.path.join(OUTPUT_DIR, output_file_name)
 
     try:
-        # 1. 提取子集
-        print(f"  正在提取子集到: {output_file_path}")
-        success = extract_hdf5_subset(file_id, target_path, output_file_path)
-        if not success:
+        # 1. 提取子集 (内存文件，不经过文件系统的写出/重新打开)
+        print("  正在提取子集到内存文件")
+        hf_extracted = extract_hdf5_subset_to_mem(file_id, target_path)
+        if hf_extracted is None:
             raise Exception("子集提取失败。")
         print(f"  子集提取成功。")
 
-        # 2. 读取新文件中的数据集
-        with h5py.File(output_file_path, 'r') as hf_extracted:
+        # 2. 读取内存文件中的数据集
+        with hf_extracted:
             # 提取后的文件，数据集路径可能与原始文件相同，也可能在根目录
             # 假设提取后，目标路径的数据集直接在根目录或原路径下
             extracted_data_path = target_path # 尝试原始路径
@@ -91,7 +91,7 @@ def test_our_method_read(file_id, target_path):
                 else:
                     raise ValueError(f"无法在新文件中找到数据集 {target_path}")
 
-            data = hf_extracted[extracted_data_path][:]
+            data = read_dataset(hf_extracted[extracted_data_path])
             print(f"  成功读取提取后的数据集，形状: {data.shape}, 数据类型: {data.dtype}")
     except Exception as e:
         print(f"  我们的方式读取失败: {e}")
@@ -99,10 +99,6 @@ def test_our_method_read(file_id, target_path):
     finally:
         end_time = time.time()
         print(f"  总耗时: {end_time - start_time:.4f} 秒")
-        # 清理生成的临时文件
-        if os.path.exists(output_file_path):
-            os.remove(output_file_path)
-            print(f"  已清理临时文件: {output_file_path}")
     return data
 
 def main():
@@ -0,0 +1,47 @@
+import hashlib
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from app import _write_upload, PUBLISH_CHUNK_SIZE
+
+
+class _ReadOnlyStream:
+    """只提供 read 的上传流 (Python 3.11 之前的 SpooledTemporaryFile 没有 readinto)"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+
+def _rolled_over_upload(payload):
+    stream = tempfile.SpooledTemporaryFile(max_size=1024)
+    stream.write(payload)
+    assert stream._rolled  # 已超过 max_size，内容写到了磁盘上的临时文件
+    stream.seek(0)
+    return stream
+
+
+def test_write_upload_from_rolled_over_spooled_file(tmp_path):
+    payload = os.urandom(3 * PUBLISH_CHUNK_SIZE + 123)
+    dst_path = tmp_path / "upload.h5"
+    with _rolled_over_upload(payload) as stream:
+        sha256 = _write_upload(stream, str(dst_path), None)
+
+    assert dst_path.read_bytes() == payload
+    assert sha256 == hashlib.sha256(payload).hexdigest()
+    assert [p.name for p in tmp_path.iterdir()] == ["upload.h5"]
+
+
+def test_write_upload_from_stream_without_readinto(tmp_path):
+    payload = os.urandom(PUBLISH_CHUNK_SIZE + 7)
+    dst_path = tmp_path / "upload.h5"
+    with _rolled_over_upload(payload) as stream:
+        sha256 = _write_upload(_ReadOnlyStream(stream), str(dst_path), len(payload))
+
+    assert dst_path.read_bytes() == payload
+    assert sha256 == hashlib.sha256(payload).hexdigest()
+    assert [p.name for p in tmp_path.iterdir()] == ["upload.h5"]
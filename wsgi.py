@@ -0,0 +1,3 @@
+# 生产环境 WSGI 入口，例如:
+#   gunicorn -k gthread -w $(nproc) --threads 32 -b 0.0.0.0:5001 wsgi:app
+from app import app